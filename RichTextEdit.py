@@ -8,7 +8,9 @@ from style_manager import StyleManager, kStyleShortcutNoStyle
 from text_table import TextTable
 from utility import formatDateTime
 from textformatter import TextFormatter, TextInserter
-from database import Database
+from database import Database, ImageDict
+from database_worker import AsyncDatabase
+from text_document import CImageDocument
 
 from ui_RichTextEdit import Ui_RichTextEditWidget
 
@@ -39,9 +41,11 @@ class RichTextEditWidget(QtWidgets.QWidget):
     # Connect signals
     self.setConnections()
 
-  def initialize(self, styleManager: StyleManager, messageLabel: QtWidgets.QLabel, database: Database, switchboard: Switchboard):
+  def initialize(self, styleManager: StyleManager, messageLabel: QtWidgets.QLabel, database: Database, asyncDb: AsyncDatabase,
+                 switchboard: Switchboard):
     self.styleManager = styleManager
     self.db = database
+    self.asyncDb = asyncDb
     self.messageLabel = messageLabel
     self.switchboard = switchboard
     self.ui.textEdit.initialize(self.styleManager, messageLabel, self.db)
@@ -54,6 +58,8 @@ class RichTextEditWidget(QtWidgets.QWidget):
     # Hide the search widgets to start
     self.ui.richTextEditSearchWidget.hide()
 
+    self.switchboard.pageImagesLoaded.connect(self.onPageImagesLoaded)
+
   def setConnections(self):
     self.ui.textEdit.selectionChanged.connect(self.onSelectionChanged)
     self.ui.textEdit.textChanged.connect(self.onTextChanged)
@@ -173,25 +179,34 @@ class RichTextEditWidget(QtWidgets.QWidget):
   def setDocumentText(self, content: str) -> None:
     self.ui.textEdit.setHtml(content)
 
-  def setPageContents(self, contents: str, imageNames: list[str], pageId: ENTITY_ID) -> None:
+  def setPageContents(self, contents: str, pageId: ENTITY_ID) -> None:
     self.ui.textEdit.clear()
 
     # Set default font
     self.setGlobalFont(self.switchboard.preferences.editorDefaultFontFamily, self.switchboard.preferences.editorDefaultFontSize)
 
-    # Load images
-    self.loadImagesIntoDocument(imageNames)
-
     self.ui.textEdit.setHtml(contents)      # The C++ version uses insertHtml()
     self.ui.textEdit.currentPageId = pageId
     self.setDocumentModified(False)
 
-  def loadImagesIntoDocument(self, imageNames: list[str]):
-    for imageName in imageNames:
-      pixmap = self.db.getImage(imageName)
+    # Fetch the page's images.  They are decoded when the document first needs them.
+    self.loadImagesIntoDocument(pageId)
+
+  def loadImagesIntoDocument(self, pageId: ENTITY_ID):
+    """ Reads the page's images on the database worker thread.  They are added when they arrive (see onPageImagesLoaded). """
+    doc = self.ui.textEdit.document()
+
+    if isinstance(doc, CImageDocument):
+      doc.setPageImages({})
+
+      if self.asyncDb.isOpen:
+        self.asyncDb.getImagesForPage(pageId)
+
+  def onPageImagesLoaded(self, pageId: ENTITY_ID, imageDict: ImageDict):
+    doc = self.ui.textEdit.document()
 
-      if pixmap is not None:
-        self.ui.textEdit.document().addResource(QtGui.QTextDocument.ResourceType.ImageResource, QtCore.QUrl(imageName), pixmap)
+    if pageId == self.ui.textEdit.currentPageId and isinstance(doc, CImageDocument):
+      doc.setPageImages(imageDict)
 
   def setGlobalFont(self, fontFamily, fontSize):
     selectionCursor = self.ui.textEdit.textCursor()
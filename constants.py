@@ -17,5 +17,8 @@ kWindowSize = 'window-size'
 kWindowPos = 'window-pos'
 kNavigationTab = 'navigation-tab'
 kTodoListAutosave = 'todolist-autosave'
+kDatabaseWalMode = 'database-walmode'
+kDatabaseMmapSize = 'database-mmapsize'
+kDatabaseCacheSize = 'database-cachesize'
 
 kRecentFiles = 'recentfiles'
\ No newline at end of file
@@ -6,9 +6,12 @@ from text_image import TextImage
 from style_manager import StyleManager
 from styleDef import StyleDef
 from database import Database
+from text_document import CImageDocument
+from pixmap_cache import PixmapCache
 
 from choose_page_to_link_dlg import ChoosePageToLinkDlg
 from add_web_link_dlg import AddWebLinkDlg
+from image_view_dlg import ImageViewDlg
 
 from notebook_types import kInvalidPageId, ENTITY_ID
 
@@ -31,6 +34,9 @@ class CustomTextEdit(QtWidgets.QTextEdit):
     self.hoveredLink = None     # Link over which the cursor is hovered.  Can be an ENTITY_ID (for a NoteBook page) or a string (for a web link)
     self.currentPageId = kInvalidPageId
 
+    # Images are decoded when the document needs them, and kept in a cache shared by all pages
+    self.setDocument(CImageDocument(self, PixmapCache()))
+
   def initialize(self, styleManager: StyleManager, messageLabel: QtWidgets.QLabel, database: Database):
     self.styleManager = styleManager
     self.db = database
@@ -118,6 +124,12 @@ class CustomTextEdit(QtWidgets.QTextEdit):
         menu.addAction('Merge this List with Previous List', self.onMergeListWithPrevious)
 
     menu.addSeparator()
+
+    imageName = self.imageNameAt(event.pos())
+
+    if imageName is not None:
+      menu.addAction('View Image at Full Size...', lambda: self.viewFullSizeImage(imageName))
+
     menu.addAction('Insert Image from File...', self.onInsertImageFromFile)
 
     menu.exec(event.globalPos())
@@ -192,6 +204,29 @@ class CustomTextEdit(QtWidgets.QTextEdit):
 
     return False
 
+  def imageNameAt(self, pt: QtCore.QPoint) -> str | None:
+    """ Returns the name of the image at pt, or None if there is no image there. """
+    cursor = self.cursorForPosition(pt)
+
+    # The cursor's format is that of the character before it, so check the characters on both sides of it
+    for moveOperation in [QtGui.QTextCursor.MoveOperation.NoMove, QtGui.QTextCursor.MoveOperation.NextCharacter]:
+      cursor.movePosition(moveOperation)
+      charFormat = cursor.charFormat()
+
+      if charFormat.isImageFormat():
+        return charFormat.toImageFormat().name()
+
+    return None
+
+  def viewFullSizeImage(self, imageName: str):
+    """ Shows an image at full size.  Pages show large images as downscaled copies; the full-size image is
+        only loaded here. """
+    pixmap = self.db.getImage(imageName)
+
+    if pixmap is not None:
+      dlg = ImageViewDlg(pixmap, self)
+      dlg.exec()
+
   def getNotebookLinkPage(self, linkStr: str) -> ENTITY_ID:
     pageIdRx = r'page=(\d+)'
 
@@ -1,14 +1,21 @@
 from PySide6 import QtCore, QtSql, QtGui
 from pathlib import Path
+from typing import Callable
+from contextlib import contextmanager
 import datetime
+import hashlib
 import logging
 
-from encrypter import Encrypter
-from utility import toQByteArray, qByteArrayToBytes, qByteArrayToString, stringToArray, unknownToString, unknownToBytes, toQByteArray, pixmapToQByteArray, qByteArrayToPixmap
+from encrypter import Encrypter, DecryptionErrors
+from utility import toQByteArray, qByteArrayToBytes, qByteArrayToString, stringToArray, unknownToString, unknownToBytes, toQByteArray, qByteArrayToPixmap, htmlToPlainText, deDupeList, createImageRendition
 
 from constants import kHashedPwFieldName, kSaltFieldName
 
 from page_data import PageData, PageDataDict, PageIdDict
+from page_order import sortKeysFromPageOrder
+from metadata_snapshot import MetadataSnapshot
+from pageCache import PageCache
+from page_codec import encodeContents, decodeContents
 from notebook_types import PAGE_TYPE, ENTITY_ID, ENTITY_LIST, ENTITY_PAIR, ENTITY_PAIR_LIST, ID_TITLE_LIST, kInvalidPageId
 
 # Global value data type constants
@@ -20,35 +27,108 @@ kDataTypeBlob = 2
 # TODO: Make this an Enum
 kPageHistoryKey = "pagehistory"
 kDatabaseVersionId = "databaseversion"
-kPageOrderKey = "pageorder"
+kEncryptedPageColumns = ['contents', 'pagetitle', 'tags']    # Columns of the pages table that are encrypted in a protected notebook
+
+kMetadataSnapshotKey = "metadatasnapshot"     # Encrypted snapshot of page metadata (see metadata_snapshot.py)
+kPageWriteCountKey = "pagewritecount"         # Number of writes to the pages table; part of its signature
+kPageOrderKey = "pageorder"         # Only read by the migration that replaced it with the sortkey column
 
 # Table names
 kAdditionalDataTable = "additionaldata"
+kImageNamesTable = "imagenames"         # Maps the image names used in page documents to stored images
+
+# Encoded images of a page, as shown in the page: image name -> (content hash, encoded bytes, format)
+ImageDict = dict[str, tuple[str, bytes, str]]
+kSearchIndexTable = "pagesearch"
+
+# Search terms shorter than this can't use the trigram index, and are matched with LIKE instead
+kMinIndexedSearchLength = 3
 
 # Additional data types (for the Additional Data table)
 kImageData = 1
 
+# Default connection tuning
+kDefaultMmapSize = 256 * 1024 * 1024      # In bytes
+kDefaultCacheSize = 32 * 1024             # In kilobytes
+
+# How long a connection waits for another connection's write to finish, in milliseconds
+kBusyTimeout = 5000
+
 class Database:
-  def __init__(self):
+  def __init__(self, connectionName: str | None = None):
     super(Database, self).__init__()
     self.db = None
+
+    # Name of the Qt SQL connection, or None for the default connection.  A named connection is an additional
+    # connection to a notebook that is open on the default connection (see openConnection).
+    self.connectionName = connectionName
     self.encrypter = Encrypter()
+    self.searchIndexAvailable = False
+
+    # Prepared statements, keyed by SQL text, and the column indexes of their results.  Both belong to
+    # the current connection, and are discarded when it is closed.
+    self.statementCache: dict[str, QtSql.QSqlQuery] = {}
+    self.columnIndexCache: dict[str, dict[str, int]] = {}
+
+    # One entry for each open transaction level (the outermost transaction first).  An entry is set
+    # to True when an error is reported at that level, which causes the level to be rolled back.
+    self.transactionFailures: list[bool] = []
+
+    # In-memory copy of the globals table
+    self.globals: dict[str, int | str | bytes] = {}
+
+    # Page metadata of an encrypted notebook.  None if the notebook isn't encrypted, or if the stored
+    # snapshot was stale; in that case, it is rebuilt when the notebook is closed.
+    self.metadataSnapshot: MetadataSnapshot | None = None
+
+    # Page titles, and recently read pages.  Decoded pages are dropped from it whenever they change.
+    self.pageCache = PageCache()
+
+    # Connection tuning, applied whenever a database is opened
+    self.walMode = True
+    self.mmapSize = kDefaultMmapSize
+    self.cacheSize = kDefaultCacheSize
+
+  def setTuning(self, walMode: bool, mmapSizeMb: int, cacheSizeMb: int) -> None:
+    """Sets the connection tuning to apply the next time a database is opened.
+
+    Args:
+        walMode (bool): Use write-ahead logging.  This makes commits cheaper, and lets reads proceed
+                        while a write is in progress.  It should be turned off for notebooks stored on
+                        network drives.
+        mmapSizeMb (int): Size of the memory map used for reading, in megabytes.  0 turns off memory mapping.
+        cacheSizeMb (int): Size of the SQLite page cache, in megabytes.
+    """
+    self.walMode = walMode
+    self.mmapSize = max(mmapSizeMb, 0) * 1024 * 1024
+    self.cacheSize = max(cacheSizeMb, 1) * 1024
 
   def openDatabase(self, pathName) -> bool:
     self.encrypter.clear()
     return self.open(pathName)
 
   def open(self, pathName) -> bool:
-    self.db = QtSql.QSqlDatabase.addDatabase("QSQLITE")
+    self.clearStatementCache()
+    self.db = self.addConnection()
     p = Path(pathName)
     dbExists = p.is_file()
 
     self.db.setDatabaseName(pathName)
+    self.searchIndexAvailable = False
 
     if self.db.open():
+      self.applyTuning()
+
       if dbExists:
         logging.info("Database open")
-        self.updateDatabase()
+        self.loadGlobals()
+
+        if not self.updateDatabase():
+          logging.error(f'Could not update the database at {pathName} to the current version')
+          self.close()
+          return False
+
+        self.initSearchIndex()
         return True
       else:
         # Create the database, and all tables
@@ -62,6 +142,28 @@ class Database:
       logging.error("Could not open database")
       return False
 
+  def addConnection(self) -> QtSql.QSqlDatabase:
+    if self.connectionName is None:
+      return QtSql.QSqlDatabase.addDatabase("QSQLITE")
+    else:
+      return QtSql.QSqlDatabase.addDatabase("QSQLITE", self.connectionName)
+
+  def openConnection(self, pathName) -> bool:
+    """ Opens an additional connection to a notebook that is already open, and up to date, on another
+        connection.  Must be called on the thread that will use the connection. """
+    self.clearStatementCache()
+    self.db = self.addConnection()
+    self.db.setDatabaseName(pathName)
+
+    if not self.db.open():
+      logging.error(f'Could not open connection {self.connectionName}')
+      return False
+
+    self.applyTuning()
+    self.loadGlobals()
+    self.searchIndexAvailable = not self.isPasswordProtected() and self.tableExists(kSearchIndexTable)
+    return True
+
   def isDatabaseOpen(self):
     if self.db is not None:
       return self.db.isOpen()
@@ -74,23 +176,367 @@ class Database:
 
   def close(self):
     if self.db is not None:
+      if self.connectionName is not None:
+        # Additional connections leave the notebook file to the default connection
+        self.closeConnection()
+        return
+
+      if self.db.isOpen() and self.encrypter.hasPassword():
+        self.saveMetadataSnapshot()
+
+      self.metadataSnapshot = None
+
+      logging.info(f'Page cache: {self.pageCache.hits} hits, {self.pageCache.misses} misses')
+      self.pageCache.clear()
+
+      if self.db.isOpen() and self.walMode:
+        # Fold the write-ahead log back into the notebook file, so the notebook is self-contained once closed
+        self.executeSql("pragma wal_checkpoint(TRUNCATE)", 'close')
+
+      # Prepared statements must be released before their connection is closed
+      self.clearStatementCache()
       self.db.close()
+      self.globals = {}
+
+  def closeConnection(self):
+    self.clearStatementCache()
+    self.db.close()
+    self.db = None
+    self.globals = {}
+    self.pageCache.clear()
+    QtSql.QSqlDatabase.removeDatabase(self.connectionName)
+
+  def cachedQuery(self, sqlStr: str) -> QtSql.QSqlQuery:
+    """ Returns a query prepared with the given SQL text.  The query is prepared the first time it is
+        requested on the current connection, and reused after that.  Bind values as usual; executing the
+        query resets the positional bindings.
+    """
+    queryObj = self.statementCache.get(sqlStr)
+
+    if queryObj is None:
+      queryObj = QtSql.QSqlQuery(self.db)
+      queryObj.prepare(sqlStr)
+      self.statementCache[sqlStr] = queryObj
+    else:
+      # Release the results of the previous execution
+      queryObj.finish()
+
+    return queryObj
+
+  def clearStatementCache(self) -> None:
+    for queryObj in self.statementCache.values():
+      queryObj.finish()
+
+    self.statementCache.clear()
+    self.columnIndexCache.clear()
+
+  def columnIndex(self, queryObj: QtSql.QSqlQuery, fieldName: str) -> int:
+    """ Returns the index of a column in a query's results.  Indexes are looked up once for each SQL text. """
+    columnIndexes = self.columnIndexCache.setdefault(queryObj.lastQuery(), {})
+    fieldIndex = columnIndexes.get(fieldName)
+
+    if fieldIndex is None:
+      fieldIndex = queryObj.record().indexOf(fieldName)
+      columnIndexes[fieldName] = fieldIndex
+
+    return fieldIndex
+
+  def applyTuning(self) -> None:
+    """ Applies the connection tuning settings to the open database. """
+    pragmas = [
+      f"pragma journal_mode={'WAL' if self.walMode else 'DELETE'}",
+      "pragma synchronous=NORMAL" if self.walMode else "pragma synchronous=FULL",
+      f"pragma mmap_size={self.mmapSize}",
+      f"pragma cache_size=-{self.cacheSize}",        # A negative value is a size in kilobytes, rather than a number of pages
+      "pragma temp_store=MEMORY",
+      f"pragma busy_timeout={kBusyTimeout}"
+    ]
+
+    for pragma in pragmas:
+      self.executeSql(pragma, 'applyTuning')
 
   def reportError(self, errorMessage):
     logging.error(errorMessage)
+    self.failTransaction()
+
+  def failTransaction(self) -> None:
+    """ Marks the innermost open transaction so that it is rolled back when its block ends. """
+    if len(self.transactionFailures) > 0:
+      self.transactionFailures[-1] = True
+
+  @contextmanager
+  def transaction(self):
+    """ Makes the writes done in a with-block a single atomic commit:
+
+          with self.db.transaction():
+            ...
 
-  def updateDatabase(self):
-    """ Updates the database to the current version. """
-    # Nothing to do at this point.
-    pass
+        Blocks can be nested; an inner block is a savepoint in the outermost transaction.  A block is
+        rolled back if it raises an exception, or if a database error is reported while it runs.
+    """
+    level = len(self.transactionFailures)
+    savepointName = f'level{level}'
+
+    if level == 0:
+      began = self.db.transaction()
+    else:
+      began = self.executeSql(f"savepoint {savepointName}", 'transaction')
+
+    if not began:
+      logging.error(f'[Database.transaction] Could not begin a transaction at level {level}; continuing without one')
+      yield
+      return
+
+    self.transactionFailures.append(False)
+
+    try:
+      yield
+    except:
+      self.transactionFailures.pop()
+      self.endTransaction(level, savepointName, False)
+      raise
+
+    failed = self.transactionFailures.pop()
+    self.endTransaction(level, savepointName, not failed)
+
+  def endTransaction(self, level: int, savepointName: str, commit: bool) -> None:
+    if level == 0:
+      if commit:
+        if not self.db.commit():
+          logging.error(f'[Database.endTransaction] Commit failed: {self.db.lastError().text()}')
+          self.db.rollback()
+          self.discardUncommittedState()
+      else:
+        logging.info('[Database.endTransaction] Rolling back transaction')
+        self.db.rollback()
+        self.discardUncommittedState()
+    else:
+      if not commit:
+        logging.info(f'[Database.endTransaction] Rolling back to savepoint {savepointName}')
+        self.executeSql(f"rollback to savepoint {savepointName}", 'endTransaction')
+        self.discardUncommittedState()
+
+      self.executeSql(f"release savepoint {savepointName}", 'endTransaction')
+
+  def discardUncommittedState(self) -> None:
+    """ Drops in-memory state that may include changes that were rolled back. """
+    self.loadGlobals()
+    self.metadataSnapshot = None
+    self.pageCache.clearDecodedPages()
+
+  def updateDatabase(self) -> bool:
+    """ Updates the database to the current version.  Each migration newer than the version stored in
+        the database is applied in order, in its own transaction, along with the new version number. """
+    storedVersion = self.getGlobalValue(kDatabaseVersionId)
+    databaseVersion = storedVersion if isinstance(storedVersion, int) else 0   # Notebooks without a version are version 0
+
+    for version, migration in self.migrations():
+      if version <= databaseVersion:
+        continue
+
+      logging.info(f'Updating database from version {databaseVersion} to version {version}')
+
+      with self.transaction():
+        success = migration() and self.setGlobalValue(kDatabaseVersionId, version)
+
+        if not success:
+          self.reportError(f'[Database.updateDatabase] Could not update database to version {version}')
+
+      if not success:
+        return False
+
+      databaseVersion = version
+
+    return True
+
+  def migrations(self) -> list[tuple[int, Callable[[], bool]]]:
+    """ Returns the database migrations, in the order in which they must be applied.  Each one is keyed
+        on the database version it produces.  Add new migrations to the end of this list. """
+    return [
+      (1, self.migrateAddIndexes),
+      (2, self.migrateAddSortKeys),
+      (3, self.migrateContentAddressedImages),
+      (4, self.migrateAddImageRenditions),
+    ]
+
+  def migrateAddIndexes(self) -> bool:
+    """ Version 1: adds indexes for looking up pages by parent, favorite status and modification date,
+        and additional data by parent page. """
+    statements = [
+      "create index if not exists pages_parentid on pages (parentid)",
+      "create index if not exists pages_isfavorite on pages (isfavorite)",
+      "create index if not exists pages_lastmodified on pages (lastmodified)",
+      f"create index if not exists {kAdditionalDataTable}_parentid on {kAdditionalDataTable} (parentid)",
+      "analyze"
+    ]
+
+    for statement in statements:
+      if not self.executeSql(statement, 'migrateAddIndexes'):
+        return False
+
+    return True
+
+  def migrateAddSortKeys(self) -> bool:
+    """ Adds a sort key to each page, which gives the page's position among its siblings.  This replaces
+        the page order string; the sort keys are numbered from it, and it is then removed. """
+    if not self.executeSql("alter table pages add column sortkey integer default 0", 'migrateAddSortKeys'):
+      return False
+
+    pagesAndParents, success = self.getAllPageIdsAndParents()
+
+    if not success:
+      return False
+
+    pageOrderStr = self.getGlobalValue(kPageOrderKey)
+    pageOrder = []
+
+    if isinstance(pageOrderStr, str):
+      pageOrder = [int(pageIdStr) for pageIdStr in deDupeList(pageOrderStr.split(',')) if pageIdStr.strip().isdigit()]
+
+    if not self.setPageSortKeys(sortKeysFromPageOrder(pagesAndParents, pageOrder)):
+      return False
+
+    if not self.executeSql("create index if not exists pages_parentid_sortkey on pages (parentid, sortkey)", 'migrateAddSortKeys'):
+      return False
+
+    return self.deleteGlobalValue(kPageOrderKey)
+
+  def migrateContentAddressedImages(self) -> bool:
+    """ Stores images by the hash of their contents, with a count of the image names that refer to each one,
+        and adds the table that maps image names to hashes.  Existing images become one stored image per
+        distinct content. """
+    statements = [
+      f"create table {kImageNamesTable} (itemid text UNIQUE, pageid integer, imagehash text)",
+      f"create index if not exists {kImageNamesTable}_pageid on {kImageNamesTable} (pageid)",
+      f"create index if not exists {kImageNamesTable}_imagehash on {kImageNamesTable} (imagehash)",
+      f"alter table {kAdditionalDataTable} add column format text",
+      f"alter table {kAdditionalDataTable} add column refcount integer default 0"
+    ]
+
+    for statement in statements:
+      if not self.executeSql(statement, 'migrateContentAddressedImages'):
+        return False
+
+    queryObj = QtSql.QSqlQuery(self.db)
+    queryObj.prepare(f"select itemid, parentid from {kAdditionalDataTable} where type=?")
+    queryObj.addBindValue(kImageData)
+
+    queryObj.exec_()
+
+    # Check for errors
+    sqlErr = queryObj.lastError()
+
+    if sqlErr.type() != QtSql.QSqlError.ErrorType.NoError:
+      self.reportError(f'[Database.migrateContentAddressedImages] error: {sqlErr.text()}')
+      return False
+
+    imageList = []
+
+    while queryObj.next():
+      imageList.append((unknownToString(queryObj.value(0)), queryObj.value(1)))
+
+    queryObj.finish()
+
+    # Each image is read, removed, and stored again under its hash.  They are read one at a time, so that they
+    # are not all in memory at once.  Existing images were always stored as PNG.
+    for imageName, pageId in imageList:
+      contentsQuery = self.cachedQuery(f"select contents from {kAdditionalDataTable} where itemid=?")
+      contentsQuery.addBindValue(imageName)
+
+      contentsQuery.exec_()
+
+      if not contentsQuery.first():
+        self.reportError(f'[Database.migrateContentAddressedImages] could not read image {imageName}: {contentsQuery.lastError().text()}')
+        return False
+
+      imageData = unknownToBytes(contentsQuery.value(0))
+      contentsQuery.finish()
+
+      deleteQuery = self.cachedQuery(f"delete from {kAdditionalDataTable} where itemid=?")
+      deleteQuery.addBindValue(imageName)
+
+      deleteQuery.exec_()
+
+      # Check for errors
+      sqlErr = deleteQuery.lastError()
+
+      if sqlErr.type() != QtSql.QSqlError.ErrorType.NoError:
+        self.reportError(f'[Database.migrateContentAddressedImages] error: {sqlErr.text()}')
+        return False
+
+      if not self.addImage(imageName, imageData, 'PNG', pageId):
+        return False
+
+    return True
+
+  def migrateAddImageRenditions(self) -> bool:
+    """ Adds a downscaled copy of each large image, which is shown in pages instead of the full-size image. """
+    statements = [
+      f"alter table {kAdditionalDataTable} add column rendition blob",
+      f"alter table {kAdditionalDataTable} add column renditionformat text"
+    ]
+
+    for statement in statements:
+      if not self.executeSql(statement, 'migrateAddImageRenditions'):
+        return False
+
+    queryObj = QtSql.QSqlQuery(self.db)
+    queryObj.prepare(f"select itemid from {kAdditionalDataTable} where type=?")
+    queryObj.addBindValue(kImageData)
+
+    queryObj.exec_()
+
+    # Check for errors
+    sqlErr = queryObj.lastError()
+
+    if sqlErr.type() != QtSql.QSqlError.ErrorType.NoError:
+      self.reportError(f'[Database.migrateAddImageRenditions] error: {sqlErr.text()}')
+      return False
+
+    imageHashes = []
+
+    while queryObj.next():
+      imageHashes.append(unknownToString(queryObj.value(0)))
+
+    queryObj.finish()
+
+    # Images are read one at a time, so that they are not all in memory at once
+    for imageHash in imageHashes:
+      contentsQuery = self.cachedQuery(f"select contents from {kAdditionalDataTable} where itemid=?")
+      contentsQuery.addBindValue(imageHash)
+
+      contentsQuery.exec_()
+
+      if not contentsQuery.first():
+        self.reportError(f'[Database.migrateAddImageRenditions] could not read image {imageHash}: {contentsQuery.lastError().text()}')
+        return False
+
+      imageData = unknownToBytes(contentsQuery.value(0))
+      contentsQuery.finish()
+
+      rendition = createImageRendition(imageData)
+
+      if rendition is not None and not self.setImageRendition(imageHash, rendition[0], rendition[1]):
+        return False
+
+    return True
 
   def createNewDatabase(self):
-    # Create database tables
+    # Create database tables.  These are the tables as they were in version 0 of the database; the
+    # migrations bring them up to the current version.
     globalsTableSuccess = self.createGlobalsTable()
     pagesTableSuccess = self.createPagesTable()
     additionalDataTableSuccess = self.createAdditionalDataTable()
 
-    return globalsTableSuccess and pagesTableSuccess and additionalDataTableSuccess
+    if not (globalsTableSuccess and pagesTableSuccess and additionalDataTableSuccess):
+      return False
+
+    self.globals = {}
+
+    # The search index is optional; a notebook without one is searched page by page.
+    self.searchIndexAvailable = self.createSearchIndexTable()
+
+    return self.updateDatabase()
 
   def createGlobalsTable(self):
     """ Creates the globals table. """
@@ -134,9 +580,51 @@ class Database:
 
     return self.createTable(createStr)
 
+  def createSearchIndexTable(self):
+    """ Creates the full-text search index.  The rowid of each entry is the page ID.  The trigram
+        tokenizer allows substring searches, which is how searching has always behaved. """
+    createStr = f"create virtual table {kSearchIndexTable} using fts5("
+    createStr += "pagetitle, "
+    createStr += "contents, "          # Plain text of the page (ie, without HTML markup)
+    createStr += "tags, "
+    createStr += "tokenize='trigram'"
+    createStr += ")"
+
+    return self.executeSql(createStr, 'createSearchIndexTable')
+
+  def tableExists(self, tableName: str) -> bool:
+    queryObj = QtSql.QSqlQuery(self.db)
+    queryObj.prepare("select name from sqlite_master where name=?")
+    queryObj.addBindValue(tableName)
+
+    queryObj.exec_()
+
+    # Check for errors
+    sqlErr = queryObj.lastError()
+
+    if sqlErr.type() != QtSql.QSqlError.ErrorType.NoError:
+      self.reportError(f'[Database.tableExists] error: {sqlErr.text()}')
+      return False
+
+    return queryObj.first()
+
+  def executeSql(self, sqlStr: str, context: str) -> bool:
+    """ Executes a statement that takes no parameters and returns no data. """
+    queryObj = QtSql.QSqlQuery(self.db)
+    queryObj.prepare(sqlStr)
+    queryObj.exec_()
+
+    # Check for errors
+    sqlErr = queryObj.lastError()
+
+    if sqlErr.type() != QtSql.QSqlError.ErrorType.NoError:
+      self.reportError(f'[Database.{context}] error: {sqlErr.text()}')
+      return False
+
+    return True
 
   def createTable(self, creationStr: str):
-    queryObj = QtSql.QSqlQuery()
+    queryObj = QtSql.QSqlQuery(self.db)
     queryObj.prepare(creationStr)
     queryObj.exec_()
 
@@ -158,6 +646,7 @@ class Database:
 
     if salt is not None and isinstance(salt, bytes):
       self.encrypter.setPasswordAndSalt(plainTextPassword, salt)
+      self.loadMetadataSnapshot()
 
   def storePasswordInDatabase(self, plainTextPassword) -> None:
     """ Sets the password for a new log file.  The salt is generated here. """
@@ -169,6 +658,201 @@ class Database:
         self.setGlobalValue(kHashedPwFieldName, hashedPassword)
         self.setGlobalValue(kSaltFieldName, self.encrypter.salt)
 
+        # Password protected notebooks are not indexed
+        self.searchIndexAvailable = False
+        self.executeSql(f"drop table if exists {kSearchIndexTable}", 'storePasswordInDatabase')
+
+  def pageTableSignature(self) -> str | None:
+    """ Returns a summary of the pages table that changes whenever a page is added, removed, moved, renamed or
+        saved.  It is used to tell whether the metadata snapshot is up to date. """
+    queryObj = QtSql.QSqlQuery(self.db)
+    queryObj.prepare("select count(*), total(lastmodified), total(parentid), total(sortkey), "
+                     "(select coalesce(max(intval), 0) from globals where key=?) from pages")
+    queryObj.addBindValue(kPageWriteCountKey)
+
+    queryObj.exec_()
+
+    # Check for errors
+    sqlErr = queryObj.lastError()
+
+    if sqlErr.type() != QtSql.QSqlError.ErrorType.NoError:
+      self.reportError(f'[Database.pageTableSignature] error: {sqlErr.text()}')
+      return None
+
+    if not queryObj.first():
+      return None
+
+    return ':'.join(str(queryObj.value(i)) for i in range(5))
+
+  def countPageWrite(self) -> bool:
+    """ Increases the page write count.  It is incremented in the database, rather than with setGlobalValue,
+        because each connection has its own copy of the global values. """
+    queryObj = self.cachedQuery("insert into globals (key, datatype, intval) values (?, ?, 1) "
+                                "on conflict(key) do update set intval=intval+1")
+    queryObj.addBindValue(kPageWriteCountKey)
+    queryObj.addBindValue(kDataTypeInteger)
+
+    queryObj.exec_()
+
+    # Check for errors
+    sqlErr = queryObj.lastError()
+
+    if sqlErr.type() != QtSql.QSqlError.ErrorType.NoError:
+      self.reportError(f'[Database.countPageWrite] error: {sqlErr.text()}')
+      return False
+
+    return True
+
+  def loadMetadataSnapshot(self) -> None:
+    """ Decrypts the metadata snapshot, if there is one and it is up to date.  Otherwise, page metadata is
+        read from the pages table, and the snapshot is rebuilt when the notebook is closed. """
+    self.metadataSnapshot = None
+
+    snapshotData = self.getGlobalValue(kMetadataSnapshotKey)
+
+    if not isinstance(snapshotData, bytes):
+      return
+
+    try:
+      snapshot = MetadataSnapshot.fromJson(self.encrypter.decrypt(snapshotData))
+    except DecryptionErrors:
+      logging.error('[Database.loadMetadataSnapshot] The metadata snapshot could not be decrypted')
+      return
+
+    if snapshot is not None and snapshot.signature == self.pageTableSignature():
+      self.metadataSnapshot = snapshot
+    else:
+      logging.info('[Database.loadMetadataSnapshot] The metadata snapshot is stale; reading metadata from the pages')
+
+  def buildMetadataSnapshot(self) -> MetadataSnapshot | None:
+    """ Creates a metadata snapshot from the pages table. """
+    queryObj = QtSql.QSqlQuery(self.db)
+    queryObj.prepare("select pageid, parentid, pagetype, pagetitle, tags, lastmodified, sortkey from pages")
+
+    queryObj.exec_()
+
+    # Check for errors
+    sqlErr = queryObj.lastError()
+
+    if sqlErr.type() != QtSql.QSqlError.ErrorType.NoError:
+      self.reportError(f'[Database.buildMetadataSnapshot] error: {sqlErr.text()}')
+      return None
+
+    rows = []
+    rawValues = []
+
+    while queryObj.next():
+      rows.append((queryObj.value(0), queryObj.value(1), queryObj.value(2), queryObj.value(5), queryObj.value(6)))
+      rawValues.extend([queryObj.value(3), queryObj.value(4)])
+
+    textValues = self.decodeTextFields(rawValues)
+    snapshot = MetadataSnapshot()
+
+    for i, (pageId, parentId, pageType, lastModified, sortKey) in enumerate(rows):
+      snapshot.setPage(pageId, parentId, pageType, textValues[i * 2], textValues[i * 2 + 1], lastModified, sortKey)
+
+    return snapshot
+
+  def saveMetadataSnapshot(self) -> bool:
+    """ Writes the metadata snapshot, if it has changed. """
+    snapshot = self.metadataSnapshot
+
+    if snapshot is None:
+      snapshot = self.buildMetadataSnapshot()
+
+      if snapshot is None:
+        return False
+    elif not snapshot.modified:
+      return True
+
+    signature = self.pageTableSignature()
+
+    if signature is None:
+      return False
+
+    snapshot.signature = signature
+
+    if not self.setGlobalValue(kMetadataSnapshotKey, self.encrypter.encrypt(snapshot.toJson())):
+      return False
+
+    snapshot.modified = False
+    return True
+
+  def upgradeLegacyEncryption(self, maxPages: int) -> int:
+    """Re-encrypts pages whose title, contents or tags are still stored as Fernet tokens, using the
+    storage envelope.
+
+    Args:
+        maxPages (int): Maximum number of pages to convert in this call
+
+    Returns:
+        int: Number of pages converted.  0 once there are none left, or -1 if an error occurred.
+    """
+    if not self.encrypter.hasPassword():
+      return 0
+
+    # Fernet tokens start with 'g' (0x67); envelopes start with their version byte
+    legacyCondition = " or ".join(f"hex(substr({column}, 1, 1)) = '67'" for column in kEncryptedPageColumns)
+
+    # The rows are read and written in one transaction, and each value is only replaced if it is still the one
+    # that was read, so that a page saved through another connection in the meantime isn't overwritten
+    with self.transaction():
+      queryObj = QtSql.QSqlQuery(self.db)
+      queryObj.prepare(f"select pageid, pagetitle, contents, tags from pages where {legacyCondition} limit ?")
+      queryObj.addBindValue(maxPages)
+
+      queryObj.exec_()
+
+      # Check for errors
+      sqlErr = queryObj.lastError()
+
+      if sqlErr.type() != QtSql.QSqlError.ErrorType.NoError:
+        self.reportError(f'[Database.upgradeLegacyEncryption] error: {sqlErr.text()}')
+        return -1
+
+      pageIdList = []
+      rawValues = []
+
+      while queryObj.next():
+        pageIdList.append(queryObj.value(0))
+        rawValues.extend([unknownToBytes(queryObj.value(1)), unknownToBytes(queryObj.value(2)), unknownToBytes(queryObj.value(3))])
+
+      queryObj.finish()
+
+      if len(pageIdList) == 0:
+        return 0
+
+      # Only the legacy values are decrypted, re-encrypted and written; values already in an envelope are left alone
+      legacyIndexes = [i for i, rawValue in enumerate(rawValues) if self.encrypter.isLegacyValue(rawValue)]
+      decryptedValues = self.encrypter.decryptMany([rawValues[i] for i in legacyIndexes])
+      columns = ['pagetitle', 'contents', 'tags']
+
+      for i, decryptedValue in zip(legacyIndexes, decryptedValues):
+        column = columns[i % 3]
+        pageId = pageIdList[i // 3]
+
+        if column == 'contents':
+          # Contents are compressed on the way
+          newValue = self.encrypter.encryptBytes(encodeContents(decryptedValue))
+        else:
+          newValue = self.encrypter.encrypt(decryptedValue)
+
+        updateQuery = self.cachedQuery(f"update pages set {column}=? where pageid=? and {column}=?")
+        updateQuery.addBindValue(toQByteArray(newValue))
+        updateQuery.addBindValue(pageId)
+        updateQuery.addBindValue(toQByteArray(rawValues[i]))
+
+        updateQuery.exec_()
+
+        # Check for errors
+        sqlErr = updateQuery.lastError()
+
+        if sqlErr.type() != QtSql.QSqlError.ErrorType.NoError:
+          self.reportError(f'[Database.upgradeLegacyEncryption] page {pageId}: {sqlErr.text()}')
+          return -1
+
+      return len(pageIdList)
+
   def passwordMatch(self, password) -> bool:
     storedHashedPassword = self.getGlobalValue(kHashedPwFieldName)
 
@@ -190,15 +874,19 @@ class Database:
     Returns:
         _type_: string or unknown
     """
-    fieldIndex = queryObj.record().indexOf(fieldName)
+    fieldIndex = self.columnIndex(queryObj, fieldName)
 
     # Take encryption into account.
     rawValue = queryObj.value(fieldIndex)
 
+    if fieldName == 'contents':
+      # Contents may also be compressed
+      return self.decodeContentsFields([rawValue])[0]
+
     if self.encrypter.hasPassword():
       # Encypted database
       # Only contents, pagetitle, and tags are encrypted
-      if fieldName == 'contents' or fieldName == 'pagetitle' or fieldName == 'tags':
+      if fieldName in kEncryptedPageColumns:
         # Decrypt the field
         rawValueBytes = unknownToBytes(rawValue)
         decryptedValue = self.encrypter.decrypt(rawValueBytes)
@@ -210,11 +898,13 @@ class Database:
         return rawValue
       return unknownToString(rawValue)
 
-  def getGlobalValue(self, key: str) -> int | str | bytes | None:
-    """ Returns the value of a 'global value' for the given key. """
-    queryObj = QtSql.QSqlQuery()
-    queryObj.prepare("select datatype from globals where key = ?")
-    queryObj.bindValue(0, key)
+  def loadGlobals(self) -> bool:
+    """ Reads the whole globals table into memory.  Global values are read from memory after this, and
+        written through to the database when they change. """
+    self.globals = {}
+
+    queryObj = QtSql.QSqlQuery(self.db)
+    queryObj.prepare("select key, datatype, intval, stringval, blobval from globals")
 
     queryObj.exec_()
 
@@ -222,117 +912,82 @@ class Database:
     sqlErr = queryObj.lastError()
 
     if sqlErr.type() != QtSql.QSqlError.ErrorType.NoError:
-      self.reportError("Error when attempting to retrieve a global value key: {}".format(sqlErr.text()))
-      return None
+      self.reportError("Error when attempting to load global values: {}".format(sqlErr.text()))
+      return False
 
-    if queryObj.next():
-      typeField = queryObj.record().indexOf("datatype")
+    keyField = self.columnIndex(queryObj, "key")
+    typeField = self.columnIndex(queryObj, "datatype")
+    intField = self.columnIndex(queryObj, "intval")
+    stringField = self.columnIndex(queryObj, "stringval")
+    blobField = self.columnIndex(queryObj, "blobval")
 
+    while queryObj.next():
+      key = str(queryObj.value(keyField))
       dataType = queryObj.value(typeField)
-    else:
-      # key not found
-      return None
-
-    if dataType == kDataTypeInteger:
-      createStr = "select intval from globals where key=?"
-    elif dataType == kDataTypeString:
-      createStr = "select stringval from globals where key=?"
-    elif dataType == kDataTypeBlob:
-      createStr = "select blobval from globals where key=?"
-    else:
-      # Unknown data type
-      self.reportError("getGlobalValue: unknown data type: {}".format(dataType))
-      return None
 
-    # Now that the data type is known, retrieve the data itself.
-    queryObj.prepare(createStr)
-    queryObj.bindValue(0, key)
-
-    queryObj.exec_()
-
-    # Check for errors
-    sqlErr = queryObj.lastError()
-    if sqlErr.type() != QtSql.QSqlError.ErrorType.NoError:
-      self.reportError("Error when attempting to retrieve a page: {}".format(sqlErr.text()))
-      return None
-
-    if queryObj.next():
       if dataType == kDataTypeInteger:
-        valueField = queryObj.record().indexOf("intval")
+        self.globals[key] = queryObj.value(intField)
       elif dataType == kDataTypeString:
-        valueField = queryObj.record().indexOf("stringval")
+        self.globals[key] = str(queryObj.value(stringField))
       elif dataType == kDataTypeBlob:
-        valueField = queryObj.record().indexOf("blobval")
+        value = queryObj.value(blobField)
+        self.globals[key] = qByteArrayToBytes(value) if isinstance(value, QtCore.QByteArray) else value
       else:
-        return None
-
-      value = queryObj.value(valueField)
+        logging.error(f'[Database.loadGlobals] Unknown data type {dataType} for global value {key}')
 
-      if isinstance(value, QtCore.QByteArray):
-        value = qByteArrayToBytes(value)
-
-      return value
+    return True
 
-  def setGlobalValue(self, key: str, value: int | str | bytes) -> bool:
-    """ Sets the value of the given key to the given value. """
+  def decodeTextFields(self, rawValues: list) -> list[str]:
+    """ Converts raw values of the contents, pagetitle or tags columns, as read from many rows, to strings.
+        In an encrypted notebook, the values are decrypted in parallel.
+    """
+    if self.encrypter.hasPassword():
+      return self.encrypter.decryptMany([unknownToBytes(rawValue) for rawValue in rawValues])
+    else:
+      return [unknownToString(rawValue) for rawValue in rawValues]
 
-    # See if the key exists
-    queryObj = QtSql.QSqlQuery()
-    queryObj.prepare("select datatype from globals where key = ?")
-    queryObj.bindValue(0, key)
+  def decodeContentsFields(self, rawValues: list) -> list[str]:
+    """ Converts raw values of the contents column to strings, decrypting and decompressing them as needed. """
+    storedValues = [unknownToBytes(rawValue) for rawValue in rawValues]
 
-    queryObj.exec_()
+    if self.encrypter.hasPassword():
+      storedValues = self.encrypter.decryptManyBytes(storedValues)
 
-    # Check for errors
-    sqlErr = queryObj.lastError()
+    return [decodeContents(storedValue) for storedValue in storedValues]
 
-    if sqlErr.type() != QtSql.QSqlError.ErrorType.NoError:
-      self.reportError("Error when attempting to determine if a global value exists: {}".format(sqlErr.text()))
-      return False
+  def getGlobalValue(self, key: str) -> int | str | bytes | None:
+    """ Returns the value of a 'global value' for the given key. """
+    return self.globals.get(key)
 
-    valueToStore = value
+  def setGlobalValue(self, key: str, value: int | str | bytes) -> bool:
+    """ Sets the value of the given key to the given value.  Nothing is written if the value is unchanged. """
+    currentValue = self.globals.get(key)
 
-    if queryObj.next():
-      # Key exists; update its value
-      if isinstance(value, int):
-        createStr = "update globals set intval=? where key=?"
-      elif isinstance(value, str):
-        createStr = "update globals set stringval=? where key=?"
-      elif isinstance(value, bytes):
-        createStr = "update globals set blobval=? where key=?"
-        # Must convert to a QByteArray
-        valueToStore = toQByteArray(value)
-      else:
-        self.reportError("setGlobalValue: invalid data type")
-        return False
+    if currentValue is not None and type(currentValue) is type(value) and currentValue == value:
+      return True
 
-      queryObj.prepare(createStr)
-      queryObj.addBindValue(valueToStore)
-      queryObj.addBindValue(key)
+    if isinstance(value, int):
+      dataType = kDataTypeInteger
+      columnValues = [value, None, None]
+    elif isinstance(value, str):
+      dataType = kDataTypeString
+      columnValues = [None, value, None]
+    elif isinstance(value, bytes):
+      dataType = kDataTypeBlob
+      # Must convert to a QByteArray
+      columnValues = [None, None, toQByteArray(value)]
     else:
-      # Key does not exist - create it
-      if isinstance(value, int):
-        createStr = "insert into globals (key, datatype, intval) values (?, ?, ?)"
-        dataType = kDataTypeInteger
-      elif isinstance(value, str):
-        createStr = "insert into globals (key, datatype, stringval) values (?, ?, ?)"
-        dataType = kDataTypeString
-      elif isinstance(value, bytes):
-        createStr = "insert into globals (key, datatype, blobval) values (?, ?, ?)"
-        dataType = kDataTypeBlob
-
-        # Must convert to a QByteArray
-        valueAsBytes = toQByteArray(value)
-        valueToStore = valueAsBytes
-      else:
-        self.reportError("setGlobalValue: invalid data type")
-        return False
+      self.reportError("setGlobalValue: invalid data type")
+      return False
 
-      queryObj.prepare(createStr)
+    queryObj = self.cachedQuery("insert into globals (key, datatype, intval, stringval, blobval) values (?, ?, ?, ?, ?) "
+                                "on conflict(key) do update set datatype=excluded.datatype, intval=excluded.intval, "
+                                "stringval=excluded.stringval, blobval=excluded.blobval")
+    queryObj.addBindValue(key)
+    queryObj.addBindValue(dataType)
 
-      queryObj.addBindValue(key)
-      queryObj.addBindValue(dataType)
-      queryObj.addBindValue(valueToStore)
+    for columnValue in columnValues:
+      queryObj.addBindValue(columnValue)
 
     queryObj.exec_()
 
@@ -343,13 +998,15 @@ class Database:
       self.reportError("Error when attempting to set a global value: {}".format(sqlErr.text()))
       return False
 
+    self.globals[key] = value
     return True
 
+  def deleteGlobalValue(self, key: str) -> bool:
+    """ Removes a global value, if it exists. """
+    if key not in self.globals:
+      return True
 
-  def globalValueExists(self, key):
-    """ Checks if a global value exists. """
-    queryObj = QtSql.QSqlQuery()
-    queryObj.prepare("select datatype from globals where key=?")
+    queryObj = self.cachedQuery("delete from globals where key=?")
     queryObj.addBindValue(key)
 
     queryObj.exec_()
@@ -358,10 +1015,15 @@ class Database:
     sqlErr = queryObj.lastError()
 
     if sqlErr.type() != QtSql.QSqlError.ErrorType.NoError:
+      self.reportError("Error when attempting to delete a global value: {}".format(sqlErr.text()))
       return False
-    else:
-      atLeastOne = queryObj.next()
-      return atLeastOne
+
+    del self.globals[key]
+    return True
+
+  def globalValueExists(self, key):
+    """ Checks if a global value exists. """
+    return key in self.globals
 
   def getPageHistory(self) -> str | None:
     pageHistory = self.getGlobalValue(kPageHistoryKey)
@@ -370,20 +1032,8 @@ class Database:
   def setPageHistory(self, pageHistoryStr) -> bool:
     return self.setGlobalValue(kPageHistoryKey, pageHistoryStr)
 
-  def setPageOrder(self, pageOrderStr) -> bool:
-    return self.setGlobalValue(kPageOrderKey, pageOrderStr)
-
-  def getPageOrder(self) -> str | None:
-    pageOrder = str(self.getGlobalValue(kPageOrderKey))
-
-    if pageOrder is not None:
-      return pageOrder
-    else:
-      return None
-
   def pageExists(self, pageId: ENTITY_ID) -> bool:
-    queryObj = QtSql.QSqlQuery()
-    queryObj.prepare("select pageid from pages where pageid=?")
+    queryObj = self.cachedQuery("select pageid from pages where pageid=?")
     queryObj.addBindValue(pageId)
 
     queryObj.exec_()
@@ -396,14 +1046,14 @@ class Database:
       return False
 
     # If queryObj.first() returns False, then the page doesn't exist
-    if not queryObj.first():
-      return False
-    else:
-      return True
+    pageFound = queryObj.first()
+    queryObj.finish()
+
+    return pageFound
 
   def getAllPageIdsAndParents(self) -> tuple[ENTITY_PAIR_LIST, bool]:
     """ Retrieves page IDs and the parent IDs. """
-    queryObj = QtSql.QSqlQuery()
+    queryObj = QtSql.QSqlQuery(self.db)
     queryObj.prepare("select pageid, parentid from pages")
 
     queryObj.exec_()
@@ -427,43 +1077,74 @@ class Database:
     return (pageList, True)
 
   def getPageList(self) -> tuple[PageDataDict, bool]:
-    queryObj = QtSql.QSqlQuery()
-    queryObj.prepare("select pageid, parentid, pagetitle, lastmodified, pagetype from pages order by pagetitle asc")
+    if self.metadataSnapshot is not None:
+      return (self.metadataSnapshot.pageDict(), True)
+
+    queryObj = QtSql.QSqlQuery(self.db)
+    queryObj.prepare("select pageid, parentid, pagetitle, lastmodified, pagetype, sortkey from pages order by pagetitle asc")
+
+    return self.readPageList(queryObj, 'getPageList')
+
+  def getTopLevelPageList(self, extraPageId: ENTITY_ID = kInvalidPageId) -> tuple[PageDataDict, bool]:
+    """ Returns the top-level pages, plus the page extraPageId (such as the last viewed page), in the form
+        returned by getPageList.  This is enough to show a notebook before the rest of its pages are read. """
+    if self.metadataSnapshot is not None:
+      return (self.metadataSnapshot.topLevelPageDict(extraPageId), True)
 
+    queryObj = QtSql.QSqlQuery(self.db)
+    queryObj.prepare("select pageid, parentid, pagetitle, lastmodified, pagetype, sortkey from pages where parentid=? or pageid=?")
+    queryObj.addBindValue(kInvalidPageId)
+    queryObj.addBindValue(extraPageId)
+
+    return self.readPageList(queryObj, 'getTopLevelPageList')
+
+  def readPageList(self, queryObj: QtSql.QSqlQuery, functionName: str) -> tuple[PageDataDict, bool]:
+    """ Runs a prepared page list query. """
     queryObj.exec_()
 
     # Check for errors
     sqlErr = queryObj.lastError()
 
     if sqlErr.type() != QtSql.QSqlError.ErrorType.NoError:
-      self.reportError(f'getPageList error: {sqlErr.text()}')
+      self.reportError(f'{functionName} error: {sqlErr.text()}')
       return ({}, False)
 
-    pageDict = {}
-
-    while queryObj.next():
-      pageIdField = queryObj.record().indexOf('pageid')
-      parentIdField = queryObj.record().indexOf('parentid')
-      lastModifiedField = queryObj.record().indexOf('lastmodified')
-      pageTypeField = queryObj.record().indexOf('pagetype')
+    pageList = []
+    rawTitles = []
 
-      # Note: getQueryField takes care of decryption
-      pageTitle = str(self.getQueryField(queryObj, 'pagetitle'))
+    pageIdField = self.columnIndex(queryObj, 'pageid')
+    parentIdField = self.columnIndex(queryObj, 'parentid')
+    pageTitleField = self.columnIndex(queryObj, 'pagetitle')
+    lastModifiedField = self.columnIndex(queryObj, 'lastmodified')
+    pageTypeField = self.columnIndex(queryObj, 'pagetype')
+    sortKeyField = self.columnIndex(queryObj, 'sortkey')
 
+    while queryObj.next():
       newPage = PageData()
 
       newPage.m_pageId = queryObj.value(pageIdField)          # This should be an int
       newPage.m_parentId = queryObj.value(parentIdField)
       newPage.m_modifiedDateTime = datetime.datetime.fromtimestamp(queryObj.value(lastModifiedField))
-      newPage.m_title = pageTitle
       newPage.m_pageType = queryObj.value(pageTypeField)
+      newPage.m_sortKey = queryObj.value(sortKeyField)
+
+      pageList.append(newPage)
+      rawTitles.append(queryObj.value(pageTitleField))
 
+    # The titles are decrypted all at once, rather than row by row
+    pageDict = {}
+
+    for newPage, pageTitle in zip(pageList, self.decodeTextFields(rawTitles)):
+      newPage.m_title = pageTitle
       pageDict[newPage.m_pageId] = newPage
 
     return (pageDict, True)
 
   def getTagList(self) -> tuple[PageIdDict, bool]:
-    queryObj = QtSql.QSqlQuery()
+    if self.metadataSnapshot is not None:
+      return (self.metadataSnapshot.tagDict(), True)
+
+    queryObj = QtSql.QSqlQuery(self.db)
     queryObj.prepare("select pageid, tags from pages")
 
     queryObj.exec_()
@@ -475,15 +1156,21 @@ class Database:
       self.reportError(f'getPageList error: {sqlErr.text()}')
       return ({}, False)
 
-    pageIdDict = {}
+    pageIdList = []
+    rawTags = []
+
+    pageIdField = self.columnIndex(queryObj, 'pageid')
+    tagsField = self.columnIndex(queryObj, 'tags')
 
     while queryObj.next():
-      pageId = int(self.getQueryField(queryObj, 'pageid'))
+      pageIdList.append(int(queryObj.value(pageIdField)))
+      rawTags.append(queryObj.value(tagsField))
 
-      # Note: getQueryField takes care of decryption
-      tagsList = str(self.getQueryField(queryObj, 'tags')).strip()
+    pageIdDict = {}
 
-      tagsArray = stringToArray(tagsList)
+    # The tags are decrypted all at once, rather than row by row
+    for pageId, tagsList in zip(pageIdList, self.decodeTextFields(rawTags)):
+      tagsArray = stringToArray(tagsList.strip())
 
       for tag in tagsArray:
         if pageId in pageIdDict:
@@ -502,8 +1189,7 @@ class Database:
     """
     resultList = []
 
-    queryObj = QtSql.QSqlQuery()
-    queryObj.prepare("select pageid, pagetitle from pages where isfavorite=1")
+    queryObj = self.cachedQuery("select pageid, pagetitle from pages where isfavorite=1")
 
     queryObj.exec_()
 
@@ -514,16 +1200,24 @@ class Database:
       self.reportError(f'[Database.getFavoritePages] error: {sqlErr.text()}')
       return []
 
+    pageIdList = []
+    rawTitles = []
+
+    pageIdField = self.columnIndex(queryObj, 'pageid')
+    pageTitleField = self.columnIndex(queryObj, 'pagetitle')
+
     while queryObj.next():
-      pageId = self.getQueryField(queryObj, 'pageid')
-      pageTitle = unknownToString(self.getQueryField(queryObj, 'pagetitle'))
-      resultList.append((pageId, pageTitle))
+      pageIdList.append(queryObj.value(pageIdField))
+      rawTitles.append(queryObj.value(pageTitleField))
+
+    resultList = list(zip(pageIdList, self.decodeTextFields(rawTitles)))
 
     return resultList
 
   def setPageFavoriteStatus(self, pageId: ENTITY_ID, isFavorite: bool) -> bool:
-    queryObj = QtSql.QSqlQuery()
-    queryObj.prepare("update pages set isfavorite=? where pageid=?")
+    self.pageCache.invalidatePage(pageId)
+
+    queryObj = self.cachedQuery("update pages set isfavorite=? where pageid=?")
     queryObj.addBindValue(isFavorite)
     queryObj.addBindValue(pageId)
 
@@ -539,8 +1233,12 @@ class Database:
     return True
 
   def getPage(self, pageId) -> PageData | None:
-    queryObj = QtSql.QSqlQuery()
-    queryObj.prepare("select pagetype, parentid, contents, pagetitle, tags, created, lastmodified, nummodifications, additionalitems, isfavorite from pages where pageid=?")
+    cachedPage = self.pageCache.getDecodedPage(pageId)
+
+    if cachedPage is not None:
+      return cachedPage
+
+    queryObj = self.cachedQuery("select pagetype, parentid, contents, pagetitle, tags, created, lastmodified, nummodifications, additionalitems, isfavorite from pages where pageid=?")
     queryObj.bindValue(0, pageId)
 
     queryObj.exec_()
@@ -558,13 +1256,13 @@ class Database:
 
     pageData = PageData()
 
-    pageTypeField = queryObj.record().indexOf('pagetype')
-    parentIdField = queryObj.record().indexOf('parentid')
-    createdField = queryObj.record().indexOf('created')
-    lastModifiedDateField = queryObj.record().indexOf('lastmodified')
-    numModificationsField = queryObj.record().indexOf("nummodifications")
-    additionalItemsField = queryObj.record().indexOf("additionalitems")
-    isFavoriteField = queryObj.record().indexOf("isfavorite")
+    pageTypeField = self.columnIndex(queryObj, 'pagetype')
+    parentIdField = self.columnIndex(queryObj, 'parentid')
+    createdField = self.columnIndex(queryObj, 'created')
+    lastModifiedDateField = self.columnIndex(queryObj, 'lastmodified')
+    numModificationsField = self.columnIndex(queryObj, "nummodifications")
+    additionalItemsField = self.columnIndex(queryObj, "additionalitems")
+    isFavoriteField = self.columnIndex(queryObj, "isfavorite")
 
     pageType = queryObj.value(pageTypeField)
     parentId = queryObj.value(parentIdField)
@@ -580,6 +1278,8 @@ class Database:
     pageData.m_tags = str(self.getQueryField(queryObj, 'tags'))
     pageData.m_pageId = pageId
 
+    queryObj.finish()
+
     try:
       pageData.m_pageType = PAGE_TYPE(pageType)
     except ValueError:
@@ -600,21 +1300,63 @@ class Database:
       if len(additionalItems) > 0:
         pageData.m_additionalDataItems = additionalItems.split(',')
 
+    pageData.markClean()
+    self.pageCache.addDecodedPage(pageData)
     return pageData
 
   def getPageTextItems(self, pageId: ENTITY_ID) -> tuple[str, str, str] | None:
     """Gets all text items from a page.  This includes the title, contents, and tags.
 
     Args:
-        pageId (ENTITY_ID): Page ID of page to query
+        pageId (ENTITY_ID): Page ID of page to query
+
+    Returns:
+        tuple[str] | None: List of text from the page: [title, contents, tags] or None
+        if an error occurred.
+    """
+    queryObj = self.cachedQuery("select pagetitle, contents, tags from pages where pageid=?")
+    queryObj.bindValue(0, pageId)
+
+    queryObj.exec_()
+
+    # Check for errors
+    sqlErr = queryObj.lastError()
+
+    if sqlErr.type() != QtSql.QSqlError.ErrorType.NoError:
+      self.reportError(f'[Database.getPageTextItems] error: {sqlErr.text()}')
+      return None
+
+    # If queryObj.first() returns False, then the page doesn't exist
+    if not queryObj.first():
+      return None
+
+    # Note: getQueryField takes care of decryption
+    pageTitle = str(self.getQueryField(queryObj, 'pagetitle'))
+    pageContents = str(self.getQueryField(queryObj, 'contents'))
+    tags = str(self.getQueryField(queryObj, 'tags')).strip()
+
+    queryObj.finish()
+
+    return (pageTitle, pageContents, tags)
+
+  def getPageTextItemsForPages(self, pageIds: ENTITY_LIST) -> dict[ENTITY_ID, tuple[str, str, str]]:
+    """Gets the text items (title, contents and tags) of several pages at once.  In an encrypted notebook,
+    the items are decrypted in parallel.
+
+    Args:
+        pageIds (ENTITY_LIST): Page IDs of the pages to query
 
     Returns:
-        tuple[str] | None: List of text from the page: [title, contents, tags] or None
-        if an error occurred.
+        dict[ENTITY_ID, tuple[str, str, str]]: (title, contents, tags) of each page found, by page ID.
     """
-    queryObj = QtSql.QSqlQuery()
-    queryObj.prepare("select pagetitle, contents, tags from pages where pageid=?")
-    queryObj.bindValue(0, pageId)
+    if len(pageIds) == 0:
+      return {}
+
+    queryObj = QtSql.QSqlQuery(self.db)
+    queryObj.prepare(f"select pageid, pagetitle, contents, tags from pages where pageid in ({', '.join('?' * len(pageIds))})")
+
+    for pageId in pageIds:
+      queryObj.addBindValue(pageId)
 
     queryObj.exec_()
 
@@ -622,47 +1364,81 @@ class Database:
     sqlErr = queryObj.lastError()
 
     if sqlErr.type() != QtSql.QSqlError.ErrorType.NoError:
-      self.reportError(f'[Database.getPageTextItems] error: {sqlErr.text()}')
-      return None
+      self.reportError(f'[Database.getPageTextItemsForPages] error: {sqlErr.text()}')
+      return {}
 
-    # If queryObj.first() returns False, then the page doesn't exist
-    if not queryObj.first():
-      return None
+    pageIdList = []
+    rawValues = []
+    rawContents = []
 
-    # Note: getQueryField takes care of decryption
-    pageTitle = str(self.getQueryField(queryObj, 'pagetitle'))
-    pageContents = str(self.getQueryField(queryObj, 'contents'))
-    tags = str(self.getQueryField(queryObj, 'tags')).strip()
+    while queryObj.next():
+      pageIdList.append(queryObj.value(0))
+      rawValues.extend([queryObj.value(1), queryObj.value(3)])
+      rawContents.append(queryObj.value(2))
 
-    return (pageTitle, pageContents, tags)
+    textValues = self.decodeTextFields(rawValues)
+    contentsValues = self.decodeContentsFields(rawContents)
+    textItems = {}
 
-  def updatePage(self, pageData) -> bool:
-    queryObj = QtSql.QSqlQuery()
-    queryObj.prepare('update pages set contents=?, pagetitle=?, tags=?, lastmodified=?, nummodifications=?, additionalitems=?, isfavorite=? where pageid=?')
+    for i, pageId in enumerate(pageIdList):
+      pageTitle, tags = textValues[i * 2:i * 2 + 2]
+      textItems[pageId] = (pageTitle, contentsValues[i], tags.strip())
 
-    # If this is an encrypted Notebook, encrypt data
-    contentData = unknownToBytes('')
-    titleData = unknownToBytes('')
-    tagsData = unknownToBytes('')
+    return textItems
+
+  def updatePage(self, pageData: PageData) -> bool:
+    """ Saves the fields of a page that have changed, along with its search index entry, in a single transaction. """
+    dirtyColumns = pageData.dirtyColumns()
+
+    if len(dirtyColumns) == 0:
+      return True
+
+    textChanged = any(column in kEncryptedPageColumns for column in dirtyColumns)
+
+    self.pageCache.invalidatePage(pageData.m_pageId)
+
+    with self.transaction():
+      success = self.writePage(pageData, dirtyColumns) and \
+                (not textChanged or self.updateSearchIndex(pageData.m_pageId, pageData.m_title, pageData.m_contentString, pageData.m_tags))
+
+    if success:
+      pageData.markClean()
+
+    return success
+
+  def pageWrittenElsewhere(self, pageData: PageData) -> None:
+    """ Brings the in-memory state up to date after a page was written through another connection. """
+    self.pageCache.invalidatePage(pageData.m_pageId)
+
+    if self.metadataSnapshot is not None:
+      self.metadataSnapshot.updatePage(pageData.m_pageId, title=pageData.m_title, tags=pageData.m_tags,
+                                       lastModified=pageData.m_modifiedDateTime.timestamp())
+
+  def writePage(self, pageData: PageData, columns: list[str]) -> bool:
+    """ Writes the given columns of a page.  Only these columns are encrypted. """
+    setClause = ', '.join(f'{column}=?' for column in columns)
+    queryObj = self.cachedQuery(f'update pages set {setClause} where pageid=?')
+
+    columnValues = pageData.columnValues()
+
+    for column in columns:
+      value = columnValues[column]
+
+      if column in kEncryptedPageColumns:
+        # Contents are compressed before they are encrypted
+        valueBytes = encodeContents(value) if column == 'contents' else bytes(value, 'utf-8')
+
+        # If this is an encrypted Notebook, encrypt data
+        if self.encrypter.hasPassword():
+          valueBytes = self.encrypter.encryptBytes(valueBytes)
+
+        # Bytes data must be converted to a QByteArray before storing
+        value = toQByteArray(valueBytes)
+      elif column == 'lastmodified':
+        value = value.timestamp()
+
+      queryObj.addBindValue(value)
 
-    if self.encrypter.hasPassword():
-      # Encrypt the content
-      contentData = self.encrypter.encrypt(pageData.m_contentString)
-      titleData = self.encrypter.encrypt(pageData.m_title)
-      tagsData = self.encrypter.encrypt(pageData.m_tags)
-    else:
-      contentData = pageData.m_contentString
-      titleData = pageData.m_title
-      tagsData = pageData.m_tags
-
-    # Bytes data must be converted to a QByteArray before storing
-    queryObj.addBindValue(toQByteArray(contentData))
-    queryObj.addBindValue(toQByteArray(titleData))
-    queryObj.addBindValue(toQByteArray(tagsData))
-    queryObj.addBindValue(pageData.m_modifiedDateTime.timestamp())
-    queryObj.addBindValue(pageData.m_numModifications)
-    queryObj.addBindValue(pageData.additionalItems())
-    queryObj.addBindValue(pageData.m_bIsFavorite)
     queryObj.addBindValue(pageData.m_pageId)
 
     queryObj.exec_()
@@ -674,7 +1450,11 @@ class Database:
       self.reportError(f'updatePage error: {sqlErr.text()}')
       return False
 
-    return True
+    if self.metadataSnapshot is not None:
+      self.metadataSnapshot.updatePage(pageData.m_pageId, title=pageData.m_title, tags=pageData.m_tags,
+                                       lastModified=pageData.m_modifiedDateTime.timestamp())
+
+    return self.countPageWrite()
 
   def addNewBlankPage(self, pageData: PageData) -> bool:
     """ Creates a blank Notebook page in the database.  The pageData parameter must contain a valid page ID.
@@ -684,14 +1464,18 @@ class Database:
       self.reportError(f'addNewBlankPage error: invalid page ID')
       return False
 
+    with self.transaction():
+      return self.insertBlankPage(pageData) and self.updateSearchIndex(pageData.m_pageId, pageData.m_title, '', '')
+
+  def insertBlankPage(self, pageData: PageData) -> bool:
     # Encrypt if necessary
     titleData = self.encrypter.encrypt(pageData.m_title) if self.encrypter.hasPassword() else pageData.m_title
 
-    queryObj = QtSql.QSqlQuery()
+    queryObj = QtSql.QSqlQuery(self.db)
 
     numModifications = 0    # This does not count as a modification
 
-    queryObj.prepare("insert into pages (pageid, parentid, created, lastModified, numModifications, pagetype, pagetitle) values (?, ?, ?, ?, ?, ?, ?)")
+    queryObj.prepare("insert into pages (pageid, parentid, created, lastModified, numModifications, pagetype, pagetitle, sortkey) values (?, ?, ?, ?, ?, ?, ?, ?)")
     queryObj.addBindValue(pageData.m_pageId)
     queryObj.addBindValue(pageData.m_parentId)
     queryObj.addBindValue(pageData.m_createdDateTime.timestamp())
@@ -699,6 +1483,7 @@ class Database:
     queryObj.addBindValue(numModifications)
     queryObj.addBindValue(pageData.m_pageType.value)
     queryObj.addBindValue(toQByteArray(titleData))        # Must be stored as a QByteArray
+    queryObj.addBindValue(pageData.m_sortKey)
 
     queryObj.exec_()
 
@@ -709,7 +1494,12 @@ class Database:
       self.reportError(f'addNewBlankPage error: {sqlErr.text()}')
       return False
 
-    return True
+    if self.metadataSnapshot is not None:
+      self.metadataSnapshot.setPage(pageData.m_pageId, pageData.m_parentId, pageData.m_pageType.value, pageData.m_title, '',
+                                    pageData.m_modifiedDateTime.timestamp(), pageData.m_sortKey)
+
+    pageData.markClean()
+    return self.countPageWrite()
 
   def changePageTitle(self, pageId: ENTITY_ID, newTitle: str, isModification: bool) -> bool:
     """ Changes the title of a page.
@@ -719,33 +1509,38 @@ class Database:
     # Encrypt if necessary
     titleData = toQByteArray(self.encrypter.encrypt(newTitle)) if self.encrypter.hasPassword() else newTitle
 
-    if isModification:
-      # Get current modification count
-      if not self.incrementPageModificationCount(pageId):
-        return False
+    lastModified = datetime.datetime.now().timestamp()
 
-    queryObj = QtSql.QSqlQuery()
-    queryObj.prepare("update pages set pagetitle=?, lastmodified=? where pageid=?")
-    queryObj.addBindValue(titleData)
-    queryObj.addBindValue(datetime.datetime.now().timestamp())
-    queryObj.addBindValue(pageId)
+    self.pageCache.invalidatePage(pageId)
 
-    queryObj.exec_()
+    with self.transaction():
+      # The modification count is incremented in the same statement
+      queryObj = self.cachedQuery("update pages set pagetitle=?, lastmodified=?, nummodifications=nummodifications+? where pageid=?")
+      queryObj.addBindValue(titleData)
+      queryObj.addBindValue(lastModified)
+      queryObj.addBindValue(1 if isModification else 0)
+      queryObj.addBindValue(pageId)
 
-    # Check for errors
-    sqlErr = queryObj.lastError()
+      queryObj.exec_()
 
-    if sqlErr.type() != QtSql.QSqlError.ErrorType.NoError:
-      self.reportError(f'[Database.changePageTitle]: {sqlErr.text()}')
-      return False
+      # Check for errors
+      sqlErr = queryObj.lastError()
 
-    return True
+      if sqlErr.type() != QtSql.QSqlError.ErrorType.NoError:
+        self.reportError(f'[Database.changePageTitle]: {sqlErr.text()}')
+        return False
+
+      if self.metadataSnapshot is not None:
+        self.metadataSnapshot.updatePage(pageId, title=newTitle, lastModified=lastModified)
+
+      return self.countPageWrite() and self.updateSearchIndexTitle(pageId, newTitle)
 
   def incrementPageModificationCount(self, pageId: ENTITY_ID) -> bool:
     """ Increases the modification count of a page. """
-    queryObj = QtSql.QSqlQuery()
-    queryObj.prepare("select nummodifications from pages where pageid=?")
-    queryObj.bindValue(0, pageId)
+    self.pageCache.invalidatePage(pageId)
+
+    queryObj = self.cachedQuery("update pages set nummodifications=nummodifications+1 where pageid=?")
+    queryObj.addBindValue(pageId)
 
     queryObj.exec_()
 
@@ -753,38 +1548,14 @@ class Database:
     sqlErr = queryObj.lastError()
 
     if sqlErr.type() != QtSql.QSqlError.ErrorType.NoError:
-      self.reportError(f'incrementPageModificationCount error: {sqlErr.text()}')
-      return False
-
-    if not queryObj.first():
+      self.reportError(f'[incrementPageModificationCount] page {pageId}: {sqlErr.text()}')
       return False
 
-    numModifications = self.getQueryField(queryObj, 'nummodifications')
-
-    if type(numModifications) is int:
-      numModifications += 1   # Increment it!
-
-      queryObj.prepare('update pages set nummodifications=? where pageid=?')
-
-      queryObj.addBindValue(numModifications)
-      queryObj.addBindValue(pageId)
-
-      queryObj.exec_()
-
-      # Check for errors
-      sqlErr = queryObj.lastError()
-      if sqlErr.type() != QtSql.QSqlError.ErrorType.NoError:
-        self.reportError(f'[incrementPageModificationCount] page {pageId}: {sqlErr.text()}')
-        return False
-      else:
-        return True
-    else:
-      self.reportError('[incrementPageModificationCount] nummodifications was not an int')
-      return False
+    return True
 
   def nextPageId(self) -> ENTITY_ID:
     """ Returns the next available page ID. """
-    queryObj = QtSql.QSqlQuery()
+    queryObj = QtSql.QSqlQuery(self.db)
 
     queryObj.prepare("select max(pageid) as maxpageid from pages")
 
@@ -815,8 +1586,7 @@ class Database:
       return kInvalidPageId
 
   def getPageTitle(self, pageId: ENTITY_ID) -> str | None:
-    queryObj = QtSql.QSqlQuery()
-    queryObj.prepare("select pagetitle from pages where pageid=?")
+    queryObj = self.cachedQuery("select pagetitle from pages where pageid=?")
     queryObj.addBindValue(pageId)
 
     queryObj.exec_()
@@ -831,34 +1601,44 @@ class Database:
     if queryObj.first():
       # Note: getQueryField takes care of decryption
       pageTitle = str(self.getQueryField(queryObj, 'pagetitle'))
+      queryObj.finish()
       return pageTitle
     else:
       return None
 
   def deletePage(self, pageId: ENTITY_ID) -> bool:
-    """ Deletes the requested page. """
-    queryObj = QtSql.QSqlQuery()
+    """ Deletes the requested page, along with its images. """
+    self.pageCache.invalidatePage(pageId)
 
-    queryObj.prepare("delete from pages where pageid=?")
-    queryObj.addBindValue(pageId)
+    with self.transaction():
+      if not self.deleteAllImagesForPage(pageId):
+        return False
 
-    queryObj.exec_()
+      queryObj = self.cachedQuery("delete from pages where pageid=?")
+      queryObj.addBindValue(pageId)
 
-    # Check for errors
-    sqlErr = queryObj.lastError()
+      queryObj.exec_()
 
-    if sqlErr.type() != QtSql.QSqlError.ErrorType.NoError:
-      self.reportError(f'[deletePage]: {sqlErr.text()}')
-      return False
+      # Check for errors
+      sqlErr = queryObj.lastError()
 
-    return True
+      if sqlErr.type() != QtSql.QSqlError.ErrorType.NoError:
+        self.reportError(f'[deletePage]: {sqlErr.text()}')
+        return False
+
+      if self.metadataSnapshot is not None:
+        self.metadataSnapshot.removePage(pageId)
 
-  def updatePageParent(self, pageId: ENTITY_ID, newParentId: ENTITY_ID) -> bool:
+      return self.countPageWrite() and self.removeFromSearchIndex(pageId)
+
+  def updatePageParent(self, pageId: ENTITY_ID, newParentId: ENTITY_ID, sortKey: int) -> bool:
+    """ Moves a page to a new parent, at the position given by the sort key. """
     if self.pageExists(pageId):
-      queryObj = QtSql.QSqlQuery()
+      self.pageCache.invalidatePage(pageId)
 
-      queryObj.prepare("update pages set parentid=? where pageid=?")
+      queryObj = self.cachedQuery("update pages set parentid=?, sortkey=? where pageid=?")
       queryObj.addBindValue(newParentId)
+      queryObj.addBindValue(sortKey)
       queryObj.addBindValue(pageId)
 
       queryObj.exec_()
@@ -870,13 +1650,39 @@ class Database:
         self.reportError(f'[updatePageParent]: {sqlErr.text()}')
         return False
       else:
-        return True
+        if self.metadataSnapshot is not None:
+          self.metadataSnapshot.updatePage(pageId, parentId=newParentId, sortKey=sortKey)
+
+        return self.countPageWrite()
     else:
       # The page does not exist
       return False
 
+  def setPageSortKeys(self, sortKeys: dict[ENTITY_ID, int]) -> bool:
+    """ Sets the sort keys of the given pages. """
+    with self.transaction():
+      queryObj = self.cachedQuery("update pages set sortkey=? where pageid=?")
+
+      for pageId, sortKey in sortKeys.items():
+        queryObj.addBindValue(sortKey)
+        queryObj.addBindValue(pageId)
+
+        queryObj.exec_()
+
+        # Check for errors
+        sqlErr = queryObj.lastError()
+
+        if sqlErr.type() != QtSql.QSqlError.ErrorType.NoError:
+          self.reportError(f'[Database.setPageSortKeys] page {pageId}: {sqlErr.text()}')
+          return False
+
+        if self.metadataSnapshot is not None:
+          self.metadataSnapshot.updatePage(pageId, sortKey=sortKey)
+
+      return self.countPageWrite()
+
   def getFirstPageId(self) -> ENTITY_ID | None:
-    queryObj = QtSql.QSqlQuery()
+    queryObj = QtSql.QSqlQuery(self.db)
     queryObj.prepare("select pageid from pages order by rowid asc limit 1")
 
     queryObj.exec_()
@@ -896,22 +1702,220 @@ class Database:
 
       return val if type(val) == int else None
 
-  def addImage(self, imageName: str, pixmap: QtGui.QPixmap, parentPageId: ENTITY_ID) -> bool:
-    # Convert the pixmap to a QByteArray for storage
-    # See: https://stackoverflow.com/questions/57404778/how-to-convert-a-qpixmaps-image-into-a-bytes
-    pixmapSaveSuccess, imageData = pixmapToQByteArray(pixmap)
+  def initSearchIndex(self) -> None:
+    """ Makes sure an existing notebook has a search index, building it if necessary.  Password protected
+        notebooks are not indexed, since the index would hold the text of every page unencrypted. """
+    self.searchIndexAvailable = False
+
+    if self.isPasswordProtected():
+      return
+
+    if self.tableExists(kSearchIndexTable):
+      self.searchIndexAvailable = True
+    elif self.createSearchIndexTable():
+      self.searchIndexAvailable = True
+      self.rebuildSearchIndex()
+
+  def hasSearchIndex(self) -> bool:
+    return self.searchIndexAvailable and not self.encrypter.hasPassword()
+
+  def rebuildSearchIndex(self) -> bool:
+    """ Fills the search index from the pages table.  This is only needed once, for notebooks
+        created before the search index existed. """
+    logging.info('Building the search index')
+
+    if not self.executeSql(f"delete from {kSearchIndexTable}", 'rebuildSearchIndex'):
+      return False
+
+    queryObj = QtSql.QSqlQuery(self.db)
+    queryObj.prepare("select pageid, pagetitle, contents, tags from pages")
+
+    queryObj.exec_()
+
+    # Check for errors
+    sqlErr = queryObj.lastError()
+
+    if sqlErr.type() != QtSql.QSqlError.ErrorType.NoError:
+      self.reportError(f'[Database.rebuildSearchIndex] error: {sqlErr.text()}')
+      return False
+
+    success = True
+
+    with self.transaction():
+      while queryObj.next():
+        pageId = self.getQueryField(queryObj, 'pageid')
+        pageTitle = str(self.getQueryField(queryObj, 'pagetitle'))
+        pageContents = str(self.getQueryField(queryObj, 'contents'))
+        tags = str(self.getQueryField(queryObj, 'tags')).strip()
+
+        success = self.updateSearchIndex(pageId, pageTitle, pageContents, tags) and success
+
+    return success
+
+  def updateSearchIndex(self, pageId: ENTITY_ID, pageTitle: str, pageContentsHtml: str, tags: str) -> bool:
+    """ Replaces the search index entry for a page. """
+    if not self.hasSearchIndex():
+      return True
+
+    queryObj = self.cachedQuery(f"insert or replace into {kSearchIndexTable} (rowid, pagetitle, contents, tags) values (?, ?, ?, ?)")
+    queryObj.addBindValue(pageId)
+    queryObj.addBindValue(pageTitle)
+    queryObj.addBindValue(htmlToPlainText(pageContentsHtml))
+    queryObj.addBindValue(tags)
+
+    queryObj.exec_()
+
+    # Check for errors
+    sqlErr = queryObj.lastError()
+
+    if sqlErr.type() != QtSql.QSqlError.ErrorType.NoError:
+      self.reportError(f'[Database.updateSearchIndex] error: {sqlErr.text()}')
+      return False
+
+    return True
+
+  def updateSearchIndexTitle(self, pageId: ENTITY_ID, pageTitle: str) -> bool:
+    if not self.hasSearchIndex():
+      return True
+
+    queryObj = self.cachedQuery(f"update {kSearchIndexTable} set pagetitle=? where rowid=?")
+    queryObj.addBindValue(pageTitle)
+    queryObj.addBindValue(pageId)
+
+    queryObj.exec_()
+
+    # Check for errors
+    sqlErr = queryObj.lastError()
+
+    if sqlErr.type() != QtSql.QSqlError.ErrorType.NoError:
+      self.reportError(f'[Database.updateSearchIndexTitle] error: {sqlErr.text()}')
+      return False
+
+    return True
+
+  def removeFromSearchIndex(self, pageId: ENTITY_ID) -> bool:
+    if not self.hasSearchIndex():
+      return True
+
+    queryObj = self.cachedQuery(f"delete from {kSearchIndexTable} where rowid=?")
+    queryObj.addBindValue(pageId)
+
+    queryObj.exec_()
+
+    # Check for errors
+    sqlErr = queryObj.lastError()
+
+    if sqlErr.type() != QtSql.QSqlError.ErrorType.NoError:
+      self.reportError(f'[Database.removeFromSearchIndex] error: {sqlErr.text()}')
+      return False
+
+    return True
+
+  def searchPages(self, searchText: str) -> ID_TITLE_LIST:
+    """Searches the title, contents and tags of every page for the given text, using the search index.
+
+    Args:
+        searchText (str): Text to search for.  Matching is case-insensitive.
+
+    Returns:
+        ID_TITLE_LIST: Page IDs and titles of the pages that contain the text.
+    """
+    resultList = []
+
+    queryObj = QtSql.QSqlQuery(self.db)
+
+    if len(searchText) >= kMinIndexedSearchLength:
+      # Quote the search text, so that it is matched as a phrase rather than as a query expression
+      queryObj.prepare(f"select rowid, pagetitle from {kSearchIndexTable} where {kSearchIndexTable} match ?")
+      queryObj.addBindValue('"' + searchText.replace('"', '""') + '"')
+    else:
+      likeStr = '%' + searchText.replace('\\', '\\\\').replace('%', '\\%').replace('_', '\\_') + '%'
+      queryObj.prepare(f"select rowid, pagetitle from {kSearchIndexTable} where pagetitle like ? escape '\\' or contents like ? escape '\\' or tags like ? escape '\\'")
+      queryObj.addBindValue(likeStr)
+      queryObj.addBindValue(likeStr)
+      queryObj.addBindValue(likeStr)
+
+    queryObj.exec_()
+
+    # Check for errors
+    sqlErr = queryObj.lastError()
+
+    if sqlErr.type() != QtSql.QSqlError.ErrorType.NoError:
+      self.reportError(f'[Database.searchPages] error: {sqlErr.text()}')
+      return []
+
+    while queryObj.next():
+      pageId = queryObj.value(0)
+      pageTitle = unknownToString(queryObj.value(1))
+      resultList.append((pageId, pageTitle))
+
+    return resultList
+
+  def addImage(self, imageName: str, imageData: bytes, imageFormat: str, parentPageId: ENTITY_ID,
+               rendition: tuple[bytes, str] | None = None) -> bool:
+    """Stores an image, as its original encoded bytes.  Images are stored once for each distinct content, and
+    shared by every image name that refers to the same content.
+
+    Args:
+        imageName (str): Name of the image in the page's document
+        imageData (bytes): Encoded image, as read from the image file
+        imageFormat (str): Format of the encoded image (eg, 'png' or 'jpeg')
+        parentPageId (ENTITY_ID): Page that contains the image
+        rendition (tuple[bytes, str] | None): Downscaled copy of a large image, and its format, which is
+                                              shown in the page instead of the full-size image
+
+    Returns:
+        bool: True if successful, False otherwise.
+    """
+    imageHash = hashlib.sha256(imageData).hexdigest()
+
+    with self.transaction():
+      queryObj = self.cachedQuery(f"insert into {kAdditionalDataTable} (itemid, type, contents, parentid, format, refcount) values (?, ?, ?, ?, ?, 1) "
+                                  "on conflict(itemid) do update set refcount=refcount+1")
+      queryObj.addBindValue(imageHash)
+      queryObj.addBindValue(kImageData)
+      queryObj.addBindValue(toQByteArray(imageData))
+      queryObj.addBindValue(parentPageId)
+      queryObj.addBindValue(imageFormat)
+
+      queryObj.exec_()
+
+      # Check for errors
+      sqlErr = queryObj.lastError()
+
+      if sqlErr.type() != QtSql.QSqlError.ErrorType.NoError:
+        self.reportError(f'[Database.addImage] Error when attempting to save an image: {sqlErr.text()}')
+        return False
+
+      if rendition is not None and not self.setImageRendition(imageHash, rendition[0], rendition[1]):
+        return False
+
+      return self.addImageName(imageName, parentPageId, imageHash)
 
-    if not pixmapSaveSuccess:
-      self.reportError('[Database.addImage] error: Converting pixmap to byte array failed')
+  def setImageRendition(self, imageHash: str, renditionData: bytes, renditionFormat: str) -> bool:
+    """ Stores the downscaled copy of the image with the given hash. """
+    queryObj = self.cachedQuery(f"update {kAdditionalDataTable} set rendition=?, renditionformat=? where itemid=?")
+    queryObj.addBindValue(toQByteArray(renditionData))
+    queryObj.addBindValue(renditionFormat)
+    queryObj.addBindValue(imageHash)
+
+    queryObj.exec_()
+
+    # Check for errors
+    sqlErr = queryObj.lastError()
+
+    if sqlErr.type() != QtSql.QSqlError.ErrorType.NoError:
+      self.reportError(f'[Database.setImageRendition] error: {sqlErr.text()}')
       return False
 
-    queryObj = QtSql.QSqlQuery()
-    queryObj.prepare(f"insert into {kAdditionalDataTable} (itemid, type, contents, parentid) values (?, ?, ?, ?)")
+    return True
 
+  def addImageName(self, imageName: str, pageId: ENTITY_ID, imageHash: str) -> bool:
+    """ Maps an image name in a page's document to the stored image with the given hash. """
+    queryObj = self.cachedQuery(f"insert into {kImageNamesTable} (itemid, pageid, imagehash) values (?, ?, ?)")
     queryObj.addBindValue(imageName)
-    queryObj.addBindValue(kImageData)
-    queryObj.addBindValue(imageData)
-    queryObj.addBindValue(parentPageId)
+    queryObj.addBindValue(pageId)
+    queryObj.addBindValue(imageHash)
 
     queryObj.exec_()
 
@@ -919,14 +1923,31 @@ class Database:
     sqlErr = queryObj.lastError()
 
     if sqlErr.type() != QtSql.QSqlError.ErrorType.NoError:
-      self.reportError(f'[Database.addImage] Error when attempting to save an image: {sqlErr.text()}')
+      self.reportError(f'[Database.addImageName] error: {sqlErr.text()}')
       return False
 
     return True
 
   def getImage(self, imageName: str) -> QtGui.QPixmap | None:
-    queryObj = QtSql.QSqlQuery()
-    queryObj.prepare(f"select contents from {kAdditionalDataTable} where itemid=?")
+    """ Returns an image at full size. """
+    imageInfo = self.getImageData(imageName)
+
+    if imageInfo is None:
+      return None
+
+    imageData, imageFormat = imageInfo
+    pixmapConvertSuccess, pixmap = qByteArrayToPixmap(toQByteArray(imageData), imageFormat)
+
+    if not pixmapConvertSuccess:
+      self.reportError('[Database.getImage] error: Converting byte array to pixmap failed')
+      return None
+
+    return pixmap
+
+  def getImageData(self, imageName: str) -> tuple[bytes, str] | None:
+    """ Returns an image at full size, still encoded, and its format.  Unlike getImage, this can be called
+        on any thread. """
+    queryObj = self.cachedQuery(f"select d.contents, d.format from {kImageNamesTable} n join {kAdditionalDataTable} d on d.itemid = n.imagehash where n.itemid=?")
     queryObj.addBindValue(imageName)
 
     queryObj.exec_()
@@ -935,26 +1956,43 @@ class Database:
     sqlErr = queryObj.lastError()
 
     if sqlErr.type() != QtSql.QSqlError.ErrorType.NoError:
-      self.reportError(f'[Database.getFirstPageId] error: {sqlErr.text()}')
+      self.reportError(f'[Database.getImageData] error: {sqlErr.text()}')
       return None
 
-    if queryObj.first():
-      contentsField = queryObj.record().indexOf('contents')
-      byteArray = queryObj.value(contentsField)
-      pixmapConvertSuccess, pixmap = qByteArrayToPixmap(byteArray)
+    if not queryObj.first():
+      return None
 
-      if not pixmapConvertSuccess:
-        self.reportError('[Database.addImage] error: Converting byte array to pixmap failed')
-        return None
+    imageInfo = (unknownToBytes(queryObj.value(0)), unknownToString(queryObj.value(1)))
+    queryObj.finish()
+    return imageInfo
 
-      else:
-        return pixmap
-    else:
-      return None
+  def getImagesForPage(self, pageId: ENTITY_ID) -> ImageDict:
+    """ Returns all of a page's images, still encoded, using a single query.  Large images are returned as
+        their downscaled copies. """
+    queryObj = self.cachedQuery(f"select n.itemid, n.imagehash, coalesce(d.rendition, d.contents), coalesce(d.renditionformat, d.format) "
+                                f"from {kImageNamesTable} n "
+                                f"join {kAdditionalDataTable} d on d.itemid = n.imagehash where n.pageid=?")
+    queryObj.addBindValue(pageId)
+
+    queryObj.exec_()
+
+    # Check for errors
+    sqlErr = queryObj.lastError()
+
+    if sqlErr.type() != QtSql.QSqlError.ErrorType.NoError:
+      self.reportError(f'[Database.getImagesForPage] error: {sqlErr.text()}')
+      return {}
+
+    imageDict = {}
+
+    while queryObj.next():
+      imageName = unknownToString(queryObj.value(0))
+      imageDict[imageName] = (unknownToString(queryObj.value(1)), unknownToBytes(queryObj.value(2)), unknownToString(queryObj.value(3)))
+
+    return imageDict
 
   def getImageNamesForPage(self, pageId: ENTITY_ID) -> list[str]:
-    queryObj = QtSql.QSqlQuery()
-    queryObj.prepare(f"select itemid from {kAdditionalDataTable} where parentid=?")
+    queryObj = self.cachedQuery(f"select itemid from {kImageNamesTable} where pageid=?")
     queryObj.addBindValue(pageId)
 
     queryObj.exec_()
@@ -968,25 +2006,27 @@ class Database:
 
     nameList = []
 
+    nameField = self.columnIndex(queryObj, 'itemid')
+
     while queryObj.next():
-      nameField = queryObj.record().indexOf('itemid')
       imageName = unknownToString(queryObj.value(nameField))
       nameList.append(imageName)
 
     return nameList
 
   def deleteAllImagesForPage(self, pageId: ENTITY_ID) -> bool:
-    queryObj = QtSql.QSqlQuery()
-    queryObj.prepare(f"delete from {kAdditionalDataTable} where parentid=?")
-    queryObj.addBindValue(pageId)
-
-    queryObj.exec_()
+    """ Removes a page's image names.  Stored images that are no longer referred to by any name are deleted. """
+    statements = [
+      f"update {kAdditionalDataTable} set refcount = refcount - "
+      f"(select count(*) from {kImageNamesTable} where {kImageNamesTable}.imagehash = {kAdditionalDataTable}.itemid and {kImageNamesTable}.pageid = {pageId:d}) "
+      f"where itemid in (select imagehash from {kImageNamesTable} where pageid = {pageId:d})",
+      f"delete from {kImageNamesTable} where pageid = {pageId:d}",
+      f"delete from {kAdditionalDataTable} where type = {kImageData} and refcount <= 0"
+    ]
+
+    with self.transaction():
+      for statement in statements:
+        if not self.executeSql(statement, 'deleteAllImagesForPage'):
+          return False
 
-    # Check for errors
-    sqlErr = queryObj.lastError()
-
-    if sqlErr.type() != QtSql.QSqlError.ErrorType.NoError:
-      self.reportError(f'[Database.deleteAllImagesForPage] error: {sqlErr.text()}')
-      return False
-    else:
-      return True
+    return True
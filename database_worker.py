@@ -0,0 +1,138 @@
+# Runs database calls on a worker thread, so that slow queries, large images and decryption don't block the
+# UI.  The worker has its own connection to the open notebook.  Each call returns a Future, and its result is
+# also announced through a Switchboard signal, which is delivered on the UI thread.
+from PySide6 import QtCore
+from concurrent.futures import Future
+from copy import deepcopy
+from typing import Any, Callable
+import logging
+
+from database import Database
+from pageCache import PageCache
+from page_data import PageData
+from switchboard import Switchboard
+from notebook_types import ENTITY_ID
+
+kWorkerConnectionName = 'worker'
+
+class DatabaseRequest:
+  def __init__(self, methodName: str, args: tuple, onDone: Callable[[Any], None] | None) -> None:
+    self.methodName = methodName
+    self.args = args
+    self.onDone = onDone      # Called on the worker thread with the result
+    self.future: Future = Future()
+
+class DatabaseWorker(QtCore.QObject):
+  """ Lives on the worker thread, and runs requests against its own connection. """
+  def __init__(self, db: Database):
+    super(DatabaseWorker, self).__init__()
+
+    self.db = Database(kWorkerConnectionName)
+
+    # The keys are only read, so the encrypter can be shared with the UI thread's connection
+    self.db.encrypter = db.encrypter
+
+    # The UI thread's cache is the one kept up to date as pages change, so this connection doesn't cache pages
+    self.db.pageCache = PageCache(0)
+
+  @QtCore.Slot(object)
+  def onRequest(self, request: DatabaseRequest):
+    if not request.future.set_running_or_notify_cancel():
+      return
+
+    try:
+      result = getattr(self.db, request.methodName)(*request.args)
+    except Exception as e:
+      logging.error(f'[DatabaseWorker.onRequest] {request.methodName} failed: {e}')
+      request.future.set_exception(e)
+      return
+
+    request.future.set_result(result)
+
+    if request.onDone is not None:
+      request.onDone(result)
+
+class AsyncDatabase(QtCore.QObject):
+  """ Makes database calls on the worker thread.  Requests run one at a time, in the order they are made. """
+  requestPosted = QtCore.Signal(object)
+  pageWritten = QtCore.Signal(object)
+
+  def __init__(self, db: Database, switchboard: Switchboard, parent=None):
+    super(AsyncDatabase, self).__init__(parent)
+    self.db = db
+    self.switchboard = switchboard
+    self.isOpen = False
+
+    self.thread = QtCore.QThread(self)
+    self.worker = DatabaseWorker(db)
+    self.worker.moveToThread(self.thread)
+
+    self.requestPosted.connect(self.worker.onRequest)
+    self.pageWritten.connect(self.onPageWritten)    # Queued, since it is emitted on the worker thread
+
+    self.thread.start()
+
+  def post(self, methodName: str, args: tuple = (), onDone: Callable[[Any], None] | None = None) -> Future:
+    request = DatabaseRequest(methodName, args, onDone)
+    self.requestPosted.emit(request)
+    return request.future
+
+  def open(self, pathName: str) -> Future:
+    """ Opens the worker's connection to the notebook that was just opened on the UI thread's connection. """
+    self.close()
+    self.worker.db.setTuning(self.db.walMode, self.db.mmapSize // (1024 * 1024), self.db.cacheSize // 1024)
+
+    # The page and tag lists of an encrypted notebook are read from its metadata snapshot.  The worker has its own
+    # copy, as the UI thread's snapshot changes as pages are edited.
+    self.worker.db.metadataSnapshot = deepcopy(self.db.metadataSnapshot)
+    self.isOpen = True
+    return self.post('openConnection', (pathName,))
+
+  def close(self) -> None:
+    """ Closes the worker's connection, waiting for any requests that are still queued. """
+    if self.isOpen:
+      self.isOpen = False
+      self.post('closeConnection').result()
+
+      # Deliver the results of the requests that finished, such as saves, while the notebook is still open, so
+      # that none of them reach the next notebook
+      QtCore.QCoreApplication.sendPostedEvents(None, QtCore.QEvent.Type.MetaCall)
+
+  def shutdown(self) -> None:
+    self.close()
+    self.thread.quit()
+    self.thread.wait()
+
+  def getPage(self, pageId: ENTITY_ID) -> Future:
+    """ The page's cache generation is sent with the page, so that a page which changed while it was being read
+        isn't cached. """
+    generation = self.db.pageCache.pageGeneration(pageId)
+    return self.post('getPage', (pageId,), lambda pageData: self.switchboard.emitPageLoaded(pageId, pageData, generation))
+
+  def updatePage(self, pageData: PageData) -> Future:
+    """ Saves a copy of the page, so that the page can go on being edited while it is saved.  The outcome is
+        announced by Switchboard.pageUpdated. """
+    pageCopy = deepcopy(pageData)
+    self.db.pageCache.invalidatePage(pageCopy.m_pageId)
+
+    return self.post('updatePage', (pageCopy,), lambda success: self.pageWritten.emit((pageData, pageCopy, success)))
+
+  def getPageList(self) -> Future:
+    return self.post('getPageList', (), lambda result: self.switchboard.emitPageListLoaded(result[0], result[1]))
+
+  def getTagList(self) -> Future:
+    return self.post('getTagList', (), lambda result: self.switchboard.emitTagListLoaded(result[0], result[1]))
+
+  def getImagesForPage(self, pageId: ENTITY_ID) -> Future:
+    return self.post('getImagesForPage', (pageId,), lambda imageDict: self.switchboard.emitPageImagesLoaded(pageId, imageDict))
+
+  @QtCore.Slot(object)
+  def onPageWritten(self, written: tuple[PageData, PageData, bool]):
+    pageData, pageCopy, success = written
+
+    if success:
+      # The copy was marked clean when it was written.  Edits made to the page since it was copied stay dirty.
+      pageData.m_savedValues.update(pageCopy.m_savedValues)
+      self.db.pageWrittenElsewhere(pageCopy)
+
+    self.switchboard.emitPageUpdated(pageCopy, success)
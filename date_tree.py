@@ -1,11 +1,27 @@
 from PySide6 import QtCore, QtWidgets, QtGui
-from datetime import datetime, date
+from bisect import bisect_left, insort
+from datetime import date
+from enum import Enum
 from page_data import PageData, PageDataDict
 from switchboard import Switchboard
-from utility import formatDate, datesEqual
+from utility import formatDate
 from notebook_types import ENTITY_ID, PAGE_TYPE, kInvalidPageId
-import logging
 
+PAGE_KEY = tuple[str, ENTITY_ID]      # (title, page ID).  Pages within a date are sorted by this.
+GROUP_KEY = tuple[int, ...]           # (year,) or (year, month)
+
+class DATE_GROUPING(Enum):
+  kGroupByDay = 0
+  kGroupByMonth = 1
+  kGroupByYear = 2
+
+def groupDateRange(key: GROUP_KEY) -> tuple[date, date]:
+  """ Returns the first date in a month or year, and the first date after it. """
+  if len(key) == 1:
+    return date(key[0], 1, 1), date(key[0] + 1, 1, 1)
+
+  year, month = key
+  return date(year, month, 1), date(year + month // 12, month % 12 + 1, 1)
 
 #************************************************************************
 #* CDateWidgetItem                                                      *
@@ -15,7 +31,9 @@ class CDateWidgetItem(QtWidgets.QTreeWidgetItem):
   def __init__(self, parent, date: date):
     super(CDateWidgetItem, self).__init__(parent)
     self.date = date
+    self.populated = False      # Page items are only created when the date is expanded
     self.setText(0, formatDate(self.date))
+    self.setChildIndicatorPolicy(QtWidgets.QTreeWidgetItem.ChildIndicatorPolicy.ShowIndicator)
 
   def __lt__(self, other):
     return self.date < other.date
@@ -26,11 +44,50 @@ class CDateWidgetItem(QtWidgets.QTreeWidgetItem):
   def __ne__(self, other):
     return self.date != other.date
 
+#************************************************************************
+#* CDateGroupItem                                                       *
+#************************************************************************
+
+class CDateGroupItem(QtWidgets.QTreeWidgetItem):
+  """ A month or a year.  Its children are only created when it is expanded. """
+  def __init__(self, parent, key: GROUP_KEY):
+    super(CDateGroupItem, self).__init__(parent)
+    self.key = key
+    self.populated = False
+
+    if len(key) == 1:
+      self.setText(0, str(key[0]))
+    else:
+      self.setText(0, date(key[0], key[1], 1).strftime('%B %Y'))
+
+    self.setChildIndicatorPolicy(QtWidgets.QTreeWidgetItem.ChildIndicatorPolicy.ShowIndicator)
+
+  def dateRange(self) -> tuple[date, date]:
+    return groupDateRange(self.key)
+
 
 class CDateTree(QtWidgets.QTreeWidget):
+  """ Pages grouped by modification date, most recent first, with the titles within a date in ascending order.
+
+      The pages are indexed by date and by page ID, and the dates are kept in a sorted list, so items are
+      inserted at their sorted position with a binary search rather than by re-sorting the tree.  Page items,
+      and the children of month and year groups, are only created when their parent is expanded. """
   def __init__(self, parent):
     super(CDateTree, self).__init__(parent)
     self.setContextMenuPolicy(QtGui.Qt.ContextMenuPolicy.CustomContextMenu)
+    self.setSortingEnabled(False)       # The tree is kept in order as items are inserted
+
+    self.grouping = DATE_GROUPING.kGroupByDay
+
+    # The pages in the tree, whether or not their items have been created yet
+    self.pageInfo: dict[ENTITY_ID, tuple[date, str]] = {}
+    self.datePages: dict[date, list[PAGE_KEY]] = {}
+    self.sortedDates: list[date] = []           # Ascending
+
+    # The items that have been created
+    self.dateItems: dict[date, CDateWidgetItem] = {}
+    self.groupItems: dict[GROUP_KEY, CDateGroupItem] = {}
+    self.pageItems: dict[ENTITY_ID, QtWidgets.QTreeWidgetItem] = {}
 
     self.initMenus()
 
@@ -44,191 +101,290 @@ class CDateTree(QtWidgets.QTreeWidget):
     # TODO: Connect signals for PageImported and PageUpdatedByImport
 
     self.itemClicked.connect(self.onItemClicked)
-    self.itemChanged.connect(self.onItemChanged)
+    self.itemExpanded.connect(self.populateItem)
 
     self.customContextMenuRequested.connect(self.onContextMenu)
 
   def initMenus(self):
     self.contextMenu = QtWidgets.QMenu()
-    self.contextMenu.addAction('ExpandAll', self.expandAll)
+    self.contextMenu.addAction('ExpandAll', self.expandAllItems)
     self.contextMenu.addAction('CollapseAll', self.collapseAll)
 
+    groupMenu = self.contextMenu.addMenu('Group By')
+    groupActions = QtGui.QActionGroup(self)
+
+    for text, grouping in [('Day', DATE_GROUPING.kGroupByDay), ('Month', DATE_GROUPING.kGroupByMonth), ('Year', DATE_GROUPING.kGroupByYear)]:
+      action = groupMenu.addAction(text, lambda grouping=grouping: self.setGrouping(grouping))
+      action.setCheckable(True)
+      action.setChecked(grouping == self.grouping)
+      groupActions.addAction(action)
+
   def getItemPageId(self, item: QtWidgets.QTreeWidgetItem) -> ENTITY_ID:
     return item.data(0, QtCore.Qt.ItemDataRole.UserRole)
 
-  def addItems(self, pageDict: PageDataDict) -> None:
-    self.setSortingEnabled(False)
+  def clear(self) -> None:
+    self.pageInfo.clear()
+    self.datePages.clear()
+    self.sortedDates.clear()
+    self.clearItems()
 
+  def clearItems(self) -> None:
+    self.dateItems.clear()
+    self.groupItems.clear()
+    self.pageItems.clear()
+    super(CDateTree, self).clear()
+
+  def setGrouping(self, grouping: DATE_GROUPING) -> None:
+    if grouping == self.grouping:
+      return
+
+    self.grouping = grouping
+    self.clearItems()
+    self.populateItem(self.invisibleRootItem())
+
+  def addItems(self, pageDict: PageDataDict) -> None:
     for pageId, pageData in pageDict.items():
       if pageData.m_pageType == PAGE_TYPE.kPageTypeUserText.value:
         self.addItem(pageData)
 
-    self.sortDateItems()
-    self.sortPageTitles()
-
   def addItem(self, pageData: PageData) -> None:
-    dateItem = self.findDate(pageData.m_modifiedDateTime.date())
+    self.insertPage(pageData.m_pageId, pageData.m_modifiedDateTime.date(), pageData.m_title)
 
-    if dateItem is None:
-      dateItem = self.addDate(pageData.m_modifiedDateTime.date())
+  def findPageItem(self, pageId: ENTITY_ID) -> QtWidgets.QTreeWidgetItem | None:
+    """ Returns the item of the given page, or None if the page isn't in the tree or its item hasn't been created. """
+    if pageId == kInvalidPageId:
+      return None
 
-    newItem = QtWidgets.QTreeWidgetItem()
-    newItem.setText(0, pageData.m_title)
-    newItem.setData(0, QtCore.Qt.ItemDataRole.UserRole, pageData.m_pageId)
-    dateItem.addChild(newItem)
+    return self.pageItems.get(pageId)
 
-  def pageItemParent(self, pageItem: QtWidgets.QTreeWidgetItem) -> CDateWidgetItem | None:
-    parent = pageItem.parent()
+  def findDate(self, inDate: date) -> CDateWidgetItem | None:
+    return self.dateItems.get(inDate)
 
-    return parent if type(parent) is CDateWidgetItem else None
+  # *************************** ORDERING ***************************
 
-  def findPageItem(self, pageId: ENTITY_ID) -> QtWidgets.QTreeWidgetItem | None:
-    """Returns the top-level tree widget item that contains the given page ID.
+  def groupKeys(self, inDate: date) -> list[GROUP_KEY]:
+    """ Returns the keys of the groups containing the date, outermost first. """
+    match self.grouping:
+      case DATE_GROUPING.kGroupByMonth:
+        return [(inDate.year, inDate.month)]
 
-    Args:
-        pageId (ENTITY_ID): Page ID of the page to find
+      case DATE_GROUPING.kGroupByYear:
+        return [(inDate.year,), (inDate.year, inDate.month)]
 
-    Returns:
-        QtWidgets.QTreeWidgetItem | None: Tree widget item containing the given page, or None if not found
-    """
-    if pageId == kInvalidPageId:
-      return None
+      case _:
+        return []
 
-    # Iterate over the children of the date items.  The date items are the
-    # first level of children in the tree.
+  def childGroupKeys(self, parent: QtWidgets.QTreeWidgetItem) -> list[GROUP_KEY]:
+    """ Returns the keys of the groups directly under the parent, most recent first. """
+    if type(parent) is CDateGroupItem:
+      start, end = parent.dateRange()
+      dates = self.sortedDates[bisect_left(self.sortedDates, start):bisect_left(self.sortedDates, end)]
+      depth = len(parent.key) + 1
+    else:
+      dates = self.sortedDates
+      depth = 1 if self.grouping == DATE_GROUPING.kGroupByYear else 2
 
-    tliCount = self.topLevelItemCount()
+    keys = dict.fromkeys((itemDate.year, itemDate.month)[:depth] for itemDate in reversed(dates))
+    return list(keys)
 
-    for dateItemNum in range(tliCount):
-      dateItem = self.topLevelItem(dateItemNum)
+  def sortKey(self, item: QtWidgets.QTreeWidgetItem):
+    if type(item) is CDateGroupItem:
+      return item.key
 
-      for i in range(dateItem.childCount()):
-        treeItem = dateItem.child(i)
+    if type(item) is CDateWidgetItem:
+      return item.date
 
-        if treeItem is not None and self.getItemPageId(treeItem) == pageId:
-          return treeItem
+    pageId = self.getItemPageId(item)
+    return (self.pageInfo[pageId][1], pageId)
+
+  def insertionIndex(self, parent: QtWidgets.QTreeWidgetItem, key, descending: bool) -> int:
+    """ Binary search for where an item with the given key goes among the parent's children. """
+    lo = 0
+    hi = parent.childCount()
 
-    # If get here, the page was not found
-    return None
+    while lo < hi:
+      mid = (lo + hi) // 2
+      childKey = self.sortKey(parent.child(mid))
 
-  def findDate(self, inDate: date) -> CDateWidgetItem | None:
-    tliCount = self.topLevelItemCount()
-    for i in range(tliCount):
-      dateItem = self.topLevelItem(i)
+      if (childKey > key) if descending else (childKey < key):
+        lo = mid + 1
+      else:
+        hi = mid
 
-      if dateItem is not None and type(dateItem) is CDateWidgetItem:
-        if dateItem.date == inDate:
-          return dateItem
+    return lo
 
-    return None
+  def isPopulated(self, item: QtWidgets.QTreeWidgetItem) -> bool:
+    # The root's items are always created
+    return item.populated if type(item) in (CDateWidgetItem, CDateGroupItem) else True
 
-  def addDate(self, inDate: date) -> CDateWidgetItem:
-    dateItem = CDateWidgetItem(self, inDate)
-    self.addTopLevelItem(dateItem)
-    return dateItem
+  def hasPages(self, key: date | GROUP_KEY) -> bool:
+    if isinstance(key, date):
+      return key in self.datePages
 
-  def sortPageTitles(self):
-    # Since the dates are sorted in descending order, it is necessary
-    # to resort the page titles in ascending order.
-    tliCount = self.topLevelItemCount()
-    for i in range(tliCount):
-      pItem = self.topLevelItem(i)
-      self.sortTitlesWithinDate(pItem)
+    start, end = groupDateRange(key)
+    return bisect_left(self.sortedDates, start) < bisect_left(self.sortedDates, end)
 
-  def sortTitlesWithinDate(self, item: QtWidgets.QTreeWidgetItem) -> None:
-    item.sortChildren(0, QtCore.Qt.SortOrder.AscendingOrder)
+  # *************************** ITEMS ***************************
 
-  def sortDateItems(self):
-  	# This will end up sorting all of column 0, which would include
-	  # the page titles.  The page titles will have to be sorted individually
-	  # after this function is called.
+  def newPageItem(self, pageId: ENTITY_ID, title: str) -> QtWidgets.QTreeWidgetItem:
+    pageItem = QtWidgets.QTreeWidgetItem()
+    pageItem.setText(0, title)
+    pageItem.setData(0, QtCore.Qt.ItemDataRole.UserRole, pageId)
+    self.pageItems[pageId] = pageItem
+    return pageItem
 
-    rootItem = self.invisibleRootItem()
-    rootItem.sortChildren(0, QtCore.Qt.SortOrder.DescendingOrder)
+  def newContainerItem(self, key: date | GROUP_KEY) -> CDateWidgetItem | CDateGroupItem:
+    if isinstance(key, date):
+      item = CDateWidgetItem(None, key)
+      self.dateItems[key] = item
+    else:
+      item = CDateGroupItem(None, key)
+      self.groupItems[key] = item
 
-  def onContextMenu(self, pos: QtCore.QPoint):
-    self.contextMenu.popup(self.mapToGlobal((pos)))
+    return item
 
-  def onItemClicked(self, item: QtWidgets.QTreeWidgetItem, column: int):
-    pageId = self.getItemPageId(item)
-    self.switchboard.emitPageSelected(pageId)
+  def containerItem(self, key: date | GROUP_KEY) -> CDateWidgetItem | CDateGroupItem | None:
+    return self.dateItems.get(key) if isinstance(key, date) else self.groupItems.get(key)
 
-  def onItemChanged(self, item: QtWidgets.QTreeWidgetItem, column: int):
-    # Since the dates are sorted in descending order, it is necessary
-    # to resort the page titles in ascending order, whenever an item
-    # is changed.  Whenever the tree is touched, Qt will resort the tree,
-    # thus, it is necessary to resort the titles within each date.
-    self.sortPageTitles()
+  def populateItem(self, item: QtWidgets.QTreeWidgetItem) -> None:
+    """ Creates the children of a date or group item the first time it is expanded. """
+    if type(item) in (CDateWidgetItem, CDateGroupItem):
+      if item.populated:
+        return
 
-  def onNewPageCreated(self, pageData: PageData):
-    self.addItem(pageData)
-    self.sortPageTitles()
+      item.populated = True
+    elif self.getItemPageId(item) is not None or item.childCount() > 0:
+      return      # A page, or the root once its items have been created
 
-  def onPageSaved(self, pageData: PageData):
-    # Determine if the page needs to be moved to a different date parent.
-    item = self.findPageItem(pageData.m_pageId)
+    if type(item) is CDateWidgetItem:
+      children = [self.newPageItem(pageId, title) for title, pageId in self.datePages.get(item.date, [])]
+    elif type(item) is CDateGroupItem and len(item.key) == 2:
+      start, end = item.dateRange()
+      dates = self.sortedDates[bisect_left(self.sortedDates, start):bisect_left(self.sortedDates, end)]
+      children = [self.newContainerItem(itemDate) for itemDate in reversed(dates)]
+    elif type(item) is CDateGroupItem or self.grouping != DATE_GROUPING.kGroupByDay:
+      children = [self.newContainerItem(key) for key in self.childGroupKeys(item)]
+    else:
+      children = [self.newContainerItem(itemDate) for itemDate in reversed(self.sortedDates)]
 
-    if item is not None:
-      dateItem = self.pageItemParent(item)
+    item.addChildren(children)
 
-      if dateItem is not None:
-        childIndex = dateItem.indexOfChild(item)
+  def expandAllItems(self) -> None:
+    """ Creates every item, so that expandAll can expand them all. """
+    pending = [self.invisibleRootItem()]
 
-        if not datesEqual(dateItem.date, pageData.m_modifiedDateTime):
-          # The page now has a different modification date.  It needs to be moved.
-				  # Find the date under which this page should be created.
-          newDateItem = self.findDate(pageData.m_modifiedDateTime.date())
+    while len(pending) > 0:
+      item = pending.pop()
+      self.populateItem(item)
+      pending.extend(item.child(i) for i in range(item.childCount()))
 
-          if newDateItem is None:
-            # The date does not exist, so add it
-            newDateItem = self.addDate(pageData.m_modifiedDateTime.date())
+    self.expandAll()
 
-            # Must re-soert the date items, since a new date was added
-            self.sortDateItems()
+  def insertPage(self, pageId: ENTITY_ID, pageDate: date, title: str, pageItem: QtWidgets.QTreeWidgetItem | None = None) -> None:
+    """ Adds a page to the index, and adds its item if its date has been expanded.  An item taken out by
+        takePage can be passed in to be reused. """
+    self.pageInfo[pageId] = (pageDate, title)
 
-            # Sorting the date items will require all page titles to be resorted
-            self.sortPageTitles()
+    if pageDate not in self.datePages:
+      self.datePages[pageDate] = []
+      insort(self.sortedDates, pageDate)
 
-          # DEBUG: verify that the original item is still at the same childindex
-          childIndexVerify = dateItem.indexOfChild(item)
-          if childIndexVerify != childIndex:
-            logging.debug(f'[onPageSaved] childIndexVerify ({childIndexVerify}) does not equal childIndex ({childIndex})')
-          # END DEBUG
+    pageKey = (title, pageId)
+    insort(self.datePages[pageDate], pageKey)
 
-          # Remote page item from its current date, and add it to the new date
-          removedItem = dateItem.takeChild(childIndex)
-          newDateItem.addChild(removedItem)
+    # Create any missing group and date items down to the page, as long as their parents have been expanded
+    parent = self.invisibleRootItem()
 
-          # If the old date has no more children, remove it
-          if dateItem.childCount() == 0:
-            index = self.indexOfTopLevelItem(dateItem)
-            self.takeTopLevelItem(index)
+    for key in self.groupKeys(pageDate) + [pageDate]:
+      item = self.containerItem(key)
 
-          self.sortTitlesWithinDate(newDateItem)
+      if item is None:
+        if not self.isPopulated(parent):
+          return
 
-  def onPageTitleUpdated(self, pageId: int, pageTitle: str, isModification: bool):
-    item = self.findPageItem(pageId)
+        item = self.newContainerItem(key)
+        parent.insertChild(self.insertionIndex(parent, key, True), item)
 
-    if item is not None:
-      itemDate = self.pageItemParent(item)
+      parent = item
 
-      if itemDate is not None:
-        item.setText(0, pageTitle)
+    if not parent.populated:
+      return
 
-        self.sortTitlesWithinDate(itemDate)     # Maintain sort order within the date
+    if pageItem is None:
+      pageItem = self.newPageItem(pageId, title)
+    else:
+      pageItem.setText(0, title)
+      self.pageItems[pageId] = pageItem
 
-        # Changing the title constitutes a "change"??
+    parent.insertChild(self.insertionIndex(parent, pageKey, False), pageItem)
 
-  def onPageDeleted(self, pageId: ENTITY_ID):
-    item = self.findPageItem(pageId)
+  def takePage(self, pageId: ENTITY_ID) -> QtWidgets.QTreeWidgetItem | None:
+    """ Removes a page from the index, along with any date and group items left empty.  Returns the page's
+        item, if it had one. """
+    pageDate, title = self.pageInfo.pop(pageId)
+
+    pageKeys = self.datePages[pageDate]
+    del pageKeys[bisect_left(pageKeys, (title, pageId))]
+
+    pageItem = self.pageItems.pop(pageId, None)
+
+    if pageItem is not None:
+      pageItem.parent().removeChild(pageItem)
 
-    if item is not None:
-      itemDate = self.pageItemParent(item)
+    if len(pageKeys) > 0:
+      return pageItem
 
-      if itemDate is not None:
-        itemDate.removeChild(item)
+    del self.datePages[pageDate]
+    del self.sortedDates[bisect_left(self.sortedDates, pageDate)]
 
-        # If the date widget has no more children, remove the date widget item
-        if itemDate.childCount() == 0:
-          index = self.indexOfTopLevelItem(itemDate)
-          self.takeTopLevelItem(index)
+    # Remove the date and its groups, innermost first, for as long as they are empty
+    for key in reversed(self.groupKeys(pageDate) + [pageDate]):
+      if self.hasPages(key):
+        break
+
+      item = self.dateItems.pop(key, None) if isinstance(key, date) else self.groupItems.pop(key, None)
+
+      if item is not None:
+        parent = item.parent() or self.invisibleRootItem()
+        parent.removeChild(item)
+
+    return pageItem
+
+  def movePage(self, pageId: ENTITY_ID, pageDate: date, title: str) -> None:
+    wasCurrent = self.currentItem() is not None and self.currentItem() is self.pageItems.get(pageId)
+    pageItem = self.takePage(pageId)
+    self.insertPage(pageId, pageDate, title, pageItem)
+
+    if wasCurrent and pageId in self.pageItems:
+      self.setCurrentItem(self.pageItems[pageId])
+
+  # *************************** SLOTS ***************************
+
+  def onContextMenu(self, pos: QtCore.QPoint):
+    self.contextMenu.popup(self.mapToGlobal((pos)))
+
+  def onItemClicked(self, item: QtWidgets.QTreeWidgetItem, column: int):
+    pageId = self.getItemPageId(item)
+
+    if pageId is not None:
+      self.switchboard.emitPageSelected(pageId)
+
+  def onNewPageCreated(self, pageData: PageData):
+    self.addItem(pageData)
+
+  def onPageSaved(self, pageData: PageData):
+    # Move the page if it now has a different modification date
+    pageInfo = self.pageInfo.get(pageData.m_pageId)
+
+    if pageInfo is not None and pageInfo[0] != pageData.m_modifiedDateTime.date():
+      self.movePage(pageData.m_pageId, pageData.m_modifiedDateTime.date(), pageInfo[1])
+
+  def onPageTitleUpdated(self, pageId: int, pageTitle: str, isModification: bool):
+    pageInfo = self.pageInfo.get(pageId)
+
+    if pageInfo is not None and pageInfo[1] != pageTitle:
+      self.movePage(pageId, pageInfo[0], pageTitle)     # Maintain sort order within the date
+
+  def onPageDeleted(self, pageId: ENTITY_ID):
+    if pageId in self.pageInfo:
+      self.takePage(pageId)
@@ -1,15 +1,36 @@
 import hashlib
 import base64
 import os
-from cryptography.fernet import Fernet
+from concurrent.futures import ThreadPoolExecutor
+from cryptography.fernet import Fernet, InvalidToken
+from cryptography.exceptions import InvalidTag
 from cryptography.hazmat.primitives import hashes
+from cryptography.hazmat.primitives.ciphers.aead import AESGCM
+from cryptography.hazmat.primitives.kdf.hkdf import HKDF
 from cryptography.hazmat.primitives.kdf.pbkdf2 import PBKDF2HMAC
 
+# Encrypted values are stored as a binary envelope: a version byte, followed by the version's data.
+# Version 1 is AES-GCM: a 12-byte nonce, then the ciphertext with its 16-byte tag.  Values written before
+# the envelope existed are Fernet tokens, which are base64 text starting with 'g', so they can't be
+# mistaken for an envelope.
+kEnvelopeVersionAesGcm = 0x01
+kAesGcmNonceSize = 12
+
+# Errors raised when a value can't be decrypted
+DecryptionErrors = (InvalidToken, InvalidTag)
+
+# Below this many tokens, decryptMany decrypts on the calling thread; the pool isn't worth starting
+kMinParallelDecryptCount = 64
+
+# Number of tokens each pool task decrypts
+kDecryptBatchSize = 32
+
 class Encrypter():
   def __init__(self) -> None:
     self.plainTextPassword = ''
     self.salt = b''
     self.fernet = None
+    self.aesGcm = None
 
   def hasPassword(self) -> bool:
     return len(self.plainTextPassword) > 0
@@ -17,16 +38,18 @@ class Encrypter():
   def setPasswordAndSalt(self, plainTextPassword: str, salt: bytes) -> None:
     self.plainTextPassword = plainTextPassword
     self.salt = salt
-    self.fernet = self.createFernet()
+    self.createCiphers()
 
   def setPasswordGenerateSalt(self, plainTextPassword: str) -> None:
     self.plainTextPassword = plainTextPassword
     self.salt = os.urandom(16)
-    self.fernet = self.createFernet()
+    self.createCiphers()
 
   def clear(self):
     self.plainTextPassword = ''
     self.salt = b''
+    self.fernet = None
+    self.aesGcm = None
 
   def hashedPassword(self):
     return self.hashValue(self.plainTextPassword) if len(self.plainTextPassword) > 0 else None
@@ -37,12 +60,16 @@ class Encrypter():
     m.update(valueAsBytes)
     return m.hexdigest()
 
-  def createFernet(self) -> Fernet | None:
-    """ Creates a Fernet object, which is used to encrypt and decrypt messages.
-        The password and salt must exist when calling this function.
+  def createCiphers(self) -> None:
+    """ Creates the ciphers used to encrypt and decrypt messages: AES-GCM for the storage envelope, and
+        Fernet for values written before the envelope existed.  The password and salt must exist when
+        calling this function.
     """
+    self.fernet = None
+    self.aesGcm = None
+
     if len(self.salt) == 0 or len(self.plainTextPassword) == 0:
-      return None
+      return
 
     passwordBytes = bytes(self.plainTextPassword, 'utf-8')
 
@@ -52,25 +79,78 @@ class Encrypter():
         salt=self.salt,
         iterations=480000)
 
-    key = base64.urlsafe_b64encode(kdf.derive(passwordBytes))
-    return Fernet(key)
+    masterKey = kdf.derive(passwordBytes)
+    self.fernet = Fernet(base64.urlsafe_b64encode(masterKey))
+
+    # The AES-GCM key is derived from the master key, so that the two ciphers never share a key
+    hkdf = HKDF(
+        algorithm=hashes.SHA256(),
+        length=32,
+        salt=None,
+        info=b'pynotebook-envelope-aesgcm')
+
+    self.aesGcm = AESGCM(hkdf.derive(masterKey))
 
   def encrypt(self, contents: str) -> bytes:
+    return self.encryptBytes(bytes(contents, 'utf-8'))
+
+  def encryptBytes(self, contentsBytes: bytes) -> bytes:
     if len(self.salt) == 0 or len(self.plainTextPassword) == 0:
       return b''
 
-    if self.fernet is None:
-      raise Exception('Encrypt: fernet not initialized.')
+    if self.aesGcm is None:
+      raise Exception('Encrypt: cipher not initialized.')
+
+    header = bytes([kEnvelopeVersionAesGcm])
+    nonce = os.urandom(kAesGcmNonceSize)
 
-    contentsBytes = bytes(contents, 'utf-8')
-    encryptedContents = self.fernet.encrypt(contentsBytes)
+    # The version byte is authenticated along with the contents
+    return header + nonce + self.aesGcm.encrypt(nonce, contentsBytes, header)
 
-    return encryptedContents
+  def isLegacyValue(self, encryptedContents: bytes) -> bool:
+    """ Returns True if the value is a Fernet token, rather than a storage envelope. """
+    return len(encryptedContents) > 0 and encryptedContents[0] != kEnvelopeVersionAesGcm
 
   def decrypt(self, encryptedContents: bytes) -> str:
+    decryptedContentsBytes = self.decryptBytes(encryptedContents)
+    decryptedContentsStr = decryptedContentsBytes.decode()
+    return decryptedContentsStr
+
+  def decryptBytes(self, encryptedContents: bytes) -> bytes:
     if self.fernet is None:
       raise Exception('Decrypt: fernet not initialized.')
 
-    decryptedContentsBytes = self.fernet.decrypt(encryptedContents)
-    decryptedContentsStr = decryptedContentsBytes.decode()
-    return decryptedContentsStr
+    if len(encryptedContents) == 0:
+      # A column that has never been written, such as the tags of a new page
+      return b''
+
+    if encryptedContents[0] == kEnvelopeVersionAesGcm and self.aesGcm is not None:
+      header = encryptedContents[:1]
+      nonce = encryptedContents[1:1 + kAesGcmNonceSize]
+      return self.aesGcm.decrypt(nonce, encryptedContents[1 + kAesGcmNonceSize:], header)
+    else:
+      return self.fernet.decrypt(encryptedContents)
+
+  def decryptMany(self, encryptedItems: list[bytes]) -> list[str]:
+    """ Decrypts a list of tokens, returning the results in the same order.  Large lists are split into
+        batches that are decrypted on a thread pool; the cryptography backend releases the GIL while it works.
+    """
+    return [decryptedItem.decode() for decryptedItem in self.decryptManyBytes(encryptedItems)]
+
+  def decryptManyBytes(self, encryptedItems: list[bytes]) -> list[bytes]:
+    """ Same as decryptMany, but returns the decrypted bytes. """
+    if self.fernet is None:
+      raise Exception('Decrypt: fernet not initialized.')
+
+    if len(encryptedItems) < kMinParallelDecryptCount:
+      return self.decryptBatch(encryptedItems)
+
+    batches = [encryptedItems[i:i + kDecryptBatchSize] for i in range(0, len(encryptedItems), kDecryptBatchSize)]
+
+    with ThreadPoolExecutor(max_workers=os.cpu_count()) as executor:
+      decryptedBatches = executor.map(self.decryptBatch, batches)
+
+      return [decryptedItem for batch in decryptedBatches for decryptedItem in batch]
+
+  def decryptBatch(self, encryptedItems: list[bytes]) -> list[bytes]:
+    return [self.decryptBytes(item) for item in encryptedItems]
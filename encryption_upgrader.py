@@ -0,0 +1,59 @@
+from PySide6 import QtCore
+import logging
+
+from database import Database
+from database_worker import AsyncDatabase
+
+# Number of pages converted each time the timer fires
+kUpgradeBatchSize = 20
+
+# Time between batches, in milliseconds.  This keeps the UI responsive while the conversion runs.
+kUpgradeInterval = 200
+
+class EncryptionUpgrader(QtCore.QObject):
+  """ Converts the pages of an encrypted notebook from Fernet tokens to the storage envelope, a few pages at
+      a time, while the notebook is open.  The batches run on the database worker thread, so that they are
+      queued with the page saves made there. """
+  batchDone = QtCore.Signal(int)      # Number of pages converted, or -1; emitted on the worker thread
+
+  def __init__(self, db: Database, asyncDb: AsyncDatabase, parent=None):
+    super(EncryptionUpgrader, self).__init__(parent)
+    self.db = db
+    self.asyncDb = asyncDb
+    self.numPagesUpgraded = 0
+    self.running = False
+
+    self.timer = QtCore.QTimer(self)
+    self.timer.setSingleShot(True)
+    self.timer.setInterval(kUpgradeInterval)
+    self.timer.timeout.connect(self.onTimeout)
+    self.batchDone.connect(self.onBatchDone)      # Queued, since it is emitted on the worker thread
+
+  def start(self):
+    """ Starts converting pages, if the open notebook is encrypted. """
+    self.numPagesUpgraded = 0
+
+    if self.db.encrypter.hasPassword():
+      self.running = True
+      self.timer.start()
+
+  def stop(self):
+    self.running = False
+    self.timer.stop()
+
+  def onTimeout(self):
+    if not self.running or not self.asyncDb.isOpen:
+      return
+
+    self.asyncDb.post('upgradeLegacyEncryption', (kUpgradeBatchSize,), self.batchDone.emit)
+
+  @QtCore.Slot(int)
+  def onBatchDone(self, numPages: int):
+    if not self.running:
+      return      # Stopped while the batch ran
+
+    if numPages > 0:
+      self.numPagesUpgraded += numPages
+      self.timer.start()
+    elif numPages == 0 and self.numPagesUpgraded > 0:
+      logging.info(f'[EncryptionUpgrader.onBatchDone] Converted {self.numPagesUpgraded} pages to the storage envelope')
@@ -2,7 +2,7 @@ from re import U
 from PySide6 import QtCore, QtGui, QtWidgets
 
 from notebook_types import ENTITY_ID, PAGE_TYPE
-from page_tree import CPageTree
+from page_tree_view import CPageTreeView
 from switchboard import Switchboard
 from ui_folder_edit_widget import Ui_FolderEditWidget
 
@@ -14,7 +14,7 @@ class FolderEditWidget(QtWidgets.QWidget):
 
     self.ui.listWidget.setIconSize(QtCore.QSize(20, 20))
 
-  def initialize(self, pageTree: CPageTree, switchboard: Switchboard):
+  def initialize(self, pageTree: CPageTreeView, switchboard: Switchboard):
     self.pageTree = pageTree
     self.switchboard = switchboard
 
@@ -0,0 +1,22 @@
+from PySide6 import QtCore, QtGui, QtWidgets
+
+class ImageViewDlg(QtWidgets.QDialog):
+  """ Shows an image at full size, scrolled if it doesn't fit. """
+  def __init__(self, pixmap: QtGui.QPixmap, parent: QtWidgets.QWidget) -> None:
+    super(ImageViewDlg, self).__init__(parent)
+
+    self.setWindowTitle('Image')
+
+    imageLabel = QtWidgets.QLabel()
+    imageLabel.setPixmap(pixmap)
+
+    scrollArea = QtWidgets.QScrollArea()
+    scrollArea.setWidget(imageLabel)
+    scrollArea.setAlignment(QtCore.Qt.AlignmentFlag.AlignCenter)
+
+    layout = QtWidgets.QVBoxLayout(self)
+    layout.addWidget(scrollArea)
+
+    # Start out large enough to show the whole image, if the screen allows
+    availableSize = self.screen().availableSize() * 0.9
+    self.resize(pixmap.size().boundedTo(availableSize).grownBy(QtCore.QMargins(30, 30, 30, 30)))
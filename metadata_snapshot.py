@@ -0,0 +1,92 @@
+# Snapshot of the metadata of every page in an encrypted notebook.  It is stored as a single encrypted
+# global value, so that opening the notebook needs one decryption instead of one for each title and tags
+# column.  It is kept up to date in memory as pages change, and written when the notebook is closed.
+import datetime
+import json
+import logging
+
+from page_data import PageData, PageDataDict, PageIdDict
+from notebook_types import ENTITY_ID, kInvalidPageId
+from utility import stringToArray
+
+# Increase this when the layout of the snapshot changes; snapshots of other versions are ignored.
+kSnapshotVersion = 1
+
+class MetadataSnapshot:
+  def __init__(self, signature: str = '') -> None:
+    # Fields of each page, by page ID
+    self.pages: dict[ENTITY_ID, dict] = {}
+
+    # Summary of the pages table when the snapshot was written.  If the table no longer matches it,
+    # the notebook was changed without the snapshot being updated, and the snapshot is stale.
+    self.signature = signature
+
+    self.modified = False
+
+  @staticmethod
+  def fromJson(jsonStr: str) -> 'MetadataSnapshot | None':
+    """ Creates a snapshot from its stored form.  Returns None if it can't be read, or is from another version. """
+    try:
+      snapshotDict = json.loads(jsonStr)
+    except ValueError:
+      logging.error('[MetadataSnapshot.fromJson] The snapshot could not be parsed')
+      return None
+
+    if not isinstance(snapshotDict, dict) or snapshotDict.get('version') != kSnapshotVersion:
+      return None
+
+    snapshot = MetadataSnapshot(snapshotDict.get('signature', ''))
+    snapshot.pages = { int(pageId): fields for pageId, fields in snapshotDict.get('pages', {}).items() }
+    return snapshot
+
+  def toJson(self) -> str:
+    return json.dumps({ 'version': kSnapshotVersion, 'signature': self.signature, 'pages': self.pages })
+
+  def setPage(self, pageId: ENTITY_ID, parentId: ENTITY_ID, pageType: int, title: str, tags: str, lastModified: float, sortKey: int) -> None:
+    self.pages[pageId] = { 'parentId': parentId, 'pageType': pageType, 'title': title, 'tags': tags,
+                           'lastModified': lastModified, 'sortKey': sortKey }
+    self.modified = True
+
+  def updatePage(self, pageId: ENTITY_ID, **fields) -> None:
+    """ Changes some of the fields of a page.  Pages that are not in the snapshot are ignored. """
+    if pageId in self.pages:
+      self.pages[pageId].update(fields)
+      self.modified = True
+
+  def removePage(self, pageId: ENTITY_ID) -> None:
+    if self.pages.pop(pageId, None) is not None:
+      self.modified = True
+
+  def pageDict(self) -> PageDataDict:
+    """ Returns the pages in the form returned by Database.getPageList. """
+    return { pageId: self.pageData(pageId, fields) for pageId, fields in self.pages.items() }
+
+  def topLevelPageDict(self, extraPageId: ENTITY_ID) -> PageDataDict:
+    """ Returns the pages in the form returned by Database.getTopLevelPageList. """
+    return { pageId: self.pageData(pageId, fields) for pageId, fields in self.pages.items()
+             if fields['parentId'] == kInvalidPageId or pageId == extraPageId }
+
+  @staticmethod
+  def pageData(pageId: ENTITY_ID, fields: dict) -> PageData:
+    newPage = PageData()
+
+    newPage.m_pageId = pageId
+    newPage.m_parentId = fields['parentId']
+    newPage.m_modifiedDateTime = datetime.datetime.fromtimestamp(fields['lastModified'])
+    newPage.m_title = fields['title']
+    newPage.m_pageType = fields['pageType']
+    newPage.m_sortKey = fields['sortKey']
+
+    return newPage
+
+  def tagDict(self) -> PageIdDict:
+    """ Returns the tags in the form returned by Database.getTagList. """
+    pageIdDict = {}
+
+    for pageId, fields in self.pages.items():
+      tagsArray = stringToArray(fields['tags'].strip())
+
+      if len(tagsArray) > 0:
+        pageIdDict[pageId] = tagsArray
+
+    return pageIdDict
@@ -0,0 +1,176 @@
+# Fills the navigation controls of a newly opened notebook in stages, so that the notebook is usable
+# before every page has been added to every control:
+#
+#   1. Only the top-level pages and the last viewed page are read, and given to the page tree right away, so
+#      that the notebook can be shown.
+#   2. The full page and tag lists are read on the database worker thread.  When the page list arrives, the
+#      rest of the pages are merged into the page tree, which only creates rows as folders are expanded.  The
+#      title list and the date tree are then filled from the event loop, a batch at a time, then the tags.
+#   3. Finally, any pages that couldn't be placed in the tree are recovered.
+from PySide6 import QtCore
+from typing import Iterator
+import logging
+
+from database import Database
+from database_worker import AsyncDatabase
+from pageCache import PageCache
+from switchboard import Switchboard
+from tagCache import TagCache
+from page_data import PageDataDict, PageIdDict
+from page_recovery import PageRecovery
+from page_tree_view import CPageTreeView
+from page_title_list import CPageTitleList
+from date_tree import CDateTree
+from tag_list import CTagList
+from notebook_types import PAGE_TYPE, ENTITY_ID, kInvalidPageId
+
+# Number of items added to a control each time the event loop runs a stage
+kLoadBatchSize = 500
+
+class NotebookLoader(QtCore.QObject):
+  progress = QtCore.Signal(int, int)      # Number of pages loaded, total number of pages
+  treeLoaded = QtCore.Signal()            # The page tree has every page
+  finished = QtCore.Signal()
+
+  def __init__(self, db: Database, asyncDb: AsyncDatabase, switchboard: Switchboard, pageCache: PageCache, tagCache: TagCache,
+               pageTree: CPageTreeView, pageTitleList: CPageTitleList, dateTree: CDateTree, tagList: CTagList, parent=None):
+    super(NotebookLoader, self).__init__(parent)
+    self.db = db
+    self.asyncDb = asyncDb
+    self.pageCache = pageCache
+    self.tagCache = tagCache
+    self.pageTree = pageTree
+    self.pageTitleList = pageTitleList
+    self.dateTree = dateTree
+    self.tagList = tagList
+
+    self.stages: Iterator[int] | None = None
+    self.totalSteps = 0
+    self.waitingForPageList = False
+    self.pageTags: PageIdDict | None = None     # Set when the tag list arrives
+
+    self.timer = QtCore.QTimer(self)
+    self.timer.setInterval(0)
+    self.timer.timeout.connect(self.onTimeout)
+
+    switchboard.pageListLoaded.connect(self.onPageListLoaded)
+    switchboard.tagListLoaded.connect(self.onTagListLoaded)
+
+  def isLoading(self) -> bool:
+    return self.waitingForPageList or self.stages is not None
+
+  def start(self, lastViewedPageId: ENTITY_ID = kInvalidPageId) -> None:
+    """ Gives the page tree the top-level pages and the last viewed page, and requests the full page and tag
+        lists from the database worker.  The rest of the loading is done as they arrive. """
+    self.stop()
+
+    pageDict, success = self.db.getTopLevelPageList(lastViewedPageId)
+
+    if success:
+      self.pageCache.addPages(pageDict)
+      self.pageTree.setPages(pageDict)
+
+    self.waitingForPageList = True
+    self.asyncDb.getPageList()
+    self.asyncDb.getTagList()
+
+  def stop(self) -> None:
+    self.timer.stop()
+    self.stages = None
+    self.waitingForPageList = False
+    self.pageTags = None
+
+  def onPageListLoaded(self, pageDict: PageDataDict, success: bool) -> None:
+    """ Adds the rest of the pages to the page tree.  The remaining stages are run from the event loop. """
+    if not self.waitingForPageList:
+      return      # Loading was stopped after the list was requested
+
+    self.waitingForPageList = False
+
+    if not success or len(pageDict) == 0:
+      self.stop()
+      self.finished.emit()
+      return
+
+    self.pageCache.addPages(pageDict)
+    self.pageTree.addPages(pageDict)
+
+    # The title list and the date tree each add every page
+    self.totalSteps = len(pageDict) * 2
+    self.stages = self.runStages(pageDict)
+    self.progress.emit(0, self.totalSteps)
+    self.timer.start()
+
+  def onTagListLoaded(self, pageIdDict: PageIdDict, success: bool) -> None:
+    if not self.isLoading():
+      return
+
+    if not success:
+      logging.error('[NotebookLoader.onTagListLoaded] The tag list could not be read')
+      pageIdDict = {}
+
+    self.pageTags = pageIdDict
+
+    if self.stages is not None:
+      self.timer.start()      # The stages may be waiting for the tags
+
+  def onTimeout(self) -> None:
+    if self.stages is None:
+      self.timer.stop()
+      return
+
+    stepsDone = next(self.stages, None)
+
+    if stepsDone is None:
+      self.stop()
+      self.finished.emit()
+    else:
+      self.progress.emit(stepsDone, self.totalSteps)
+
+  def runStages(self, pageDict: PageDataDict) -> Iterator[int]:
+    """ Runs the later stages, yielding the number of steps done after each batch. """
+    stepsDone = 0
+
+    # Run from the event loop, so that the last viewed page has been shown
+    self.treeLoaded.emit()
+
+    # Stage 2: the title list, the date tree and the tags
+    pageList = list(pageDict.values())
+
+    for batchStart in range(0, len(pageList), kLoadBatchSize):
+      batch = pageList[batchStart:batchStart + kLoadBatchSize]
+
+      for pageData in batch:
+        self.pageTitleList.addPageTitleItem(pageData.m_pageId, pageData.m_title)
+
+      stepsDone += len(batch)
+      yield stepsDone
+
+    for batchStart in range(0, len(pageList), kLoadBatchSize):
+      batch = pageList[batchStart:batchStart + kLoadBatchSize]
+
+      for pageData in batch:
+        if pageData.m_pageType == PAGE_TYPE.kPageTypeUserText.value:
+          self.dateTree.addItem(pageData)
+
+      stepsDone += len(batch)
+      yield stepsDone
+
+    # The tag list was requested along with the page list
+    while self.pageTags is None:
+      self.timer.stop()       # Restarted when the tags arrive
+      yield stepsDone
+
+    if len(self.pageTags) > 0:
+      self.tagCache.addTags(self.pageTags)       # The tag list adds the tags as the cache reports them
+
+    yield stepsDone
+
+    # Stage 3: pages that couldn't be placed in the tree.  The page list already has every page and its
+    # parent, so the database doesn't need to be read again.
+    pagesAndParents = [(pageId, pageData.m_parentId) for pageId, pageData in pageDict.items()]
+    pageRecovery = PageRecovery(pagesAndParents, self.pageTree.getTreeIdList())
+
+    if pageRecovery.thereAreLostPages():
+      logging.info('[NotebookLoader.runStages] Some pages were missing from the page tree, and are being restored')
+      self.pageTree.addItemsNew(pageDict, pageRecovery.recoverPages())
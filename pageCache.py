@@ -1,14 +1,37 @@
 
-from page_data import PageDataDict
+from collections import OrderedDict
+import copy
+import sys
+
+from page_data import PageData, PageDataDict
 from notebook_types import ENTITY_ID
 
+# Default limit on the memory used by decoded pages
+kDefaultPageCacheBytes = 32 * 1024 * 1024
+
+# Rough size of a decoded page, apart from its text
+kPageOverheadBytes = 1024
+
 
 class PageCache:
-  """Implements a simple page cache.  The cache is a dictionary that maps page IDs to page titles.
+  """Implements a two-tier page cache.  The first tier maps the ID of every page to its title.  The second
+  is a least-recently-used cache of fully decoded pages, limited by the memory the pages use, so that
+  revisiting a recent page doesn't need a query or decryption.  Decoded pages are handed out as copies,
+  so that edits to a displayed page don't reach the cache until they are saved.
   """
-  def __init__(self, capacity=100):
+  def __init__(self, capacityBytes: int = kDefaultPageCacheBytes):
     self.pageDict: dict[ENTITY_ID, str] = {}
 
+    self.capacityBytes = capacityBytes
+    self.decodedPages: OrderedDict[ENTITY_ID, tuple[PageData, int]] = OrderedDict()
+    self.decodedBytes = 0
+
+    # Number of times each page has been invalidated, so that a read can tell whether the page changed while it was being read
+    self.generations: dict[ENTITY_ID, int] = {}
+
+    self.hits = 0
+    self.misses = 0
+
   def addPages(self, pages: PageDataDict) -> None:
     for pageId, pageData in pages.items():
       self.pageDict[pageId] = pageData.m_title
@@ -20,11 +43,77 @@ class PageCache:
     if pageId in self.pageDict:
       del self.pageDict[pageId]
 
+    self.invalidatePage(pageId)
+
   def pageTitle(self, pageId: ENTITY_ID) -> str:
     return self.pageDict.get(pageId, '')
 
   def updatePageTitleForPage(self, pageId: ENTITY_ID, title: str) -> None:
     self.pageDict[pageId] = title
 
+  @staticmethod
+  def pageBytes(pageData: PageData) -> int:
+    return kPageOverheadBytes + sys.getsizeof(pageData.m_contentString) + sys.getsizeof(pageData.m_title) + sys.getsizeof(pageData.m_tags)
+
+  def hasDecodedPage(self, pageId: ENTITY_ID) -> bool:
+    return pageId in self.decodedPages
+
+  def getDecodedPage(self, pageId: ENTITY_ID) -> PageData | None:
+    """ Returns a copy of a decoded page, or None if the page isn't cached. """
+    entry = self.decodedPages.get(pageId)
+
+    if entry is None:
+      self.misses += 1
+      return None
+
+    self.hits += 1
+    self.decodedPages.move_to_end(pageId)
+    return copy.deepcopy(entry[0])
+
+  def pageGeneration(self, pageId: ENTITY_ID) -> int:
+    return self.generations.get(pageId, 0)
+
+  def addDecodedPage(self, pageData: PageData, generation: int | None = None) -> bool:
+    """ Caches a copy of a page, as it was read from the database.  generation is the page's generation when the
+        read started.  Returns False, without caching the page, if the page has changed since. """
+    if generation is not None and generation != self.pageGeneration(pageData.m_pageId):
+      return False
+
+    self.dropDecodedPage(pageData.m_pageId)
+
+    size = self.pageBytes(pageData)
+
+    if size > self.capacityBytes:
+      # Too big to cache at all
+      return True
+
+    self.decodedPages[pageData.m_pageId] = (copy.deepcopy(pageData), size)
+    self.decodedBytes += size
+
+    # Evict the least recently used pages until the cache fits
+    while self.decodedBytes > self.capacityBytes:
+      evictedPageId, (evictedPage, evictedSize) = self.decodedPages.popitem(last=False)
+      self.decodedBytes -= evictedSize
+
+    return True
+
+  def invalidatePage(self, pageId: ENTITY_ID) -> None:
+    """ Drops the decoded copy of a page, because the page has changed. """
+    self.generations[pageId] = self.pageGeneration(pageId) + 1
+    self.dropDecodedPage(pageId)
+
+  def dropDecodedPage(self, pageId: ENTITY_ID) -> None:
+    entry = self.decodedPages.pop(pageId, None)
+
+    if entry is not None:
+      self.decodedBytes -= entry[1]
+
+  def clearDecodedPages(self) -> None:
+    self.decodedPages.clear()
+    self.decodedBytes = 0
+
   def clear(self):
     self.pageDict.clear()
+    self.clearDecodedPages()
+    self.hits = 0
+    self.misses = 0
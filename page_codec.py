@@ -0,0 +1,62 @@
+# Compression of page contents.  Page contents are HTML with a lot of repeated inline styling, so they
+# compress well.  They are compressed before they are encrypted.
+#
+# A compressed value starts with a marker byte (0), followed by a byte that identifies the codec, followed by
+# the compressed UTF-8 text.  Values without the marker are plain UTF-8 text, as they were always stored
+# before; a 0 byte can't start valid page contents, so the two are never confused.
+import logging
+import zlib
+
+try:
+  import zstandard
+except ImportError:
+  zstandard = None
+
+kCodecMarker = 0x00
+
+kCodecZlib = 1
+kCodecZstd = 2
+
+# Contents shorter than this are stored as they are; compression would save little or nothing
+kMinCompressLength = 256
+
+kZlibLevel = 6
+kZstdLevel = 3
+
+def encodeContents(contents: str) -> bytes:
+  """ Returns the stored form of page contents: compressed, if that makes them smaller. """
+  contentsBytes = bytes(contents, 'utf-8')
+
+  if len(contentsBytes) < kMinCompressLength:
+    return contentsBytes
+
+  if zstandard is not None:
+    codec = kCodecZstd
+    compressedBytes = zstandard.ZstdCompressor(level=kZstdLevel).compress(contentsBytes)
+  else:
+    codec = kCodecZlib
+    compressedBytes = zlib.compress(contentsBytes, kZlibLevel)
+
+  if len(compressedBytes) + 2 >= len(contentsBytes):
+    return contentsBytes
+
+  return bytes([kCodecMarker, codec]) + compressedBytes
+
+def decodeContents(data: bytes) -> str:
+  """ Returns page contents from their stored form, which may or may not be compressed. """
+  if len(data) < 2 or data[0] != kCodecMarker:
+    return data.decode('utf-8')
+
+  codec = data[1]
+
+  if codec == kCodecZlib:
+    return zlib.decompress(data[2:]).decode('utf-8')
+  elif codec == kCodecZstd:
+    if zstandard is None:
+      logging.error('[decodeContents] This page is compressed with zstd, but the zstandard package is not installed')
+      return ''
+
+    return zstandard.ZstdDecompressor().decompress(data[2:]).decode('utf-8')
+  else:
+    logging.error(f'[decodeContents] Unknown codec: {codec}')
+    return ''
@@ -1,5 +1,6 @@
 # Class for a page item.
 import datetime
+from typing import Any
 from notebook_types import ENTITY_ID, ENTITY_LIST, PAGE_TYPE, kInvalidPageId
 
 
@@ -18,10 +19,38 @@ class PageData:
     self.m_numModifications = 0
     self.m_additionalDataItems: list[str] = []
     self.m_bIsFavorite = False			# True if the page is a "favorite" page
+    self.m_sortKey = 0              # Position of the page among its siblings (see page_order.py)
+
+    # Column values as they were when the page was last read from or written to the database
+    self.m_savedValues: dict[str, Any] = {}
 
   def additionalItems(self) -> str:
     return ','.join(self.m_additionalDataItems) if len(self.m_additionalDataItems) > 0 else ''
 
+  def columnValues(self) -> dict[str, Any]:
+    """ Returns the values of the columns written by Database.updatePage, by column name. """
+    return {
+      'contents': self.m_contentString,
+      'pagetitle': self.m_title,
+      'tags': self.m_tags,
+      'lastmodified': self.m_modifiedDateTime,
+      'nummodifications': self.m_numModifications,
+      'additionalitems': self.additionalItems(),
+      'isfavorite': self.m_bIsFavorite
+    }
+
+  def markClean(self, columns: list[str] | None = None) -> None:
+    """ Records that the given columns (or all columns, if None) match what is in the database. """
+    currentValues = self.columnValues()
+
+    for column in currentValues.keys() if columns is None else columns:
+      self.m_savedValues[column] = currentValues[column]
+
+  def dirtyColumns(self) -> list[str]:
+    """ Returns the columns that have changed since the page was last read or written. """
+    currentValues = self.columnValues()
+    return [column for column, value in currentValues.items() if column not in self.m_savedValues or self.m_savedValues[column] != value]
+
 
 PageDataDict = dict[ENTITY_ID, PageData]      # Used when loading a new Notebook
 PageIdDict = dict[ENTITY_ID, list[str]]       # Used when loading a new Notebook
\ No newline at end of file
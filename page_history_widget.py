@@ -39,6 +39,10 @@ class CPageHistoryWidget(QtWidgets.QListWidget):
   def getMostRecentlyViewedPage(self) -> ENTITY_ID:
     return self.pageIdForItem(self.item(0)) if self.count() > 0 else kInvalidPageId
 
+  def recentPageIds(self, count: int) -> list[ENTITY_ID]:
+    """ Returns the IDs of the most recently viewed pages, most recent first. """
+    return [self.pageIdForItem(self.item(i)) for i in range(min(count, self.count()))]
+
   def addHistoryItem(self, pageId: ENTITY_ID, title: str, addAtEnd: bool = False):
     item = self.findItem(pageId)
 
@@ -0,0 +1,85 @@
+# Sibling order of pages.  Each page has a sort key, stored in the pages table, and the children of a
+# folder (or the top-level pages) are displayed in ascending sort key order.  Sort keys are spaced
+# apart, so that a page can usually be placed between two others by changing only its own key.
+from page_data import PageDataDict
+from notebook_types import ENTITY_ID, ENTITY_LIST, ENTITY_PAIR_LIST, kInvalidPageId
+
+# Space between the sort keys of adjacent siblings, when they are numbered
+kSortKeyGap = 1024
+
+def sortKeysForCount(count: int) -> list[int]:
+  """ Returns evenly spaced sort keys for the given number of siblings. """
+  return [(i + 1) * kSortKeyGap for i in range(count)]
+
+def sortKeyBetween(before: int | None, after: int | None) -> int | None:
+  """Returns a sort key that falls between two sibling sort keys.
+
+  Args:
+      before (int | None): Sort key of the previous sibling, or None if there isn't one
+      after (int | None): Sort key of the next sibling, or None if there isn't one
+
+  Returns:
+      int | None: The sort key, or None if there is no room between the two keys.  In that case,
+                  the siblings must be renumbered.
+  """
+  if before is None and after is None:
+    return kSortKeyGap
+  elif before is None:
+    return after - kSortKeyGap
+  elif after is None:
+    return before + kSortKeyGap
+  elif after - before > 1:
+    return (before + after) // 2
+  else:
+    return None
+
+def orderedPageIds(pageDict: PageDataDict) -> ENTITY_LIST:
+  """ Returns the IDs of the pages in tree order: each page is followed by its children, and siblings are
+      in sort key order.  Pages whose parent does not exist are not included. """
+  childrenDict: dict[ENTITY_ID, ENTITY_LIST] = {}
+
+  for pageData in pageDict.values():
+    childrenDict.setdefault(pageData.m_parentId, []).append(pageData.m_pageId)
+
+  for children in childrenDict.values():
+    children.sort(key=lambda pageId: (pageDict[pageId].m_sortKey, pageId))
+
+  pageIdList = []
+  visited = set()
+  stack = list(reversed(childrenDict.get(kInvalidPageId, [])))
+
+  while len(stack) > 0:
+    pageId = stack.pop()
+
+    if pageId in visited:
+      continue
+
+    visited.add(pageId)
+    pageIdList.append(pageId)
+    stack.extend(reversed(childrenDict.get(pageId, [])))
+
+  return pageIdList
+
+def sortKeysFromPageOrder(pagesAndParents: ENTITY_PAIR_LIST, pageOrder: ENTITY_LIST) -> dict[ENTITY_ID, int]:
+  """ Numbers the sort keys of each group of siblings according to their position in a page order list.
+      Pages that are not in the list are placed after the others, in page ID order.  Returns the sort
+      keys by page ID. """
+  positionDict: dict[ENTITY_ID, int] = {}
+
+  for position, pageId in enumerate(pageOrder):
+    positionDict.setdefault(pageId, position)
+
+  childrenDict: dict[ENTITY_ID, ENTITY_LIST] = {}
+
+  for pageId, parentId in pagesAndParents:
+    childrenDict.setdefault(parentId, []).append(pageId)
+
+  sortKeyDict = {}
+
+  for children in childrenDict.values():
+    children.sort(key=lambda pageId: (positionDict.get(pageId, len(pageOrder)), pageId))
+
+    for pageId, sortKey in zip(children, sortKeysForCount(len(children))):
+      sortKeyDict[pageId] = sortKey
+
+  return sortKeyDict
@@ -0,0 +1,100 @@
+from PySide6 import QtCore, QtWidgets
+
+from database import Database
+from database_worker import AsyncDatabase
+from page_data import PageData
+from notebook_types import ENTITY_ID, ENTITY_LIST
+
+# Time to wait after a page is displayed before prefetching starts, in milliseconds
+kPrefetchDelay = 500
+
+# Time between prefetched pages, in milliseconds.  Pages are read one at a time, so that pages the user opens
+# don't wait long behind them on the database worker.
+kPrefetchInterval = 20
+
+# Largest number of pages queued for prefetching
+kMaxPrefetchPages = 30
+
+# Events that show the user is interacting with the app
+kInteractionEvents = {
+  QtCore.QEvent.Type.KeyPress,
+  QtCore.QEvent.Type.MouseButtonPress,
+  QtCore.QEvent.Type.MouseButtonDblClick,
+  QtCore.QEvent.Type.Wheel
+}
+
+class PagePrefetcher(QtCore.QObject):
+  """ Reads the pages that are likely to be opened next into the database's page cache while the app is
+      idle, so that opening them needs no query or decryption.  The pages are read on the database worker
+      thread.  Prefetching stops as soon as the user interacts with the watched widgets, and is restarted
+      when the next page is displayed. """
+  pageFetched = QtCore.Signal(int, object, int)     # Page ID, PageData (or None), page cache generation; emitted on the worker thread
+
+  def __init__(self, db: Database, asyncDb: AsyncDatabase, parent=None):
+    super(PagePrefetcher, self).__init__(parent)
+    self.db = db
+    self.asyncDb = asyncDb
+    self.pageIds: ENTITY_LIST = []
+    self.fetching = False       # True while a page is being read
+
+    self.timer = QtCore.QTimer(self)
+    self.timer.setSingleShot(True)
+    self.timer.timeout.connect(self.onTimeout)
+
+    self.pageFetched.connect(self.onPageFetched)      # Queued, since it is emitted on the worker thread
+
+  def watch(self, widget: QtWidgets.QWidget):
+    """ Interaction with the widget stops prefetching. """
+    widget.installEventFilter(self)
+
+  def prefetch(self, pageIds: ENTITY_LIST):
+    """ Queues pages for prefetching, most likely first, and starts prefetching once the app is idle. """
+    self.pageIds = []
+
+    for pageId in pageIds:
+      if pageId not in self.pageIds and not self.db.pageCache.hasDecodedPage(pageId):
+        self.pageIds.append(pageId)
+
+      if len(self.pageIds) == kMaxPrefetchPages:
+        break
+
+    if len(self.pageIds) > 0:
+      self.timer.start(kPrefetchDelay)
+
+  def stop(self):
+    self.timer.stop()
+    self.pageIds = []
+
+  def eventFilter(self, watched: QtCore.QObject, event: QtCore.QEvent) -> bool:
+    if event.type() in kInteractionEvents and len(self.pageIds) > 0:
+      self.stop()
+
+    return False
+
+  def onTimeout(self):
+    if not self.asyncDb.isOpen:
+      self.pageIds = []
+      return
+
+    if self.fetching:
+      return      # The next page is read when this one arrives
+
+    while len(self.pageIds) > 0:
+      pageId: ENTITY_ID = self.pageIds.pop(0)
+
+      if not self.db.pageCache.hasDecodedPage(pageId):
+        # The read goes straight to the worker, so that it isn't counted as a cache miss
+        generation = self.db.pageCache.pageGeneration(pageId)
+        self.fetching = True
+        self.asyncDb.post('getPage', (pageId,), lambda pageData: self.pageFetched.emit(pageId, pageData, generation))
+        return
+
+  @QtCore.Slot(int, object, int)
+  def onPageFetched(self, pageId: ENTITY_ID, pageData: PageData | None, generation: int):
+    self.fetching = False
+
+    if pageData is not None and self.asyncDb.isOpen:
+      self.db.pageCache.addDecodedPage(pageData, generation)
+
+    if len(self.pageIds) > 0:
+      self.timer.start(kPrefetchInterval)
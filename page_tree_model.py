@@ -0,0 +1,540 @@
+# Item model for a page tree that scales to very large notebooks.  Each page is a small node record, rather
+# than a tree widget item, and the children of a node are only handed to the view when the node is first
+# expanded (see canFetchMore and fetchMore).  Icons are created once and shared by every node.
+from PySide6 import QtCore, QtGui
+from bisect import bisect_left
+
+from database import Database
+from page_data import PageData, PageDataDict
+from page_order import sortKeyBetween, sortKeysForCount
+from notebook_types import PAGE_TYPE, ENTITY_ID, ENTITY_LIST, kInvalidPageId
+
+kPageIdMimeType = 'application/x-pynotebook-pageid'
+
+class PageTreeNode:
+  __slots__ = ('pageId', 'parentId', 'title', 'pageType', 'sortKey', 'children', 'row')
+
+  def __init__(self, pageId: ENTITY_ID, parentId: ENTITY_ID, title: str, pageType: int, sortKey: int) -> None:
+    self.pageId = pageId
+    self.parentId = parentId
+    self.title = title
+    self.pageType = pageType
+    self.sortKey = sortKey
+    self.children: list['PageTreeNode'] | None = None     # None until the view fetches them
+    self.row = -1           # Position in its parent's children, or -1 if the view doesn't have it
+
+  def isFolder(self) -> bool:
+    return self.pageType == PAGE_TYPE.kPageFolder.value
+
+def pageTypeValue(pageType: PAGE_TYPE | int) -> int:
+  return pageType.value if isinstance(pageType, PAGE_TYPE) else pageType
+
+def numberRows(children: list[PageTreeNode], start: int = 0) -> None:
+  """ Brings the rows of the nodes from start onwards up to date, after children were inserted or removed. """
+  for row in range(start, len(children)):
+    children[row].row = row
+
+class PageTreeModel(QtCore.QAbstractItemModel):
+  # A page was moved by drag and drop: page ID, new parent ID, sort keys that changed (by page ID)
+  pageMoved = QtCore.Signal(int, int, object)
+  pageRenamed = QtCore.Signal(int, str)     # A page's title was edited in the view: page ID, new title
+
+  iconCache: dict[str, QtGui.QIcon] = {}
+
+  def __init__(self, db: Database, parent=None):
+    super(PageTreeModel, self).__init__(parent)
+    self.db = db
+    self.root = PageTreeNode(kInvalidPageId, kInvalidPageId, '', PAGE_TYPE.kPageFolder.value, 0)
+    self.root.children = []
+    self.nodes: dict[ENTITY_ID, PageTreeNode] = {}
+
+    # IDs of the children of each node, in sort key order.  Nodes are only given their children (and the
+    # view only sees them) when they are fetched.
+    self.childIds: dict[ENTITY_ID, ENTITY_LIST] = {}
+
+    # Folders that are expanded in the view; they are shown with the open folder icon
+    self.expandedIds: set[ENTITY_ID] = set()
+
+  @classmethod
+  def icon(cls, resourceName: str) -> QtGui.QIcon:
+    icon = cls.iconCache.get(resourceName)
+
+    if icon is None:
+      icon = QtGui.QIcon(f':/NoteBook/Resources/{resourceName}.png')
+      cls.iconCache[resourceName] = icon
+
+    return icon
+
+  def setPages(self, pageDict: PageDataDict) -> None:
+    """ Replaces the contents of the model.  Only the top-level pages are handed to the view. """
+    self.beginResetModel()
+
+    self.nodes = { pageId: PageTreeNode(pageId, pageData.m_parentId, pageData.m_title, pageTypeValue(pageData.m_pageType), pageData.m_sortKey)
+                   for pageId, pageData in pageDict.items() }
+    self.childIds = {}
+
+    for node in self.nodes.values():
+      if node.parentId == kInvalidPageId or node.parentId in self.nodes:
+        self.childIds.setdefault(node.parentId, []).append(node.pageId)
+
+    for children in self.childIds.values():
+      children.sort(key=lambda pageId: (self.nodes[pageId].sortKey, pageId))
+
+    self.root.children = [self.nodes[pageId] for pageId in self.childIds.get(kInvalidPageId, [])]
+    numberRows(self.root.children)
+    self.expandedIds.clear()
+
+    self.endResetModel()
+
+  def addPages(self, pageDict: PageDataDict) -> None:
+    """ Adds the pages that are not in the model yet, without resetting it, so that the view keeps its expanded
+        and selected pages.  Pages already in the model whose parents were missing are placed too. """
+    attachedIds = { pageId for children in self.childIds.values() for pageId in children }
+    addedIds: dict[ENTITY_ID, ENTITY_LIST] = {}     # IDs of the pages to add, by parent ID
+
+    for pageId, pageData in pageDict.items():
+      if pageId not in self.nodes:
+        self.nodes[pageId] = PageTreeNode(pageId, pageData.m_parentId, pageData.m_title, pageTypeValue(pageData.m_pageType), pageData.m_sortKey)
+      elif pageId in attachedIds:
+        continue
+
+      addedIds.setdefault(self.nodes[pageId].parentId, []).append(pageId)
+
+    for parentId, pageIds in addedIds.items():
+      if parentId != kInvalidPageId and parentId not in self.nodes:
+        continue      # Lost pages are left to page recovery
+
+      parentNode = self.nodes.get(parentId, self.root)
+      siblingIds = self.childIds.get(parentId, [])
+
+      if parentNode.children is not None and len(parentNode.children) > 0:
+        # Inserted among the rows the view already has
+        for pageId in pageIds:
+          self.insertNode(self.nodes[pageId])
+
+        continue
+
+      siblingIds = sorted(siblingIds + pageIds, key=lambda pageId: (self.nodes[pageId].sortKey, pageId))
+      parentIndex = self.indexForNode(parentNode)
+
+      if parentNode.children is None and (parentNode is self.root or parentIndex.isValid()) and parentId not in self.childIds:
+        # The view has the parent, and doesn't know that it has children
+        parentNode.children = []
+
+      self.childIds[parentId] = siblingIds
+
+      if parentNode.children is not None:
+        self.beginInsertRows(parentIndex, 0, len(siblingIds) - 1)
+        parentNode.children = [self.nodes[pageId] for pageId in siblingIds]
+        numberRows(parentNode.children)
+        self.endInsertRows()
+
+  def clear(self) -> None:
+    self.setPages({})
+
+  def nodeForIndex(self, index: QtCore.QModelIndex) -> PageTreeNode:
+    return index.internalPointer() if index.isValid() else self.root
+
+  def parentNode(self, node: PageTreeNode) -> PageTreeNode:
+    return self.nodes.get(node.parentId, self.root)
+
+  def indexForNode(self, node: PageTreeNode) -> QtCore.QModelIndex:
+    if node is self.root:
+      return QtCore.QModelIndex()
+
+    parentNode = self.parentNode(node)
+
+    if parentNode.children is None or not 0 <= node.row < len(parentNode.children) or parentNode.children[node.row] is not node:
+      return QtCore.QModelIndex()
+
+    return self.createIndex(node.row, 0, node)
+
+  def indexForPage(self, pageId: ENTITY_ID) -> QtCore.QModelIndex:
+    """ Returns the index of a page, fetching the children of its ancestors if necessary. """
+    node = self.nodes.get(pageId)
+
+    if node is None:
+      return QtCore.QModelIndex()
+
+    ancestors = []
+    parentNode = self.parentNode(node)
+
+    while parentNode is not self.root and parentNode.pageId not in ancestors:
+      ancestors.append(parentNode.pageId)
+      parentNode = self.parentNode(parentNode)
+
+    for ancestorId in reversed(ancestors):
+      ancestorIndex = self.indexForNode(self.nodes[ancestorId])
+
+      if self.canFetchMore(ancestorIndex):
+        self.fetchMore(ancestorIndex)
+
+    return self.indexForNode(node)
+
+  def nodeForPage(self, pageId: ENTITY_ID) -> PageTreeNode | None:
+    return self.nodes.get(pageId)
+
+  def pageTitle(self, pageId: ENTITY_ID) -> str:
+    node = self.nodes.get(pageId)
+    return node.title if node is not None else ''
+
+  def childPageIds(self, pageId: ENTITY_ID) -> ENTITY_LIST:
+    """ Returns the IDs of a page's children (or of the top-level pages, for kInvalidPageId), in tree order. """
+    return list(self.childIds.get(pageId, []))
+
+  def treePageIds(self) -> ENTITY_LIST:
+    """ Returns the IDs of every page in the tree, in the order they appear when fully expanded. """
+    pageIds = []
+    pending = list(reversed(self.childIds.get(kInvalidPageId, [])))
+
+    while len(pending) > 0:
+      pageId = pending.pop()
+      pageIds.append(pageId)
+      pending.extend(reversed(self.childIds.get(pageId, [])))
+
+    return pageIds
+
+  def folderIds(self) -> ENTITY_LIST:
+    return [pageId for pageId in self.treePageIds() if self.nodes[pageId].isFolder()]
+
+  def fetchAll(self) -> None:
+    """ Hands every node to the view, so that it can be fully expanded. """
+    for pageId in self.treePageIds():
+      index = self.indexForNode(self.nodes[pageId])
+
+      if self.canFetchMore(index):
+        self.fetchMore(index)
+
+  def setAllExpanded(self, expanded: bool) -> None:
+    """ Records that every folder was expanded or collapsed.  The view repaints the icons. """
+    self.expandedIds = set(self.folderIds()) if expanded else set()
+
+  # *************************** Model interface ***************************
+
+  def index(self, row: int, column: int, parent: QtCore.QModelIndex = QtCore.QModelIndex()) -> QtCore.QModelIndex:
+    parentNode = self.nodeForIndex(parent)
+
+    if column != 0 or parentNode.children is None or not 0 <= row < len(parentNode.children):
+      return QtCore.QModelIndex()
+
+    return self.createIndex(row, 0, parentNode.children[row])
+
+  def parent(self, index: QtCore.QModelIndex) -> QtCore.QModelIndex:
+    if not index.isValid():
+      return QtCore.QModelIndex()
+
+    return self.indexForNode(self.parentNode(index.internalPointer()))
+
+  def rowCount(self, parent: QtCore.QModelIndex = QtCore.QModelIndex()) -> int:
+    if parent.column() > 0:
+      return 0
+
+    children = self.nodeForIndex(parent).children
+    return len(children) if children is not None else 0
+
+  def columnCount(self, parent: QtCore.QModelIndex = QtCore.QModelIndex()) -> int:
+    return 1
+
+  def hasChildren(self, parent: QtCore.QModelIndex = QtCore.QModelIndex()) -> bool:
+    node = self.nodeForIndex(parent)
+
+    if node.children is not None:
+      return len(node.children) > 0
+
+    return len(self.childIds.get(node.pageId, [])) > 0
+
+  def canFetchMore(self, parent: QtCore.QModelIndex) -> bool:
+    node = self.nodeForIndex(parent)
+    return node.children is None and len(self.childIds.get(node.pageId, [])) > 0
+
+  def fetchMore(self, parent: QtCore.QModelIndex) -> None:
+    node = self.nodeForIndex(parent)
+
+    if node.children is not None:
+      return
+
+    childIds = self.childIds.get(node.pageId, [])
+    self.beginInsertRows(parent, 0, len(childIds) - 1)
+    node.children = [self.nodes[pageId] for pageId in childIds]
+    numberRows(node.children)
+    self.endInsertRows()
+
+  def data(self, index: QtCore.QModelIndex, role: int = QtCore.Qt.ItemDataRole.DisplayRole):
+    if not index.isValid():
+      return None
+
+    node: PageTreeNode = index.internalPointer()
+
+    if role == QtCore.Qt.ItemDataRole.DisplayRole or role == QtCore.Qt.ItemDataRole.EditRole:
+      return node.title
+    elif role == QtCore.Qt.ItemDataRole.DecorationRole:
+      if node.isFolder():
+        return self.icon('Folder Open' if node.pageId in self.expandedIds else 'Folder Closed')
+      elif node.pageType == PAGE_TYPE.kPageTypeToDoList.value:
+        return self.icon('ToDoList')
+      else:
+        return self.icon('Page')
+    elif role == QtCore.Qt.ItemDataRole.UserRole:
+      return node.pageId
+
+    return None
+
+  def setData(self, index: QtCore.QModelIndex, value, role: int = QtCore.Qt.ItemDataRole.EditRole) -> bool:
+    """ Renames a page that was edited in the view. """
+    if not index.isValid() or role != QtCore.Qt.ItemDataRole.EditRole:
+      return False
+
+    node: PageTreeNode = index.internalPointer()
+    node.title = str(value)
+    self.dataChanged.emit(index, index)
+    self.pageRenamed.emit(node.pageId, node.title)
+    return True
+
+  def headerData(self, section: int, orientation: QtCore.Qt.Orientation, role: int = QtCore.Qt.ItemDataRole.DisplayRole):
+    if section == 0 and orientation == QtCore.Qt.Orientation.Horizontal and role == QtCore.Qt.ItemDataRole.DisplayRole:
+      return 'Page Title'
+
+    return None
+
+  def flags(self, index: QtCore.QModelIndex) -> QtCore.Qt.ItemFlag:
+    if not index.isValid():
+      return QtCore.Qt.ItemFlag.ItemIsDropEnabled
+
+    flags = QtCore.Qt.ItemFlag.ItemIsEnabled | QtCore.Qt.ItemFlag.ItemIsSelectable | QtCore.Qt.ItemFlag.ItemIsDragEnabled | \
+            QtCore.Qt.ItemFlag.ItemIsEditable
+
+    if index.internalPointer().isFolder():
+      flags |= QtCore.Qt.ItemFlag.ItemIsDropEnabled
+
+    return flags
+
+  # *************************** Drag and drop ***************************
+
+  def supportedDropActions(self) -> QtCore.Qt.DropAction:
+    return QtCore.Qt.DropAction.MoveAction
+
+  def mimeTypes(self) -> list[str]:
+    return [kPageIdMimeType]
+
+  def mimeData(self, indexes) -> QtCore.QMimeData:
+    mimeData = QtCore.QMimeData()
+    pageIds = [str(index.internalPointer().pageId) for index in indexes if index.isValid()]
+    mimeData.setData(kPageIdMimeType, QtCore.QByteArray(','.join(pageIds).encode()))
+    return mimeData
+
+  def dropMimeData(self, data: QtCore.QMimeData, action: QtCore.Qt.DropAction, row: int, column: int, parent: QtCore.QModelIndex) -> bool:
+    if action != QtCore.Qt.DropAction.MoveAction or not data.hasFormat(kPageIdMimeType):
+      return False
+
+    pageIdStrs = data.data(kPageIdMimeType).data().decode().split(',')
+
+    for pageIdStr in pageIdStrs:
+      if pageIdStr.isdigit():
+        self.movePage(int(pageIdStr), self.nodeForIndex(parent), row)
+
+    # The move has been done here, so the view must not remove the dragged rows itself
+    return False
+
+  def isAncestor(self, node: PageTreeNode, possibleDescendant: PageTreeNode) -> bool:
+    current = possibleDescendant
+
+    while current is not self.root:
+      if current is node:
+        return True
+
+      current = self.parentNode(current)
+
+    return False
+
+  def movePage(self, pageId: ENTITY_ID, newParent: PageTreeNode, row: int) -> None:
+    """ Moves a page to row of newParent's children (or to the end, if row is -1), and writes its new
+        parent and position. """
+    node = self.nodes.get(pageId)
+
+    if node is None or self.isAncestor(node, newParent):
+      return
+
+    if newParent.children is None:
+      # The new parent hasn't been expanded; the page goes at the end of its children
+      row = -1
+    elif self.parentNode(node) is newParent and self.indexForNode(node).isValid() and row > node.row:
+      # The row was given with the page still in its old position
+      row -= 1
+
+    self.detachNode(node)
+    sortKeys = self.attachNode(node, newParent, row)
+
+    with self.db.transaction():
+      self.db.updatePageParent(pageId, newParent.pageId, node.sortKey)
+
+      otherSortKeys = { siblingId: sortKey for siblingId, sortKey in sortKeys.items() if siblingId != pageId }
+
+      if len(otherSortKeys) > 0:
+        self.db.setPageSortKeys(otherSortKeys)
+
+    self.pageMoved.emit(pageId, newParent.pageId, sortKeys)
+
+  def movePageToParent(self, pageId: ENTITY_ID, parentId: ENTITY_ID) -> None:
+    """ Moves a page to the end of a folder, or of the top level for kInvalidPageId. """
+    self.movePage(pageId, self.nodes.get(parentId, self.root), -1)
+
+  def attachNode(self, node: PageTreeNode, newParent: PageTreeNode, row: int) -> dict[ENTITY_ID, int]:
+    """ Adds a node to row of newParent's children (or to the end, if row is -1), and gives it a sort key.
+        Returns the sort keys that changed, by page ID. """
+    siblingIds = self.childIds.setdefault(newParent.pageId, [])
+    position = len(siblingIds) if row < 0 or row > len(siblingIds) else row
+
+    if newParent.children is None and len(siblingIds) == 0:
+      # Nothing to fetch, so the view can be told about the new child directly
+      newParent.children = []
+
+    siblingIds.insert(position, node.pageId)
+    node.parentId = newParent.pageId
+
+    if newParent.children is not None:
+      self.beginInsertRows(self.indexForNode(newParent), position, position)
+      newParent.children.insert(position, node)
+      numberRows(newParent.children, position)
+      self.endInsertRows()
+
+    return self.assignSortKey(node, siblingIds, position)
+
+  def detachNode(self, node: PageTreeNode) -> None:
+    """ Removes a node from its parent's children. """
+    oldParent = self.parentNode(node)
+    oldSiblingIds = self.childIds.get(oldParent.pageId, [])
+
+    if node.pageId in oldSiblingIds:
+      oldSiblingIds.remove(node.pageId)
+
+    if self.indexForNode(node).isValid():
+      oldRow = node.row
+      self.beginRemoveRows(self.indexForNode(oldParent), oldRow, oldRow)
+      oldParent.children.pop(oldRow)
+      node.row = -1
+      numberRows(oldParent.children, oldRow)
+      self.endRemoveRows()
+
+  def assignSortKey(self, node: PageTreeNode, siblingIds: ENTITY_LIST, position: int) -> dict[ENTITY_ID, int]:
+    """ Gives a node a sort key that places it between its neighbours, renumbering the siblings if there
+        is no room.  Returns the sort keys that changed, by page ID. """
+    before = self.nodes[siblingIds[position - 1]].sortKey if position > 0 else None
+    after = self.nodes[siblingIds[position + 1]].sortKey if position < len(siblingIds) - 1 else None
+
+    sortKey = sortKeyBetween(before, after)
+
+    if sortKey is not None:
+      node.sortKey = sortKey
+      return { node.pageId: sortKey }
+
+    changedSortKeys = {}
+
+    for siblingId, newSortKey in zip(siblingIds, sortKeysForCount(len(siblingIds))):
+      siblingNode = self.nodes[siblingId]
+
+      if siblingNode.sortKey != newSortKey or siblingNode is node:
+        siblingNode.sortKey = newSortKey
+        changedSortKeys[siblingId] = newSortKey
+
+    return changedSortKeys
+
+  # *************************** Changes made elsewhere ***************************
+
+  def insertNode(self, node: PageTreeNode) -> None:
+    """ Inserts a node among its siblings, in sort key order. """
+    parentNode = self.parentNode(node)
+    siblingIds = self.childIds.setdefault(parentNode.pageId, [])
+    position = bisect_left(siblingIds, (node.sortKey, node.pageId), key=lambda siblingId: (self.nodes[siblingId].sortKey, siblingId))
+
+    if parentNode.children is None and len(siblingIds) == 0:
+      parentNode.children = []
+
+    siblingIds.insert(position, node.pageId)
+
+    if parentNode.children is not None:
+      self.beginInsertRows(self.indexForNode(parentNode), position, position)
+      parentNode.children.insert(position, node)
+      numberRows(parentNode.children, position)
+      self.endInsertRows()
+
+  def newPage(self, pageId: ENTITY_ID, parentId: ENTITY_ID, pageType: PAGE_TYPE | int, title: str, row: int) -> dict[ENTITY_ID, int]:
+    """ Adds a page created in the view at row of its parent's children (or at the end, if row is -1).
+        Returns the sort keys that changed, by page ID, including the new page's. """
+    parentNode = self.nodes.get(parentId, self.root)
+    node = PageTreeNode(pageId, parentNode.pageId, title, pageTypeValue(pageType), 0)
+    self.nodes[pageId] = node
+    return self.attachNode(node, parentNode, row)
+
+  def addPage(self, pageData: PageData) -> None:
+    node = self.nodes.get(pageData.m_pageId)
+
+    if node is None:
+      node = PageTreeNode(pageData.m_pageId, pageData.m_parentId, pageData.m_title, pageTypeValue(pageData.m_pageType), pageData.m_sortKey)
+      self.nodes[node.pageId] = node
+    elif node.pageId in self.childIds.get(self.parentNode(node).pageId, []):
+      return      # Already in the tree
+
+    self.insertNode(node)
+
+  def removePage(self, pageId: ENTITY_ID) -> None:
+    node = self.nodes.get(pageId)
+
+    if node is not None:
+      self.detachNode(node)
+      self.removeNodeRecords(pageId)
+
+  def removeNodeRecords(self, pageId: ENTITY_ID) -> None:
+    """ Forgets a node and all of its descendants. """
+    pending = [pageId]
+
+    while len(pending) > 0:
+      removedId = pending.pop()
+      self.nodes.pop(removedId, None)
+      self.expandedIds.discard(removedId)
+      pending.extend(self.childIds.pop(removedId, []))
+
+  def setPageTitle(self, pageId: ENTITY_ID, title: str) -> None:
+    node = self.nodes.get(pageId)
+
+    if node is not None:
+      node.title = title
+      index = self.indexForNode(node)
+
+      if index.isValid():
+        self.dataChanged.emit(index, index)
+
+  def applyMove(self, pageId: ENTITY_ID, parentId: ENTITY_ID, sortKeys: dict[ENTITY_ID, int]) -> None:
+    """ Brings the model up to date after a page was moved in another view. """
+    node = self.nodes.get(pageId)
+
+    if node is None:
+      return
+
+    alreadyPlaced = node.parentId == parentId and node.sortKey == sortKeys.get(pageId, node.sortKey)
+
+    for changedId, sortKey in sortKeys.items():
+      if changedId in self.nodes:
+        self.nodes[changedId].sortKey = sortKey
+
+    if alreadyPlaced:
+      return
+
+    self.detachNode(node)
+    node.parentId = parentId
+    self.insertNode(node)
+
+  def setExpanded(self, pageId: ENTITY_ID, expanded: bool) -> None:
+    node = self.nodes.get(pageId)
+
+    if node is None:
+      return
+
+    if expanded:
+      self.expandedIds.add(pageId)
+    else:
+      self.expandedIds.discard(pageId)
+
+    index = self.indexForNode(node)
+
+    if index.isValid():
+      self.dataChanged.emit(index, index, [QtCore.Qt.ItemDataRole.DecorationRole])
@@ -0,0 +1,322 @@
+import logging
+from PySide6 import QtCore, QtWidgets, QtGui
+
+from database import Database
+from switchboard import Switchboard
+from page_data import PageData, PageDataDict
+from page_tree_model import PageTreeModel, PageTreeNode
+from notebook_types import PAGE_TYPE, PAGE_ADD_WHERE, ENTITY_ID, ENTITY_LIST, kInvalidPageId
+
+kUntitledPageTitle = 'Untitled Page'
+
+class CPageTreeView(QtWidgets.QTreeView):
+  """ The notebook's page tree, backed by a PageTreeModel.  It only creates rows for pages the user has
+      expanded their way to, so it opens quickly on very large notebooks. """
+  PT_OnCreateNewPage = QtCore.Signal()
+  PT_OnCreateNewFolder = QtCore.Signal()
+
+  def __init__(self, parent):
+    super(CPageTreeView, self).__init__(parent)
+    self.db = None
+    self.pageModel = None
+
+    self.pageContextMenu = QtWidgets.QMenu()
+    self.folderListSubmenu = QtWidgets.QMenu()
+    self.folderContextMenu = QtWidgets.QMenu()
+    self.blankAreaContextMenu = QtWidgets.QMenu()
+
+    # Set while the title of a page that is being created is edited, so that setting the first title
+    # doesn't count as a page modification
+    self.newPageBeingCreated = False
+
+    self.lastClickedPageId = kInvalidPageId
+
+    self.setUniformRowHeights(True)     # Lets the view lay out rows without asking for each one's size
+    self.setContextMenuPolicy(QtGui.Qt.ContextMenuPolicy.CustomContextMenu)
+    self.setDragEnabled(True)
+    self.setAcceptDrops(True)
+    self.setDropIndicatorShown(True)
+    self.setDragDropMode(QtWidgets.QAbstractItemView.DragDropMode.InternalMove)
+    self.setDefaultDropAction(QtCore.Qt.DropAction.MoveAction)
+
+  def initialize(self, db: Database, switchboard: Switchboard):
+    self.db = db
+    self.switchboard = switchboard
+
+    self.pageModel = PageTreeModel(db, self)
+    self.setModel(self.pageModel)
+
+    self.setConnections()
+    self.initMenus()
+
+  def setConnections(self):
+    self.clicked.connect(self.onClicked)
+    self.expanded.connect(lambda index: self.pageModel.setExpanded(index.data(QtCore.Qt.ItemDataRole.UserRole), True))
+    self.collapsed.connect(lambda index: self.pageModel.setExpanded(index.data(QtCore.Qt.ItemDataRole.UserRole), False))
+    self.customContextMenuRequested.connect(self.onContextMenu)
+
+    self.pageModel.pageMoved.connect(self.switchboard.emitPageMoved)
+    self.pageModel.pageRenamed.connect(self.onPageRenamed)
+
+    # Switchboard signals
+    self.switchboard.pageSelected.connect(self.selectPage)
+    self.switchboard.newPageCreated.connect(self.onNewPageCreated)
+    self.switchboard.pageTitleUpdated.connect(self.onPageTitleUpdated)
+    self.switchboard.pageDeleted.connect(self.removePage)
+    self.switchboard.pageMoved.connect(self.pageModel.applyMove)
+
+    # TODO: Connect signals for PageImported and PageUpdatedByImport
+
+  def initMenus(self):
+    # Page context menu
+    self.pageContextMenu.addAction('Rename Page', self.onRenamePageTriggered)
+    self.pageContextMenu.addAction('Delete Page', self.onDeletePageTriggered)
+    self.pageContextMenu.addSeparator()
+    self.folderListSubmenu.setTitle('Move to Folder')
+    self.pageContextMenu.addMenu(self.folderListSubmenu)
+    self.pageContextMenu.addAction('Move to top-level', self.onMoveToTopLevel)
+
+    # Folder context menu
+    self.folderContextMenu.addAction('New Page', self.onAddNewPageTriggered)
+    self.folderContextMenu.addAction('New To Do List', self.onNewToDoListTriggered)
+    self.folderContextMenu.addAction('New Folder', self.onNewFolderTriggered)
+    self.folderContextMenu.addAction('Rename Folder', self.onRenamePageTriggered)
+
+    # Deleting non-empty folders is not supported, as every page in the folder would have to be deleted too
+    self.deleteEmptyFolderAction = self.folderContextMenu.addAction('Delete Empty Folder', self.onDeleteFolderTriggered)
+    self.folderContextMenu.addSeparator()
+    self.folderContextMenu.addAction('Expand All', self.expandAll)
+    self.folderContextMenu.addAction('Collapse All', self.collapseAll)
+
+  def setPages(self, pageDict: PageDataDict):
+    self.pageModel.setPages(pageDict)
+
+  def addPages(self, pageDict: PageDataDict):
+    """ Adds the pages that are not in the tree yet, keeping the expanded and selected pages. """
+    self.pageModel.addPages(pageDict)
+
+  def addItemsNew(self, pageDict: PageDataDict, pageIdList: ENTITY_LIST):
+    """ Adds pages to the tree.  A page's parent must come before the page. """
+    for pageId in pageIdList:
+      if pageId in pageDict:
+        self.pageModel.addPage(pageDict[pageId])
+
+  def clear(self):
+    self.pageModel.clear()
+    self.lastClickedPageId = kInvalidPageId
+
+  def currentNode(self) -> PageTreeNode | None:
+    index = self.currentIndex()
+    return index.internalPointer() if index.isValid() else None
+
+  def selectPage(self, pageId: ENTITY_ID):
+    index = self.pageModel.indexForPage(pageId)
+
+    if index.isValid():
+      self.setCurrentIndex(index)
+      self.scrollTo(index)
+
+  def emitCurrentPage(self):
+    currentNode = self.currentNode()
+
+    if currentNode is not None:
+      self.switchboard.emitPageSelected(currentNode.pageId)
+
+  def newItem(self, pageId: ENTITY_ID, pageType: PAGE_TYPE, pageAddWhere: PAGE_ADD_WHERE, title: str) -> tuple[bool, str, int, int]:
+    """ Adds a new page to the tree.  If title is empty, the user will be given the chance to enter a title.
+        Returns:
+        - success
+        - title (in case the user changed it)
+        - parent ID, or kInvalidPageId if it is a top-level item
+        - sort key of the new page
+    """
+    currentNode = self.currentNode()
+    parentId = kInvalidPageId
+    row = -1
+
+    # - if there is no current page in the tree, then add a new top-level page at the end
+    # - if the current page is a folder, then add the page at the end of the folder
+    # - if the current page is a page, then add a sibling: after it at the top level, or at the end of its folder
+
+    if currentNode is not None and pageAddWhere != PAGE_ADD_WHERE.kPageAddTopLevel:
+      if currentNode.isFolder():
+        parentId = currentNode.pageId
+      elif currentNode.parentId == kInvalidPageId:
+        row = currentNode.row + 1
+      else:
+        parentId = currentNode.parentId
+
+    sortKeys = self.pageModel.newPage(pageId, parentId, pageType, title if len(title) > 0 else kUntitledPageTitle, row)
+    sortKey = sortKeys.pop(pageId)
+
+    # The new page's sort key is written with the page.  If its siblings had to be renumbered to make room
+    # for it, they are written now, in the caller's transaction.
+    if len(sortKeys) > 0 and self.db is not None and not self.db.setPageSortKeys(sortKeys):
+      return (False, '', parentId, sortKey)
+
+    if parentId != kInvalidPageId:
+      self.expand(self.pageModel.indexForPage(parentId))
+
+    index = self.pageModel.indexForPage(pageId)
+    self.scrollTo(index)
+
+    if len(title) == 0:
+      # Let the user enter the page title
+      self.newPageBeingCreated = True     # To ensure that this doesn't count as a page modification
+      self.edit(index)
+
+    return (True, self.pageModel.pageTitle(pageId), parentId, sortKey)
+
+  def removePage(self, pageId: ENTITY_ID):
+    if self.pageModel.nodeForPage(pageId) is None:
+      return
+
+    self.pageModel.removePage(pageId)
+
+    if self.lastClickedPageId == pageId:
+      self.lastClickedPageId = kInvalidPageId
+
+    # Whenever a page is deleted, the current item will change.
+    self.emitCurrentPage()
+
+  def getPageTitle(self, pageId: ENTITY_ID) -> str:
+    return self.pageModel.pageTitle(pageId)
+
+  def getTreeIdList(self) -> ENTITY_LIST:
+    return self.pageModel.treePageIds()
+
+  def getFolderChildren(self, pageId: ENTITY_ID) -> list[dict]:
+    """ Returns the title, ID and type of each of a folder's children. """
+    entityList = []
+
+    for childId in self.pageModel.childPageIds(pageId):
+      childNode = self.pageModel.nodeForPage(childId)
+      entityList.append({ 'pageId': childId, 'title': childNode.title, 'itemType': PAGE_TYPE(childNode.pageType) })
+
+    return entityList
+
+  def neighbourPageIds(self, pageId: ENTITY_ID) -> ENTITY_LIST:
+    """ Returns the IDs of the pages (not folders) next to a page in the tree, nearest first. """
+    node = self.pageModel.nodeForPage(pageId)
+
+    if node is None:
+      return []
+
+    siblingIds = [siblingId for siblingId in self.pageModel.childPageIds(node.parentId) if not self.pageModel.nodeForPage(siblingId).isFolder()]
+    index = siblingIds.index(pageId) if pageId in siblingIds else 0
+    neighbours = []
+
+    for distance in range(1, len(siblingIds)):
+      for neighbourIndex in [index - distance, index + distance]:
+        if 0 <= neighbourIndex < len(siblingIds):
+          neighbours.append(siblingIds[neighbourIndex])
+
+    return neighbours
+
+  def isFolderEmpty(self, pageId: ENTITY_ID) -> bool:
+    return len(self.pageModel.childPageIds(pageId)) == 0
+
+  def constructFolderSubmenu(self):
+    self.folderListSubmenu.clear()
+
+    for folderId in self.pageModel.folderIds():
+      newAction = QtGui.QAction(self.pageModel.pageTitle(folderId), self)
+      newAction.setData(folderId)
+      self.folderListSubmenu.addAction(newAction)
+
+      newAction.triggered.connect(self.onMoveFolder)
+
+  def expandAll(self):
+    # The view can only expand rows the model has handed to it
+    self.pageModel.fetchAll()
+    super(CPageTreeView, self).expandAll()
+    self.pageModel.setAllExpanded(True)
+    self.viewport().update()
+
+  def collapseAll(self):
+    super(CPageTreeView, self).collapseAll()
+    self.pageModel.setAllExpanded(False)
+    self.viewport().update()
+
+  # *************************** SLOTS ***************************
+
+  def onClicked(self, index: QtCore.QModelIndex):
+    pageId = index.data(QtCore.Qt.ItemDataRole.UserRole)
+
+    if pageId is not None:
+      self.switchboard.emitPageSelected(pageId)
+
+  def onPageRenamed(self, pageId: ENTITY_ID, title: str):
+    self.setCurrentIndex(self.pageModel.indexForPage(pageId))
+    self.switchboard.emitPageTitleUpdated(pageId, title, not self.newPageBeingCreated)
+
+    # Reset this flag.
+    self.newPageBeingCreated = False
+
+  def onNewPageCreated(self, pageData: PageData):
+    self.pageModel.addPage(pageData)
+
+  def onPageTitleUpdated(self, pageId: ENTITY_ID, title: str, isModification: bool):
+    self.pageModel.setPageTitle(pageId, title)
+
+  def onContextMenu(self, pos: QtCore.QPoint):
+    index = self.indexAt(pos)
+
+    if not index.isValid():
+      # User clicked on white space
+      self.blankAreaContextMenu.popup(self.mapToGlobal(pos))
+      return
+
+    node: PageTreeNode = index.internalPointer()
+    self.lastClickedPageId = node.pageId
+
+    self.constructFolderSubmenu()
+
+    if node.isFolder():
+      self.deleteEmptyFolderAction.setVisible(self.isFolderEmpty(node.pageId))
+      self.folderContextMenu.popup(self.mapToGlobal(pos))
+    else:
+      self.pageContextMenu.popup(self.mapToGlobal(pos))
+
+  def onRenamePageTriggered(self):
+    index = self.pageModel.indexForPage(self.lastClickedPageId)
+
+    if index.isValid():
+      self.edit(index)
+
+  def onDeletePageTriggered(self):
+    if self.pageModel.nodeForPage(self.lastClickedPageId) is not None:
+      message = f'Do you want to delete the page {self.pageModel.pageTitle(self.lastClickedPageId)}?'
+
+      if QtWidgets.QMessageBox.question(self, 'NoteBook - Delete Page', message) == QtWidgets.QMessageBox.StandardButton.Yes:
+        self.switchboard.emitPageDeleted(self.lastClickedPageId)
+
+  def onDeleteFolderTriggered(self):
+    node = self.pageModel.nodeForPage(self.lastClickedPageId)
+
+    if node is not None and node.isFolder() and self.isFolderEmpty(node.pageId):
+      self.switchboard.emitPageDeleted(node.pageId)
+
+  def onMoveToTopLevel(self):
+    if self.pageModel.nodeForPage(self.lastClickedPageId) is not None:
+      self.pageModel.movePageToParent(self.lastClickedPageId, kInvalidPageId)
+
+  def onMoveFolder(self):
+    sender = self.sender()
+
+    if type(sender) is QtGui.QAction and self.pageModel.nodeForPage(self.lastClickedPageId) is not None:
+      destinationNode = self.pageModel.nodeForPage(sender.data())
+
+      if destinationNode is not None and destinationNode.isFolder():
+        self.pageModel.movePageToParent(self.lastClickedPageId, destinationNode.pageId)
+      else:
+        logging.error(f'[CPageTreeView.onMoveFolder] Page ID {sender.data()} is not a folder')
+
+  def onAddNewPageTriggered(self):
+    self.PT_OnCreateNewPage.emit()
+
+  def onNewToDoListTriggered(self):
+    self.switchboard.emitCreateNewToDoList()
+
+  def onNewFolderTriggered(self):
+    self.PT_OnCreateNewFolder.emit()
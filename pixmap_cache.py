@@ -0,0 +1,53 @@
+from PySide6 import QtGui
+from collections import OrderedDict
+
+# Default limit on the memory used by decoded images
+kDefaultPixmapCacheBytes = 128 * 1024 * 1024
+
+class PixmapCache:
+  """ Least-recently-used cache of decoded images, limited by the memory the images use rather than by their
+      number.  Images are keyed by the hash of their stored contents, so an image that appears on several
+      pages is decoded once. """
+  def __init__(self, capacityBytes: int = kDefaultPixmapCacheBytes):
+    self.capacityBytes = capacityBytes
+    self.pixmaps: OrderedDict[str, QtGui.QPixmap] = OrderedDict()
+    self.currentBytes = 0
+
+  @staticmethod
+  def pixmapBytes(pixmap: QtGui.QPixmap) -> int:
+    return pixmap.width() * pixmap.height() * max(pixmap.depth(), 8) // 8
+
+  def getPixmap(self, key: str) -> QtGui.QPixmap | None:
+    pixmap = self.pixmaps.get(key)
+
+    if pixmap is not None:
+      self.pixmaps.move_to_end(key)
+
+    return pixmap
+
+  def addPixmap(self, key: str, pixmap: QtGui.QPixmap) -> None:
+    self.removePixmap(key)
+
+    size = self.pixmapBytes(pixmap)
+
+    if size > self.capacityBytes:
+      # Too big to cache at all
+      return
+
+    self.pixmaps[key] = pixmap
+    self.currentBytes += size
+
+    # Evict the least recently used images until the cache fits
+    while self.currentBytes > self.capacityBytes:
+      evictedKey, evictedPixmap = self.pixmaps.popitem(last=False)
+      self.currentBytes -= self.pixmapBytes(evictedPixmap)
+
+  def removePixmap(self, key: str) -> None:
+    pixmap = self.pixmaps.pop(key, None)
+
+    if pixmap is not None:
+      self.currentBytes -= self.pixmapBytes(pixmap)
+
+  def clear(self) -> None:
+    self.pixmaps.clear()
+    self.currentBytes = 0
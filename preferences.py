@@ -14,7 +14,13 @@ from constants import kStartupLoadPreviousNoteBook, \
                       kWindowSize, \
                       kWindowPos, \
                       kNavigationTab, \
-                      kTodoListAutosave
+                      kTodoListAutosave, \
+                      kDatabaseWalMode, \
+                      kDatabaseMmapSize, \
+                      kDatabaseCacheSize
+
+kDefaultDatabaseMmapSize = 256      # In megabytes
+kDefaultDatabaseCacheSize = 32      # In megabytes
 
 class Preferences():
   def __init__(self, prefsFilePath) -> None:
@@ -30,7 +36,10 @@ class Preferences():
       kWindowSize: '',
       kWindowPos: '',
       kNavigationTab: 0,
-      kTodoListAutosave: True
+      kTodoListAutosave: True,
+      kDatabaseWalMode: True,
+      kDatabaseMmapSize: kDefaultDatabaseMmapSize,
+      kDatabaseCacheSize: kDefaultDatabaseCacheSize
     }
 
   def readPrefsFile(self):
@@ -52,6 +61,9 @@ class Preferences():
         self.prefsMap[kWindowSize] = configObj.get('window', 'size', fallback='')
         self.prefsMap[kNavigationTab] = configObj.get('navigation', 'tab', fallback=0)
         self.prefsMap[kTodoListAutosave] = configObj.getboolean('todolist', 'autosave', fallback=True)
+        self.prefsMap[kDatabaseWalMode] = configObj.getboolean('database', 'walmode', fallback=True)
+        self.prefsMap[kDatabaseMmapSize] = configObj.getint('database', 'mmapsize', fallback=kDefaultDatabaseMmapSize)
+        self.prefsMap[kDatabaseCacheSize] = configObj.getint('database', 'cachesize', fallback=kDefaultDatabaseCacheSize)
 
         # Read recent files list
         if configObj.has_section(kRecentFiles):
@@ -147,6 +159,32 @@ class Preferences():
   def todoListAutosave(self, value: bool):
     self.prefsMap[kTodoListAutosave] = value
 
+  @property
+  def databaseWalMode(self) -> bool:
+    return True if not self.prefsItemExists(kDatabaseWalMode) else self.prefsMap[kDatabaseWalMode]
+
+  @databaseWalMode.setter
+  def databaseWalMode(self, value: bool):
+    self.prefsMap[kDatabaseWalMode] = value
+
+  @property
+  def databaseMmapSize(self) -> int:
+    """ Size of the memory map used to read the notebook file, in megabytes.  0 turns off memory mapping. """
+    return kDefaultDatabaseMmapSize if not self.prefsItemExists(kDatabaseMmapSize) else self.prefsMap[kDatabaseMmapSize]
+
+  @databaseMmapSize.setter
+  def databaseMmapSize(self, value: int):
+    self.prefsMap[kDatabaseMmapSize] = value
+
+  @property
+  def databaseCacheSize(self) -> int:
+    """ Size of the SQLite page cache, in megabytes. """
+    return kDefaultDatabaseCacheSize if not self.prefsItemExists(kDatabaseCacheSize) else self.prefsMap[kDatabaseCacheSize]
+
+  @databaseCacheSize.setter
+  def databaseCacheSize(self, value: int):
+    self.prefsMap[kDatabaseCacheSize] = value
+
   @property
   def lastFile(self) -> str:
     return '' if not self.prefsItemExists(kFilesLastFile) else self.prefsMap[kFilesLastFile]
@@ -6,7 +6,6 @@ import logging
 import platform
 from logging.handlers import RotatingFileHandler
 from PySide6 import QtCore, QtWidgets, QtGui
-from pageCache import PageCache
 from qt_util import loadUi
 from set_password_dlg import SetPasswordDlg
 from tagCache import TagCache
@@ -14,7 +13,11 @@ from util import getScriptPath, runningFromBundle
 from ui_pynotebookwindow import Ui_PyNoteBookWindow
 from database import Database
 from page_data import PageData
-from page_recovery import PageRecovery
+from encryption_upgrader import EncryptionUpgrader
+from database_worker import AsyncDatabase
+from notebook_loader import NotebookLoader
+from tag_query_widget import CTagQueryWidget
+from page_prefetcher import PagePrefetcher
 from preferences import Preferences
 from page_info_dlg import CPageInfoDlg
 from prefs_dialog import PrefsDialog
@@ -43,6 +46,10 @@ kFolderEditor = 2
 kMaxLogileSize = 1024 * 1024
 kMaxRecentFiles = 20
 
+# Number of tree neighbours and recently viewed pages to prefetch after a page is displayed
+kPrefetchNeighbourCount = 4
+kPrefetchHistoryCount = 10
+
 # ---------------------------------------------------------------
 class PyNoteBookWindow(QtWidgets.QMainWindow):
   def __init__(self):
@@ -54,8 +61,11 @@ class PyNoteBookWindow(QtWidgets.QMainWindow):
     self.prefs = Preferences(prefsFilePath)
 
     self.db = Database()
+    self.asyncDb = AsyncDatabase(self.db, self.switchboard, self)
+    self.encryptionUpgrader = EncryptionUpgrader(self.db, self.asyncDb, self)
+    self.pagePrefetcher = PagePrefetcher(self.db, self.asyncDb, self)
     self.tagCache = TagCache()
-    self.pageCache = PageCache()
+    self.pageCache = self.db.pageCache      # Shared with the database, which keeps it up to date as pages change
 
     self.notebookFileName = ''      # Current notebook file name (name only)
     self.lastUsedDirectory: str = getScriptPath()
@@ -67,6 +77,7 @@ class PyNoteBookWindow(QtWidgets.QMainWindow):
 
     self.currentPageId = kInvalidPageId
     self.currentPageData = None
+    self.pendingPageId = kInvalidPageId   # Page being read on the database worker thread, to be shown when it arrives
     self.tagsModified = False
 
     self.enableDataEntry(False)
@@ -75,10 +86,24 @@ class PyNoteBookWindow(QtWidgets.QMainWindow):
 
     self.favoritesManager = FavoritesManager()
 
+
+    # Pages matching a tag query, such as "project-x AND NOT archived"
+    self.tagQueryWidget = CTagQueryWidget(self.ui.navigationTabWidget)
+    self.ui.navigationTabWidget.addTab(self.tagQueryWidget, 'Tag Query')
+
+    # The navigation controls of a newly opened notebook are filled in stages, with progress shown in the status bar
+    self.notebookLoader = NotebookLoader(self.db, self.asyncDb, self.switchboard, self.pageCache, self.tagCache, self.ui.pageTree,
+                                         self.ui.pageTitleList, self.ui.dateTree, self.ui.tagList, self)
+    self.loadProgressBar = QtWidgets.QProgressBar()
+    self.loadProgressBar.setMaximumWidth(200)
+    self.loadProgressBar.setFormat('Loading pages: %p%')
+    self.loadProgressBar.hide()
+    self.ui.statusBar.addPermanentWidget(self.loadProgressBar)
+
     self.styleManager = StyleManager()
     self.styleManager.loadStyleDefs(self.getStyleDefsPath())
 
-    self.ui.pageTextEdit.initialize(self.styleManager, self.ui.messageLabel, self.db, self.switchboard)
+    self.ui.pageTextEdit.initialize(self.styleManager, self.ui.messageLabel, self.db, self.asyncDb, self.switchboard)
 
     # Kind of a hack - the ultimate goal of this is to prevent text in the message label from causing the window width to increase.
     # When the window is resized the message label is resized to be the width of the window minus self.messageLabelWidthDiff.
@@ -92,15 +117,22 @@ class PyNoteBookWindow(QtWidgets.QMainWindow):
     self.ui.recentlyViewedList.initialize(self.db, self.switchboard)
     self.ui.titleLabelWidget.initialize()
     self.ui.tagList.initialize(self.tagCache, self.pageCache, self.switchboard)
+    self.tagQueryWidget.initialize(self.tagCache, self.pageCache, self.switchboard)
     self.ui.pageTitleList.initialize(self.switchboard)
     self.ui.dateTree.initialize(self.switchboard)
     self.ui.folderEdit.initialize(self.ui.pageTree, self.switchboard)
     self.ui.pageToDoEdit.initialize(self.switchboard)
 
+    # Prefetching stops when the user interacts with the window or the page tree
+    self.pagePrefetcher.watch(self)
+    self.pagePrefetcher.watch(self.ui.pageTree.viewport())
+
     self.prefs.readPrefsFile()
 
     self.switchboard.preferences = self.prefs
 
+    self.db.setTuning(self.prefs.databaseWalMode, self.prefs.databaseMmapSize, self.prefs.databaseCacheSize)
+
     pos = self.prefs.windowPos
     size = self.prefs.windowSize
 
@@ -134,6 +166,12 @@ class PyNoteBookWindow(QtWidgets.QMainWindow):
     # Switchboard signals
     # Switchboard signals should be handled by this class first
     self.switchboard.pageSelected.connect(self.onPageSelected)
+    self.switchboard.pageLoaded.connect(self.onPageLoaded)
+    self.switchboard.pageUpdated.connect(self.onPageUpdated)
+
+    self.notebookLoader.progress.connect(self.onNotebookLoadProgress)
+    self.notebookLoader.treeLoaded.connect(self.onPageTreeLoaded)
+    self.notebookLoader.finished.connect(self.onNotebookLoaded)
     self.switchboard.pageTitleUpdated.connect(self.onPageTitleChanged)
     self.switchboard.pageDeleted.connect(self.onPageDeleted)
     self.switchboard.stylesChanged.connect(self.saveStyles)
@@ -191,27 +229,37 @@ class PyNoteBookWindow(QtWidgets.QMainWindow):
       elif self.currentPageData.m_pageType == PAGE_TYPE.kPageTypeToDoList:
         self.currentPageData.m_contentString = self.ui.pageToDoEdit.getPageContents()
 
-      success = self.db.updatePage(self.currentPageData)
-
-      self.tagCache.updateTagsForPage(self.currentPageData.m_pageId, stringToArray(self.currentPageData.m_tags))
-      self.ui.tagList.updateTags()
-
-      if not success:
-        logging.error(f'[on_savePageButton_clicked] Error saving page ID {self.currentPageData.m_pageId} ({self.currentPageData.m_title})')
-        return
-
       self.tagsModified = False
       self.ui.pageTextEdit.setDocumentModified(False)
-
-      # Emit PageSaved signal
-      self.switchboard.emitPageSaved(self.currentPageData)
-
       self.setAppTitle()
       self.ui.savePageButton.setEnabled(False)
+
+      if self.asyncDb.isOpen:
+        # Saved on the database worker thread; the outcome arrives in onPageUpdated
+        self.asyncDb.updatePage(self.currentPageData)
+      else:
+        self.onPageUpdated(self.currentPageData, self.db.updatePage(self.currentPageData))
     else:
       # Should never get here: self.currentPageData should always be a valid object.
       logging.error('[on_savePageButton_clicked] currentPageData is non-existent')
 
+  def onPageUpdated(self, pageData: PageData, success: bool):
+    if not success:
+      logging.error(f'[onPageUpdated] Error saving page ID {pageData.m_pageId} ({pageData.m_title})')
+
+      if self.currentPageData is not None and self.currentPageData.m_pageId == pageData.m_pageId:
+        # Let the user save the page again
+        self.ui.pageTextEdit.setDocumentModified(True)
+        self.setAppTitle()
+        self.ui.savePageButton.setEnabled(True)
+
+      return
+
+    self.tagCache.updateTagsForPage(pageData.m_pageId, stringToArray(pageData.m_tags))
+
+    # Emit PageSaved signal
+    self.switchboard.emitPageSaved(pageData)
+
   @QtCore.Slot()
   def on_actionNew_Page_triggered(self):
     self.createNewPage(PAGE_TYPE.kPageTypeUserText)
@@ -276,6 +324,7 @@ class PyNoteBookWindow(QtWidgets.QMainWindow):
 
       # Update anything that is affected by the prefs
       self.ui.pageToDoEdit.setAutoSave(self.prefs.todoListAutosave)
+      self.db.setTuning(self.prefs.databaseWalMode, self.prefs.databaseMmapSize, self.prefs.databaseCacheSize)
 
       # TODO: Is there anything else that should be updated by a prefs change?
 
@@ -301,44 +350,73 @@ class PyNoteBookWindow(QtWidgets.QMainWindow):
   def onPageSelected(self, pageId: ENTITY_ID):
     self.checkSavePage()        # Check if the current page is unsaved, and if so, ask user if he wants to save it.
 
-    self.currentPageData = self.db.getPage(pageId)
+    if self.asyncDb.isOpen and not self.db.pageCache.hasDecodedPage(pageId):
+      # Read the page on the database worker thread; it is shown when it arrives (see onPageLoaded)
+      self.pendingPageId = pageId
+      self.asyncDb.getPage(pageId)
+    else:
+      self.pendingPageId = kInvalidPageId
+      self.showPage(pageId, self.db.getPage(pageId))
+
+  def onPageLoaded(self, pageId: ENTITY_ID, pageData: PageData | None, generation: int):
+    if pageId != self.pendingPageId:
+      return      # Another page was selected while this one was being read
+
+    if pageData is not None and not self.db.pageCache.addDecodedPage(pageData, generation):
+      # The page was written while it was being read, so this copy may be stale
+      self.asyncDb.getPage(pageId)
+      return
+
+    self.pendingPageId = kInvalidPageId
+    self.showPage(pageId, pageData)
+
+  def showPage(self, pageId: ENTITY_ID, pageData: PageData | None):
+    self.currentPageData = pageData
 
     if self.currentPageData is not None:
       self.currentPageId = pageId
 
-      # Get images for page
-      imageNames = self.db.getImageNamesForPage(self.currentPageId)
-
       self.tagsModified = False
 
-      self.displayPage(self.currentPageData, imageNames, False, pageId)
+      self.displayPage(self.currentPageData, False, pageId)
 
       # Add page to the page history
       self.ui.recentlyViewedList.addHistoryItem(pageId, self.currentPageData.m_title)
 
+      self.prefetchLikelyPages(pageId)
+
       # TODO: Maybe consider storing the current page in the database to make it easy for other
       #       components to access it.  This will also help make the app more resilient.
 
     else:
       # Page does not exist.  Blank out editors.
-      logging.error(f'[PyNoteBookWindow.onPageSelected] Page ID {pageId} does not exist')
+      logging.error(f'[PyNoteBookWindow.showPage] Page ID {pageId} does not exist')
       self.clearPageEditControls()
       self.enableDataEntry(False)
 
       QtWidgets.QMessageBox.critical(self, kAppName, "Page does not exist")
 
+  def prefetchLikelyPages(self, pageId: ENTITY_ID):
+    """ Reads the pages most likely to be opened after this one into the page cache, while the app is idle:
+        the page's neighbours in the tree, the recently viewed pages, and the favorites. """
+    likelyPageIds = self.ui.pageTree.neighbourPageIds(pageId)[:kPrefetchNeighbourCount]
+    likelyPageIds.extend(self.ui.recentlyViewedList.recentPageIds(kPrefetchHistoryCount))
+    likelyPageIds.extend(favoritePageId for favoritePageId, title in self.favoritesManager.favoritesList)
+
+    self.pagePrefetcher.prefetch([likelyPageId for likelyPageId in likelyPageIds if likelyPageId != pageId])
+
   def onPageTitleChanged(self, pageId: ENTITY_ID, newTitle: str, isModification: bool):
     self.db.changePageTitle(pageId, newTitle, isModification)
     self.ui.titleLabelWidget.setPageTitleLabel(newTitle)
     if self.currentPageData is not None:
       self.currentPageData.m_title = newTitle
+      self.currentPageData.markClean(['pagetitle'])     # The title has just been written
 
     # Update the page cache
     self.pageCache.updatePageTitleForPage(pageId, newTitle)
 
   def onPageDeleted(self, pageId: ENTITY_ID):
-    # self.db.deleteAllImagesForPage(pageId)      # TODO: Implement this
-    self.db.deletePage(pageId)
+    self.db.deletePage(pageId)      # The page's images go with it
 
     # Update the page cache
     self.tagCache.removePageIdFromAllTags(pageId)
@@ -359,6 +437,7 @@ class PyNoteBookWindow(QtWidgets.QMainWindow):
       self.db.setPageFavoriteStatus(self.currentPageId, True)
       self.ui.titleLabelWidget.setFavoritesIcon(True)
       self.currentPageData.m_bIsFavorite = True
+      self.currentPageData.markClean(['isfavorite'])
 
   def onRemovePageFromFavorites(self):
     if self.currentPageIsValid() and self.currentPageData is not None and self.currentPageData.m_bIsFavorite:
@@ -366,6 +445,7 @@ class PyNoteBookWindow(QtWidgets.QMainWindow):
       self.favoritesManager.removeFavoriteItem(self.currentPageId)
       self.rebuildFavoritesMenu()
       self.currentPageData.m_bIsFavorite = False
+      self.currentPageData.markClean(['isfavorite'])
 
   def onRecentFileSelected(self):
     sender = self.sender()
@@ -468,6 +548,8 @@ class PyNoteBookWindow(QtWidgets.QMainWindow):
           if len(password) > 0:
             self.db.storePasswordInDatabase(password)
 
+          self.asyncDb.open(self.currentNoteBookPath)
+
           self.setAppTitle()
       else:
         # User clicked Cancel on the password dialog - don't create a new NoteBook
@@ -481,7 +563,11 @@ class PyNoteBookWindow(QtWidgets.QMainWindow):
       self.lastUsedDirectory = directory
       self.currentNoteBookPath = filepath
 
-      self.db.openDatabase(self.currentNoteBookPath)
+      if not self.db.openDatabase(self.currentNoteBookPath):
+        QtWidgets.QMessageBox.critical(self, kAppName, f'The notebook {self.currentNoteBookPath} could not be opened.')
+        self.notebookFileName = ''
+        self.currentNoteBookPath = ''
+        return False
 
       # If the database is password protected, get password from the user
       if self.db.isPasswordProtected():
@@ -510,25 +596,27 @@ class PyNoteBookWindow(QtWidgets.QMainWindow):
             self.db.closeDatabase()
             return False
 
-      # Read the page order for the notebook, if one exists
-      pageOrderStr = self.db.getPageOrder()
+      # The loader reads the page and tag lists through the worker's connection
+      self.asyncDb.open(self.currentNoteBookPath)
+
+      # Read page history
+      pageHistoryStr = self.db.getPageHistory()
 
-      if pageOrderStr is not None:
-        logging.debug(f'Page order string: {pageOrderStr}')
-        self.populateNavigationControls(pageOrderStr)
+      if pageHistoryStr is not None:
+        self.ui.recentlyViewedList.setPageHistory(pageHistoryStr)
 
-        # Read page history
-        pageHistoryStr = self.db.getPageHistory()
+      # Only the top-level pages and the last viewed page are added now; the rest are added as the full
+      # page list arrives, and from the event loop after that
+      self.notebookLoader.start(self.ui.recentlyViewedList.getMostRecentlyViewedPage())
 
-        if pageHistoryStr is not None:
-          self.ui.recentlyViewedList.setPageHistory(pageHistoryStr)
+      self.addFavoritesToFavoritesMenu()
 
-        self.addFavoritesToFavoritesMenu()
+      self.addFileToRecentFilesList()
 
-        self.addFileToRecentFilesList()
-        self.checkForMissingPages()
+      self.displayLastEntry()
 
-        self.displayLastEntry()
+      # Pages encrypted by earlier versions are converted in the background
+      self.encryptionUpgrader.start()
       return True
     else:
       logging.error(f'NoteBook {self.currentNoteBookPath} does not exist')
@@ -608,35 +696,21 @@ class PyNoteBookWindow(QtWidgets.QMainWindow):
       pageHistoryStr = self.ui.recentlyViewedList.getPageHistory()
       self.db.setPageHistory(pageHistoryStr)
 
-      # Save page order
-      pageOrderStr = self.ui.pageTree.getPageOrderString()
-      self.db.setPageOrder(pageOrderStr)
-
       self.favoritesManager.clear()
       self.rebuildFavoritesMenu()
 
+      self.notebookLoader.stop()
+      self.loadProgressBar.hide()
+      self.encryptionUpgrader.stop()
+      self.pagePrefetcher.stop()
+      self.pendingPageId = kInvalidPageId
+      self.asyncDb.close()
       self.db.closeDatabase()
 
       self.currentNoteBookPath = ''
 
       self.setAppTitle()          # Remove the Notebook name from the app title
 
-  def checkForMissingPages(self):
-    """Checks if there are any pages in the database that are not in the page tree.  If so, these pages
-    need to be reloaded.
-    """
-    pagesAndParentsList, success = self.db.getAllPageIdsAndParents()
-
-    if success:
-      pageRecovery = PageRecovery(pagesAndParentsList, self.ui.pageTree.getTreeIdList())
-
-      if pageRecovery.thereAreLostPages():
-        QtWidgets.QMessageBox.information(self, kAppName, "The list of pages need to be rescanned from the database")
-        pagesToInsert = pageRecovery.recoverPages()
-        pagesToInsertStr = ','.join(map(str, pagesToInsert))
-        self.populateNavigationControls(pagesToInsertStr)
-
-
 # *************************** UI ***************************
 
   def displayLastEntry(self):
@@ -651,21 +725,18 @@ class PyNoteBookWindow(QtWidgets.QMainWindow):
     if pageId is not None:
       self.switchboard.emitPageSelected(pageId)
 
-  def populateNavigationControls(self, pageOrderStr: str):
-    pageDict, success = self.db.getPageList()   # Retrieve all pages, regardless of whether they appear in the pageOrderStr
+  def onNotebookLoadProgress(self, stepsDone: int, totalSteps: int):
+    self.loadProgressBar.setMaximum(totalSteps)
+    self.loadProgressBar.setValue(stepsDone)
+    self.loadProgressBar.show()
 
-    if len(pageDict) > 0:
-      self.pageCache.addPages(pageDict)
+  def onPageTreeLoaded(self):
+    # The current page may not have been in the tree when it was first displayed
+    if self.currentPageId != kInvalidPageId:
+      self.ui.pageTree.selectPage(self.currentPageId)
 
-      self.ui.pageTree.addItemsNew(pageDict, pageOrderStr)
-
-      self.ui.pageTitleList.addItems(pageDict)
-      self.ui.dateTree.addItems(pageDict)
-
-      pageIdDict, success = self.db.getTagList()
-      self.tagCache.addTags(pageIdDict)
-
-      self.ui.tagList.addItems()
+  def onNotebookLoaded(self):
+    self.loadProgressBar.hide()
 
   def enableDataEntry(self, enable):
     self.ui.pageTextEdit.setEnabled(enable)
@@ -699,15 +770,24 @@ class PyNoteBookWindow(QtWidgets.QMainWindow):
 
     pageAddWhere = PAGE_ADD_WHERE.kPageAddTopLevel if topLevel else PAGE_ADD_WHERE.kPageAddDefault
 
-    success, title, parentId = self.ui.pageTree.newItem(newPageId, pageType, pageAddWhere, pageTitle)
+    # The new page, and any siblings renumbered to make room for it, are written in a single transaction
+    with self.db.transaction():
+      success, title, parentId, sortKey = self.ui.pageTree.newItem(newPageId, pageType, pageAddWhere, pageTitle)
 
-    if success:
-      self.currentPageData.m_parentId = parentId      # This might be kInvalidPageId, which is OK
-      self.currentPageData.m_title = title
+      if success:
+        self.currentPageData.m_parentId = parentId      # This might be kInvalidPageId, which is OK
+        self.currentPageData.m_title = title
+        self.currentPageData.m_sortKey = sortKey
 
-      # Currently, addNewBlankPage applies for creating both pages and folders.
-      self.db.addNewBlankPage(self.currentPageData)
+        # Currently, addNewBlankPage applies for creating both pages and folders.
+        success = self.db.addNewBlankPage(self.currentPageData)
 
+    if not success:
+      # Nothing was written
+      self.currentPageData = None
+      self.ui.pageTree.removePage(newPageId)
+      QtWidgets.QMessageBox.critical(self, kAppName, "Can't create new page due to a database error.  See the logs for more information.")
+    else:
       if pageType == PAGE_TYPE.kPageTypeUserText:
         self.ui.editorStackedWidget.setCurrentIndex(kUserTextEditor)
         # TODO: Should a 'new page created' event be emitted here?
@@ -720,10 +800,6 @@ class PyNoteBookWindow(QtWidgets.QMainWindow):
       elif pageType == PAGE_TYPE.kPageTypeToDoList:
         self.ui.editorStackedWidget.setCurrentIndex(kToDoEditor)
 
-      # Write the page order to the database.
-      pageOrderStr = self.ui.pageTree.getPageOrderString()
-      self.db.setPageOrder(pageOrderStr)
-
       # Update page cache
       self.pageCache.addPage(newPageId, title)
 
@@ -731,7 +807,7 @@ class PyNoteBookWindow(QtWidgets.QMainWindow):
 
       self.enableDataEntry(True)
 
-  def displayPage(self, pageData: PageData, imageNames: list[str], isNewPage: bool, pageId: ENTITY_ID):
+  def displayPage(self, pageData: PageData, isNewPage: bool, pageId: ENTITY_ID):
     self.ui.titleLabelWidget.setPageTitleLabel(pageData.m_title)
 
     # Activate the appropriate editor
@@ -742,7 +818,7 @@ class PyNoteBookWindow(QtWidgets.QMainWindow):
         # TODO: Create new document.  Will this case occur?
         pass
       else:
-        self.ui.pageTextEdit.setPageContents(pageData.m_contentString, imageNames, pageId)
+        self.ui.pageTextEdit.setPageContents(pageData.m_contentString, pageId)
 
     elif pageData.m_pageType == PAGE_TYPE.kPageTypeToDoList:
       self.ui.editorStackedWidget.setCurrentIndex(kToDoEditor)
@@ -750,7 +826,7 @@ class PyNoteBookWindow(QtWidgets.QMainWindow):
         # TODO: Create new document.  Will this case occur?
         pass
       else:
-        self.ui.pageToDoEdit.setPageContents(pageData.m_contentString, imageNames)
+        self.ui.pageToDoEdit.setPageContents(pageData.m_contentString)
 
     elif pageData.m_pageType == PAGE_TYPE.kPageFolder:
       self.ui.folderEdit.displayFolder(pageId)
@@ -777,6 +853,8 @@ class PyNoteBookWindow(QtWidgets.QMainWindow):
     self.ui.pageTitleList.clear()
     self.ui.dateTree.clear()
     self.ui.tagList.clear()
+    self.tagQueryWidget.clear()
+    self.tagCache.clear()
     self.ui.recentlyViewedList.clear()
     self.favoritesManager.clear()
 
@@ -885,6 +963,7 @@ class PyNoteBookWindow(QtWidgets.QMainWindow):
     self.styleManager.saveStyleDefs(self.getStyleDefsPath())
 
     self.closeNotebookFile()
+    self.asyncDb.shutdown()
 
 def shutdownApp():
   logging.info("Shutting down...")
@@ -1,14 +1,17 @@
 from PySide6 import QtCore, QtWidgets, QtGui
-from page_tree import CPageTree
+from page_tree_view import CPageTreeView
 from database import Database
 
-from notebook_types import ENTITY_ID
+from notebook_types import ENTITY_ID, ENTITY_LIST
 
 from switchboard import Switchboard
 from ui_search_dialog import Ui_searchDialog
 
+# Number of pages read from the database at once, when searching a notebook that has no search index
+kScanBatchSize = 100
+
 class SearchDialog(QtWidgets.QDialog):
-  def __init__(self, db: Database, pageTree: CPageTree, switchboard: Switchboard, parent):
+  def __init__(self, db: Database, pageTree: CPageTreeView, switchboard: Switchboard, parent):
     super(SearchDialog, self).__init__(parent)
 
     self.ui = Ui_searchDialog()
@@ -50,18 +53,45 @@ class SearchDialog(QtWidgets.QDialog):
     self.setWaitCursor()
     self.ui.resultsListWidget.clear()
 
+    if self.db.hasSearchIndex():
+      self.searchIndex(searchText)
+    else:
+      self.scanPages(searchText)
+
+    self.restoreCursor()
+
+  def searchIndex(self, searchText):
+    """ Searches using the notebook's search index.  Results are listed in page tree order. """
+    matchingPages = dict(self.db.searchPages(searchText))
+
+    for pageId in self.pageTree.getTreeIdList():
+      if pageId in matchingPages:
+        self.addItem(pageId, matchingPages[pageId])
+
+  def scanPages(self, searchText):
+    """ Searches by reading every page.  This is used for notebooks that don't have a search index. """
     pageIds = self.pageTree.getTreeIdList()
 
+    # Pages are read in batches, which are decrypted in parallel in an encrypted notebook
+    for batchStart in range(0, len(pageIds), kScanBatchSize):
+      self.scanPageBatch(pageIds[batchStart:batchStart + kScanBatchSize], searchText)
+
+  def scanPageBatch(self, pageIds: ENTITY_LIST, searchText):
+    textItems = self.db.getPageTextItemsForPages(pageIds)
+
+    # Matching ignores case, as it does when searching the index
+    searchText = searchText.casefold()
+
     # Scan each page, and check its title and contents for the search term
     for pageId in pageIds:
-      results = self.db.getPageTextItems(pageId)
+      results = textItems.get(pageId)
 
       if results is not None:
         pageTitle = results[0]
         pageContentsHtml = results[1]
         tags = results[2]
 
-        if searchText in pageTitle:
+        if searchText in pageTitle.casefold():
           self.addItem(pageId, pageTitle)
 
         else:
@@ -73,13 +103,11 @@ class SearchDialog(QtWidgets.QDialog):
           textDoc.setHtml(pageContentsHtml)
           textContents = textDoc.toPlainText()
 
-          if searchText in textContents:
+          if searchText in textContents.casefold():
             self.addItem(pageId, pageTitle)
-          elif searchText in tags:
+          elif searchText in tags.casefold():
             self.addItem(pageId, pageTitle)
 
-    self.restoreCursor()
-
   def addItem(self, pageId: ENTITY_ID, title: str):
     newItem = QtWidgets.QListWidgetItem(title)
     newItem.setData(QtCore.Qt.ItemDataRole.UserRole, pageId)
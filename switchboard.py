@@ -15,6 +15,14 @@ class Switchboard(QtCore.QObject):
   pageImportUpdated = QtCore.Signal(int, str)
   pageImportDeleted = QtCore.Signal(int)
   stylesChanged = QtCore.Signal()
+  pageMoved = QtCore.Signal(int, int, object)       # Page ID, new parent ID, sort keys that changed (by page ID)
+
+  # Results of database calls made through the database worker (see database_worker.py)
+  pageLoaded = QtCore.Signal(int, object, int)      # Page ID, PageData (or None), page cache generation when the read started
+  pageUpdated = QtCore.Signal(object, bool)         # PageData as it was saved, success
+  pageListLoaded = QtCore.Signal(object, bool)      # PageDataDict, success
+  pageImagesLoaded = QtCore.Signal(int, object)     # Page ID, ImageDict
+  tagListLoaded = QtCore.Signal(object, bool)       # PageIdDict, success
 
   def __init__(self):
     super(Switchboard, self).__init__()
@@ -49,3 +57,21 @@ class Switchboard(QtCore.QObject):
 
   def emitStylesChanged(self):
     self.stylesChanged.emit()
+
+  def emitPageMoved(self, pageId: int, parentId: int, sortKeys: dict[int, int]):
+    self.pageMoved.emit(pageId, parentId, sortKeys)
+
+  def emitPageLoaded(self, pageId: int, pageData: PageData | None, generation: int):
+    self.pageLoaded.emit(pageId, pageData, generation)
+
+  def emitPageUpdated(self, pageData: PageData, success: bool):
+    self.pageUpdated.emit(pageData, success)
+
+  def emitPageListLoaded(self, pageDict, success: bool):
+    self.pageListLoaded.emit(pageDict, success)
+
+  def emitTagListLoaded(self, tagDict, success: bool):
+    self.tagListLoaded.emit(tagDict, success)
+
+  def emitPageImagesLoaded(self, pageId: int, imageDict):
+    self.pageImagesLoaded.emit(pageId, imageDict)
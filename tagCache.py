@@ -1,30 +1,100 @@
-
+from typing import Callable, Iterable
 from notebook_types import ENTITY_ID
 from page_data import PageIdDict
 
 
+class TagChange:
+  """ Describes a change to the tag cache. """
+  def __init__(self) -> None:
+    self.addedTags: set[str] = set()          # Tags that were not used by any page before the change
+    self.removedTags: set[str] = set()        # Tags that are no longer used by any page
+    self.counts: dict[str, int] = {}          # New page count of each tag whose count changed (0 if removed)
+
+  def isEmpty(self) -> bool:
+    return len(self.counts) == 0
+
+
 class TagCache:
   def __init__(self):
-    self.tagDict: dict[str, set[ENTITY_ID]] = {}       # Maps tag -> list of pageIds
+    self.tagDict: dict[str, set[ENTITY_ID]] = {}       # Maps tag -> set of pageIds
+    self.pageTags: dict[ENTITY_ID, set[str]] = {}      # Maps pageId -> set of tags
+    self.listeners: list[Callable[[TagChange], None]] = []
 
-  def addTag(self, pageId: ENTITY_ID, tag: str) -> None:
-    if tag not in self.tagDict:
-      self.tagDict[tag] = set()
+  def addListener(self, listener: Callable[[TagChange], None]) -> None:
+    """ The listener is called with a TagChange after each change to the cache. """
+    self.listeners.append(listener)
+
+  def notifyListeners(self, change: TagChange) -> None:
+    if change.isEmpty():
+      return
+
+    for listener in self.listeners:
+      listener(change)
+
+  def clear(self) -> None:
+    change = TagChange()
+    change.removedTags = set(self.tagDict.keys())
+    change.counts = dict.fromkeys(self.tagDict.keys(), 0)
 
-    self.tagDict[tag].add(pageId)
+    self.tagDict.clear()
+    self.pageTags.clear()
+    self.notifyListeners(change)
+
+  def addTagToPage(self, pageId: ENTITY_ID, tag: str, change: TagChange) -> None:
+    pageIds = self.tagDict.get(tag)
+
+    if pageIds is None:
+      pageIds = self.tagDict[tag] = set()
+      change.addedTags.add(tag)
+      change.removedTags.discard(tag)
+    elif pageId in pageIds:
+      return
+
+    pageIds.add(pageId)
+    self.pageTags.setdefault(pageId, set()).add(tag)
+    change.counts[tag] = len(pageIds)
+
+  def removeTagFromPage(self, pageId: ENTITY_ID, tag: str, change: TagChange) -> None:
+    pageIds = self.tagDict.get(tag)
+
+    if pageIds is None or pageId not in pageIds:
+      return
+
+    pageIds.remove(pageId)
+    change.counts[tag] = len(pageIds)
+
+    if len(pageIds) == 0:
+      del self.tagDict[tag]
+
+      if tag in change.addedTags:
+        change.addedTags.remove(tag)
+      else:
+        change.removedTags.add(tag)
+
+    pageTags = self.pageTags[pageId]
+    pageTags.remove(tag)
+
+    if len(pageTags) == 0:
+      del self.pageTags[pageId]
+
+  def addTag(self, pageId: ENTITY_ID, tag: str) -> None:
+    change = TagChange()
+    self.addTagToPage(pageId, tag, change)
+    self.notifyListeners(change)
 
   def addTags(self, tags: PageIdDict) -> None:
+    change = TagChange()
+
     for pageId, tagsForPage in tags.items():
       for tag in tagsForPage:
-        self.addTag(pageId, tag)
+        self.addTagToPage(pageId, tag, change)
+
+    self.notifyListeners(change)
 
   def removePageIdFromTag(self, pageId: ENTITY_ID, tag: str) -> None:
-    if tag in self.tagDict:
-      if pageId in self.tagDict[tag]:
-        pageDict = self.tagDict[tag]
-        pageDict.remove(pageId)
-        if len(pageDict) == 0:
-          del self.tagDict[tag]
+    change = TagChange()
+    self.removeTagFromPage(pageId, tag, change)
+    self.notifyListeners(change)
 
   def removePageIdFromAllTags(self, pageId: ENTITY_ID) -> None:
     """Removes the given page ID from all tags.
@@ -32,43 +102,31 @@ class TagCache:
     Args:
         pageId (ENTITY_ID): ID of page to remove.
     """
-    tagsToDelete = []
+    self.updateTagsForPage(pageId, [])
 
-    for tag, tagsForPage in self.tagDict.items():
-      if pageId in tagsForPage:
-        self.tagDict[tag].remove(pageId)
+  def updateTagsForPage(self, pageId: ENTITY_ID, tags: Iterable[str]) -> None:
+    """ Replaces the tags of the page.  Only the page's old and new tags are touched. """
+    oldTags = self.pageTags.get(pageId, set())
+    newTags = set(tags)
+    change = TagChange()
 
-        # If the tag is now empty, add it to the list of tags to delete
-        if len(self.tagDict[tag]) == 0:
-          tagsToDelete.append(tag)
+    for tag in oldTags - newTags:
+      self.removeTagFromPage(pageId, tag, change)
 
-    # Delete any empty tags
-    for tag in tagsToDelete:
-      del self.tagDict[tag]
+    for tag in newTags - oldTags:
+      self.addTagToPage(pageId, tag, change)
 
-  def updateTagsForPage(self, pageId: ENTITY_ID, tags: list[str]) -> None:
-    tagsToDelete = []
+    self.notifyListeners(change)
 
-    # Remove all tags for the page
-    for tag, pageSet in self.tagDict.items():
-      if pageId in pageSet:
-        self.tagDict[tag].remove(pageId)
+  def tagsForPage(self, pageId: ENTITY_ID) -> set[str]:
+    return set(self.pageTags.get(pageId, set()))
 
-        # If the tag is now empty, add it to the list of tags to delete
-        if len(self.tagDict[tag]) == 0:
-          tagsToDelete.append(tag)
-
-    # Delete any empty tags
-    for tag in tagsToDelete:
-      del self.tagDict[tag]
-
-    # Add the new tags
-    for tag in tags:
-      self.addTag(pageId, tag)
+  def tagCount(self, tag: str) -> int:
+    """ Returns the number of pages using the tag. """
+    return len(self.tagDict.get(tag, ()))
 
   def pagesUsingTag(self, tag: str) -> list[ENTITY_ID]:
     if tag in self.tagDict:
       return list(self.tagDict[tag])
     else:
       return []
-
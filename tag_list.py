@@ -1,70 +1,95 @@
 from PySide6 import QtCore, QtWidgets, QtGui
-from notebook_types import ENTITY_ID
+from enum import Enum
 from pageCache import PageCache
 from switchboard import Switchboard
-from tagCache import TagCache
+from tagCache import TagCache, TagChange
+
+class TAG_SORT(Enum):
+  kSortByName = 0
+  kSortByFrequency = 1
+
+class CTagListItem(QtWidgets.QListWidgetItem):
+  def __init__(self, tag: str, count: int):
+    super(CTagListItem, self).__init__()
+    self.tag = tag
+    self.setData(QtCore.Qt.ItemDataRole.UserRole, tag)
+    self.setCount(count)
+
+  def setCount(self, count: int) -> None:
+    self.count = count
+    self.setText(f'{self.tag} ({count})')     # Setting the text moves the item to its new sorted position
+
+  def sortKey(self) -> tuple:
+    listWidget = self.listWidget()
+
+    if listWidget is not None and listWidget.sortOrder == TAG_SORT.kSortByFrequency:
+      return (-self.count, self.tag.casefold(), self.tag)
+
+    return (self.tag.casefold(), self.tag)
+
+  def __lt__(self, other):
+    return self.sortKey() < other.sortKey()
 
 class CTagList(QtWidgets.QListWidget):
+  """ Lists the tags in the tag cache, with the number of pages using each.  The list is kept up to date
+      from the changes the tag cache reports, so only the tags that changed are touched. """
   def __init__(self, parent):
     super(CTagList, self).__init__(parent)
     self.setContextMenuPolicy(QtGui.Qt.ContextMenuPolicy.CustomContextMenu)
     self.customContextMenuRequested.connect(self.onContextMenu)
     self.contextMenu = QtWidgets.QMenu(self)
 
+    self.tagItems: dict[str, CTagListItem] = {}
+    self.sortOrder = TAG_SORT.kSortByName
+    self.setSortingEnabled(True)
+
   def initialize(self, tagCache: TagCache, pageCache: PageCache, switchboard: Switchboard) -> None:
     self.tagCache = tagCache
     self.pageCache = pageCache
     self.switchboard = switchboard
 
-    self.switchboard.pageTitleUpdated.connect(self.updateTags)
-    self.switchboard.pageDeleted.connect(self.onPageIdDeleted)
+    self.tagCache.addListener(self.onTagsChanged)
+
+  def clear(self) -> None:
+    self.tagItems.clear()
+    super(CTagList, self).clear()
 
   def addItems(self) -> None:
-    """Adds items from the tag cache to the list.  It is assumed that the tag cache has
-       been populated.
+    """Rebuilds the list from the tag cache.
     """
-    for tag in self.tagCache.tagDict.keys():
-      self.addTag(tag)
+    self.clear()
 
-  def addTag(self, tag: str) -> None:
-	  # Add to the list
-    newItem = QtWidgets.QListWidgetItem(tag)
+    for tag, pageIds in self.tagCache.tagDict.items():
+      self.addTag(tag, len(pageIds))
 
+  def addTag(self, tag: str, count: int) -> None:
+    newItem = CTagListItem(tag, count)
+    self.tagItems[tag] = newItem
     self.addItem(newItem)
 
-  def updateTags(self) -> None:
-    rowsToDelete = []
-    numRows = self.count()
-
-    # Scan the list and remove any tags that are no longer in the tag cache
-    for row in range(numRows):
-      item = self.item(row)
-      if item is not None:
-        tag = item.text()
-        if tag not in self.tagCache.tagDict:
-          rowsToDelete.append(row)
-
-    # Remove the rows
-    for row in reversed(rowsToDelete):
-      self.takeItem(row)
+  def removeTag(self, tag: str) -> None:
+    item = self.tagItems.pop(tag, None)
 
-    # Add any new tags
-    for tag, pageIds in self.tagCache.tagDict.items():
-      if self.findTag(tag) is None:
-        self.addTag(tag)
+    if item is not None:
+      self.takeItem(self.row(item))
 
   def findTag(self, tag: str) -> QtWidgets.QListWidgetItem | None:
-    foundItems = self.findItems(tag, QtCore.Qt.MatchFlag.MatchFixedString)
-    return foundItems[0] if len(foundItems) > 0 else None
+    return self.tagItems.get(tag)
+
+  def setSortOrder(self, sortOrder: TAG_SORT) -> None:
+    self.sortOrder = sortOrder
+    self.sortItems()
 
   def onContextMenu(self, pos):
     self.contextMenu.clear()
 
     item = self.itemAt(pos)
     if item is None:
+      self.addSortActions()
+      self.contextMenu.exec(self.mapToGlobal(pos))
       return
 
-    tagStr = item.text()
+    tagStr = item.data(QtCore.Qt.ItemDataRole.UserRole)
 
     pagesUsingTag = self.tagCache.pagesUsingTag(tagStr)
 
@@ -80,8 +105,17 @@ class CTagList(QtWidgets.QListWidget):
       action.setData(pageId)
       action.triggered.connect(self.onPageIdSelected)
 
+    self.contextMenu.addSeparator()
+    self.addSortActions()
+
     self.contextMenu.exec(self.mapToGlobal(pos))
 
+  def addSortActions(self) -> None:
+    for text, sortOrder in [('Sort by Name', TAG_SORT.kSortByName), ('Sort by Frequency', TAG_SORT.kSortByFrequency)]:
+      action = self.contextMenu.addAction(text, lambda sortOrder=sortOrder: self.setSortOrder(sortOrder))
+      action.setCheckable(True)
+      action.setChecked(sortOrder == self.sortOrder)
+
   def onPageIdSelected(self):
     sender = self.sender()
 
@@ -90,5 +124,11 @@ class CTagList(QtWidgets.QListWidget):
 
       self.switchboard.emitPageSelected(pageId)
 
-  def onPageIdDeleted(self, pageId: ENTITY_ID):
-    self.updateTags()
\ No newline at end of file
+  def onTagsChanged(self, change: TagChange) -> None:
+    for tag, count in change.counts.items():
+      if count == 0:
+        self.removeTag(tag)
+      elif tag in self.tagItems:
+        self.tagItems[tag].setCount(count)
+      else:
+        self.addTag(tag, count)
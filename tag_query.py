@@ -0,0 +1,152 @@
+# Tag queries, such as:
+#
+#   project-x AND NOT archived
+#   (work OR home) AND "to do"
+#
+# NOT binds tightest, then AND, then OR.  Terms written next to each other are ANDed, and tags containing
+# spaces, parentheses or keywords can be quoted.  A query is evaluated as set operations over the tag cache.
+import re
+
+from tagCache import TagCache
+from notebook_types import ENTITY_ID
+
+kTokenPattern = re.compile(r'\s*(?:(\()|(\))|"([^"]*)"|([^\s()"]+))')
+kKeywords = { 'AND', 'OR', 'NOT' }
+
+class TagQueryError(Exception):
+  pass
+
+class TagQuery:
+  def __init__(self, queryString: str) -> None:
+    """ Parses the query.  Raises TagQueryError if it isn't valid. """
+    self.queryString = queryString
+    self.tokens = self.tokenize(queryString)
+    self.position = 0
+
+    if len(self.tokens) == 0:
+      raise TagQueryError('The query is empty')
+
+    self.tree = self.parseOr()
+
+    if self.position < len(self.tokens):
+      raise TagQueryError(f'Unexpected "{self.tokens[self.position][1]}"')
+
+  # *************************** PARSING ***************************
+
+  def tokenize(self, queryString: str) -> list[tuple[str, str]]:
+    """ Returns a list of (kind, text) tuples, where kind is '(', ')', a keyword or 'tag'. """
+    tokens = []
+    position = 0
+    queryString = queryString.strip()
+
+    while position < len(queryString):
+      match = kTokenPattern.match(queryString, position)
+
+      if match is None:
+        raise TagQueryError('Unmatched quote')
+
+      openParen, closeParen, quotedTag, word = match.groups()
+
+      if openParen is not None:
+        tokens.append(('(', openParen))
+      elif closeParen is not None:
+        tokens.append((')', closeParen))
+      elif quotedTag is not None:
+        tokens.append(('tag', quotedTag))
+      elif word.upper() in kKeywords:
+        tokens.append((word.upper(), word))
+      else:
+        tokens.append(('tag', word))
+
+      position = match.end()
+
+    return tokens
+
+  def peek(self) -> str | None:
+    return self.tokens[self.position][0] if self.position < len(self.tokens) else None
+
+  def parseOr(self) -> tuple:
+    terms = [self.parseAnd()]
+
+    while self.peek() == 'OR':
+      self.position += 1
+      terms.append(self.parseAnd())
+
+    return terms[0] if len(terms) == 1 else ('or', terms)
+
+  def parseAnd(self) -> tuple:
+    terms = [self.parseNot()]
+
+    while self.peek() in ('AND', 'NOT', '(', 'tag'):
+      if self.peek() == 'AND':
+        self.position += 1
+
+      terms.append(self.parseNot())
+
+    return terms[0] if len(terms) == 1 else ('and', terms)
+
+  def parseNot(self) -> tuple:
+    kind = self.peek()
+
+    if kind == 'NOT':
+      self.position += 1
+      return ('not', self.parseNot())
+
+    if kind == '(':
+      self.position += 1
+      term = self.parseOr()
+
+      if self.peek() != ')':
+        raise TagQueryError('Missing ")"')
+
+      self.position += 1
+      return term
+
+    if kind == 'tag':
+      self.position += 1
+      return ('tag', self.tokens[self.position - 1][1])
+
+    if kind is None:
+      raise TagQueryError('The query ends unexpectedly')
+
+    raise TagQueryError(f'Unexpected "{self.tokens[self.position][1]}"')
+
+  # *************************** EVALUATION ***************************
+
+  def evaluate(self, tagCache: TagCache, allPageIds: set[ENTITY_ID]) -> set[ENTITY_ID]:
+    """ Returns the IDs of the pages matching the query.  allPageIds is only used to complement terms
+        that aren't ANDed with a positive term. """
+    return set(self.evaluateNode(self.tree, tagCache, allPageIds))     # A tag's own set may be returned
+
+  def evaluateNode(self, node: tuple, tagCache: TagCache, allPageIds: set[ENTITY_ID]) -> set[ENTITY_ID]:
+    match node[0]:
+      case 'tag':
+        return tagCache.tagDict.get(node[1], set())
+
+      case 'not':
+        return allPageIds - self.evaluateNode(node[1], tagCache, allPageIds)
+
+      case 'or':
+        return set().union(*(self.evaluateNode(term, tagCache, allPageIds) for term in node[1]))
+
+      case 'and':
+        # Intersect the positive terms, smallest first, then subtract the negated terms, so that NOT
+        # doesn't need to build the complement of a tag
+        positives = [self.evaluateNode(term, tagCache, allPageIds) for term in node[1] if term[0] != 'not']
+        negatives = [term[1] for term in node[1] if term[0] == 'not']
+
+        if len(positives) == 0:
+          result = set(allPageIds)
+        else:
+          positives.sort(key=len)
+          result = set(positives[0]).intersection(*positives[1:])
+
+        for term in negatives:
+          if len(result) == 0:
+            break
+
+          result -= self.evaluateNode(term, tagCache, allPageIds)
+
+        return result
+
+    raise TagQueryError(f'Unknown query term {node[0]}')
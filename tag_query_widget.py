@@ -0,0 +1,109 @@
+from PySide6 import QtCore, QtWidgets
+
+from pageCache import PageCache
+from switchboard import Switchboard
+from tagCache import TagCache, TagChange
+from tag_query import TagQuery, TagQueryError
+from notebook_types import ENTITY_ID
+
+class CTagQueryWidget(QtWidgets.QWidget):
+  """ Navigation panel that lists the pages matching a tag query, such as "project-x AND NOT archived".
+      The results are refreshed whenever the tags change. """
+  def __init__(self, parent):
+    super(CTagQueryWidget, self).__init__(parent)
+    self.query: TagQuery | None = None
+
+    self.queryEdit = QtWidgets.QLineEdit(self)
+    self.queryEdit.setPlaceholderText('Tags, with AND, OR, NOT and ( )')
+    self.queryEdit.setClearButtonEnabled(True)
+
+    self.statusLabel = QtWidgets.QLabel(self)
+    self.resultList = QtWidgets.QListWidget(self)
+    self.resultList.setUniformItemSizes(True)
+
+    layout = QtWidgets.QVBoxLayout(self)
+    layout.setContentsMargins(0, 0, 0, 0)
+    layout.addWidget(self.queryEdit)
+    layout.addWidget(self.statusLabel)
+    layout.addWidget(self.resultList)
+
+  def initialize(self, tagCache: TagCache, pageCache: PageCache, switchboard: Switchboard) -> None:
+    self.tagCache = tagCache
+    self.pageCache = pageCache
+    self.switchboard = switchboard
+
+    self.queryEdit.returnPressed.connect(self.runQuery)
+    self.resultList.itemClicked.connect(self.onItemClicked)
+
+    self.tagCache.addListener(self.onTagsChanged)
+    self.switchboard.pageTitleUpdated.connect(self.onPageTitleUpdated)
+    self.switchboard.pageDeleted.connect(self.onPageDeleted)
+
+  def clear(self) -> None:
+    self.query = None
+    self.queryEdit.clear()
+    self.statusLabel.clear()
+    self.resultList.clear()
+
+  def runQuery(self) -> None:
+    queryString = self.queryEdit.text().strip()
+
+    if len(queryString) == 0:
+      self.clear()
+      return
+
+    try:
+      self.query = TagQuery(queryString)
+    except TagQueryError as e:
+      self.query = None
+      self.statusLabel.setText(str(e))
+      self.resultList.clear()
+      return
+
+    self.showResults()
+
+  def showResults(self) -> None:
+    if self.query is None:
+      return
+
+    pageIds = self.query.evaluate(self.tagCache, set(self.pageCache.pageDict.keys()))
+    results = sorted((self.pageCache.pageTitle(pageId), pageId) for pageId in pageIds)
+
+    self.resultList.clear()
+
+    for pageTitle, pageId in results:
+      item = QtWidgets.QListWidgetItem(pageTitle)
+      item.setData(QtCore.Qt.ItemDataRole.UserRole, pageId)
+      self.resultList.addItem(item)
+
+    self.statusLabel.setText(f'{len(results)} page(s)')
+
+  def findResultItem(self, pageId: ENTITY_ID) -> QtWidgets.QListWidgetItem | None:
+    for row in range(self.resultList.count()):
+      item = self.resultList.item(row)
+
+      if item.data(QtCore.Qt.ItemDataRole.UserRole) == pageId:
+        return item
+
+    return None
+
+  # *************************** SLOTS ***************************
+
+  def onItemClicked(self, item: QtWidgets.QListWidgetItem) -> None:
+    self.switchboard.emitPageSelected(item.data(QtCore.Qt.ItemDataRole.UserRole))
+
+  def onTagsChanged(self, change: TagChange) -> None:
+    self.showResults()
+
+  def onPageTitleUpdated(self, pageId: ENTITY_ID, title: str, isModification: bool) -> None:
+    item = self.findResultItem(pageId)
+
+    if item is not None:
+      item.setText(title)
+
+  def onPageDeleted(self, pageId: ENTITY_ID) -> None:
+    item = self.findResultItem(pageId)
+
+    if item is not None:
+      self.resultList.takeItem(self.resultList.row(item))
+      self.statusLabel.setText(f'{self.resultList.count()} page(s)')
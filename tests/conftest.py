@@ -0,0 +1,17 @@
+import os
+import sys
+
+import pytest
+
+# The application's modules live at the top of the repository, rather than in a package
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+@pytest.fixture(scope='session')
+def qtApp():
+  """ The Qt application object, which the database needs for its SQL drivers and image readers. """
+  os.environ.setdefault('QT_QPA_PLATFORM', 'offscreen')
+
+  from PySide6 import QtGui
+  app = QtGui.QGuiApplication.instance() or QtGui.QGuiApplication([])
+  yield app
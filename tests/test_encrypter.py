@@ -0,0 +1,87 @@
+import base64
+import hashlib
+
+import pytest
+from cryptography.fernet import Fernet
+from cryptography.hazmat.primitives import hashes
+from cryptography.hazmat.primitives.kdf.pbkdf2 import PBKDF2HMAC
+
+from encrypter import DecryptionErrors, Encrypter, kAesGcmNonceSize, kEnvelopeVersionAesGcm, kMinParallelDecryptCount
+
+kPassword = 'correct horse'
+kSalt = b'0123456789abcdef'
+
+
+@pytest.fixture(scope='module')
+def encrypter():
+  # Deriving the key is deliberately slow, so it is only done once
+  encrypter = Encrypter()
+  encrypter.setPasswordAndSalt(kPassword, kSalt)
+  return encrypter
+
+
+def legacyToken(contents: bytes) -> bytes:
+  """ Returns a Fernet token, as values were encrypted before the storage envelope. """
+  kdf = PBKDF2HMAC(algorithm=hashes.SHA256(), length=32, salt=kSalt, iterations=480000)
+  return Fernet(base64.urlsafe_b64encode(kdf.derive(kPassword.encode('utf-8')))).encrypt(contents)
+
+
+def test_envelopeRoundTrip(encrypter):
+  encrypted = encrypter.encrypt('Café notes')
+
+  assert encrypted[0] == kEnvelopeVersionAesGcm
+  assert len(encrypted) == 1 + kAesGcmNonceSize + len('Café notes'.encode('utf-8')) + 16
+  assert not encrypter.isLegacyValue(encrypted)
+  assert encrypter.decrypt(encrypted) == 'Café notes'
+
+
+def test_envelopeUsesFreshNonces(encrypter):
+  assert encrypter.encrypt('same') != encrypter.encrypt('same')
+
+
+def test_tamperedEnvelopeIsRejected(encrypter):
+  encrypted = bytearray(encrypter.encrypt('contents'))
+  encrypted[-1] ^= 1
+
+  with pytest.raises(DecryptionErrors):
+    encrypter.decryptBytes(bytes(encrypted))
+
+
+def test_wrongPasswordIsRejected(encrypter):
+  otherEncrypter = Encrypter()
+  otherEncrypter.setPasswordAndSalt('wrong password', kSalt)
+
+  with pytest.raises(DecryptionErrors):
+    otherEncrypter.decrypt(encrypter.encrypt('contents'))
+
+
+def test_legacyValue(encrypter):
+  token = legacyToken(b'legacy contents')
+
+  assert encrypter.isLegacyValue(token)
+  assert encrypter.decrypt(token) == 'legacy contents'
+
+
+def test_emptyValue(encrypter):
+  assert not encrypter.isLegacyValue(b'')
+  assert encrypter.decryptBytes(b'') == b''
+
+
+def test_noPassword():
+  encrypter = Encrypter()
+
+  assert not encrypter.hasPassword()
+  assert encrypter.hashedPassword() is None
+  assert encrypter.encrypt('contents') == b''
+
+
+def test_hashedPassword(encrypter):
+  assert encrypter.hashedPassword() == hashlib.sha256(kPassword.encode('utf8')).hexdigest()
+
+
+@pytest.mark.parametrize('count', [3, kMinParallelDecryptCount * 2 + 5])
+def test_decryptManyKeepsOrder(encrypter, count):
+  contentsList = [f'Page {i}' for i in range(count)]
+  encryptedList = [encrypter.encrypt(contents) for contents in contentsList]
+
+  assert encrypter.decryptMany(encryptedList) == contentsList
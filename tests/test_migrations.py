@@ -0,0 +1,126 @@
+import sqlite3
+
+import pytest
+
+from database import Database, kDatabaseVersionId, kPageOrderKey
+
+# The tables as they were in version 0 of the database
+kVersion0Schema = [
+  "create table globals (key text UNIQUE, datatype int, intval int, stringval text, blobval blob)",
+  "create table pages (pageid integer UNIQUE, parentid integer, created integer, lastmodified integer, "
+    "nummodifications integer, pagetype integer, pagetitle blob, contents blob, tags blob, additionalitems text, "
+    "isfavorite integer default 0)",
+  "create table additionaldata (itemid text UNIQUE, type integer, contents blob, parentid integer)",
+]
+
+
+def pngBytes(width: int, height: int) -> bytes:
+  from PySide6 import QtCore, QtGui
+
+  image = QtGui.QImage(width, height, QtGui.QImage.Format.Format_RGB32)
+  image.fill(QtGui.QColor('teal'))
+
+  buffer = QtCore.QBuffer()
+  buffer.open(QtCore.QIODevice.OpenModeFlag.WriteOnly)
+  image.save(buffer, 'PNG')
+  return bytes(buffer.data())
+
+
+def createVersion0Notebook(path, extraStatements=()):
+  """ Creates a notebook as version 0 wrote it: pages ordered by the page order global, and images
+      stored under their names.  Page 3 is a child of page 1. """
+  connection = sqlite3.connect(path)
+
+  for statement in kVersion0Schema + list(extraStatements):
+    connection.execute(statement)
+
+  for pageId, parentId in [(1, 0), (2, 0), (3, 1), (4, 1), (5, 0)]:
+    connection.execute("insert into pages (pageid, parentid, created, lastmodified, nummodifications, pagetype, pagetitle, contents, tags) "
+                       "values (?, ?, 0, 0, 0, 0, ?, ?, '')", (pageId, parentId, f'Page {pageId}'.encode(), b'<p>Hello</p>'))
+
+  connection.execute("insert into globals (key, datatype, stringval) values (?, 1, ?)", (kPageOrderKey, '5,1,4,3,2'))
+
+  smallImage = pngBytes(16, 16)
+  largeImage = pngBytes(2000, 100)
+
+  for imageName, imageData in [('small-a', smallImage), ('small-b', smallImage), ('large', largeImage)]:
+    connection.execute("insert into additionaldata (itemid, type, contents, parentid) values (?, 1, ?, 1)", (imageName, imageData))
+
+  connection.commit()
+  connection.close()
+
+
+def openAndClose(path) -> bool:
+  db = Database()
+  success = db.openDatabase(str(path))
+  db.close()
+  return success
+
+
+@pytest.fixture
+def notebookPath(tmp_path, qtApp):
+  path = tmp_path / 'notebook.db'
+  createVersion0Notebook(path)
+  return path
+
+
+def test_migrationsReachCurrentVersion(notebookPath):
+  assert openAndClose(notebookPath)
+
+  with sqlite3.connect(notebookPath) as connection:
+    assert connection.execute("select intval from globals where key=?", (kDatabaseVersionId,)).fetchone() == (4,)
+
+
+def test_indexes(notebookPath):
+  assert openAndClose(notebookPath)
+
+  with sqlite3.connect(notebookPath) as connection:
+    indexNames = { row[0] for row in connection.execute("select name from sqlite_master where type='index'") }
+
+  assert { 'pages_parentid', 'pages_isfavorite', 'pages_lastmodified', 'additionaldata_parentid',
+           'pages_parentid_sortkey', 'imagenames_pageid', 'imagenames_imagehash' } <= indexNames
+
+
+def test_sortKeysFollowPageOrder(notebookPath):
+  assert openAndClose(notebookPath)
+
+  with sqlite3.connect(notebookPath) as connection:
+    sortKeys = dict(connection.execute("select pageid, sortkey from pages"))
+    pageOrder = connection.execute("select * from globals where key=?", (kPageOrderKey,)).fetchone()
+
+  assert sortKeys[5] < sortKeys[1] < sortKeys[2]
+  assert sortKeys[4] < sortKeys[3]
+  assert pageOrder is None
+
+
+def test_imagesAreStoredByContent(notebookPath):
+  assert openAndClose(notebookPath)
+
+  with sqlite3.connect(notebookPath) as connection:
+    imageHashes = dict(connection.execute("select itemid, imagehash from imagenames"))
+    storedImages = { row[0]: row[1:] for row in connection.execute("select itemid, refcount, format, renditionformat from additionaldata") }
+
+  # The two names for the same image share one stored copy
+  assert set(imageHashes) == { 'small-a', 'small-b', 'large' }
+  assert imageHashes['small-a'] == imageHashes['small-b']
+  assert len(storedImages) == 2
+
+  assert storedImages[imageHashes['small-a']] == (2, 'PNG', None)
+  assert storedImages[imageHashes['large']] == (1, 'PNG', 'png')     # Large images get a rendition
+
+
+def test_currentNotebookIsNotMigratedAgain(notebookPath):
+  assert openAndClose(notebookPath)
+  assert openAndClose(notebookPath)
+
+
+def test_failedMigrationIsRolledBack(tmp_path, qtApp):
+  # The image names table already exists, so version 3 can't be applied
+  path = tmp_path / 'notebook.db'
+  createVersion0Notebook(path, ["create table imagenames (itemid text)"])
+
+  assert not openAndClose(path)
+
+  with sqlite3.connect(path) as connection:
+    assert connection.execute("select intval from globals where key=?", (kDatabaseVersionId,)).fetchone() == (2,)
+    assert [row[1] for row in connection.execute("pragma table_info(additionaldata)")] == ['itemid', 'type', 'contents', 'parentid']
@@ -0,0 +1,103 @@
+from page_data import PageData
+from pageCache import PageCache
+
+
+def makePage(pageId, contents='contents'):
+  pageData = PageData()
+  pageData.m_pageId = pageId
+  pageData.m_title = f'Page {pageId}'
+  pageData.m_contentString = contents
+  return pageData
+
+
+def cacheForPages(pageCount):
+  """ Returns a cache with room for pageCount of the pages made by makePage. """
+  return PageCache(PageCache.pageBytes(makePage(1)) * pageCount)
+
+
+def test_hitsAndMisses():
+  pageCache = cacheForPages(2)
+  pageCache.addDecodedPage(makePage(1))
+
+  assert pageCache.getDecodedPage(1).m_pageId == 1
+  assert pageCache.getDecodedPage(2) is None
+  assert (pageCache.hits, pageCache.misses) == (1, 1)
+
+
+def test_pagesAreCopied():
+  pageCache = cacheForPages(2)
+  pageData = makePage(1)
+  pageCache.addDecodedPage(pageData)
+
+  pageData.m_contentString = 'edited before saving'
+  cachedPage = pageCache.getDecodedPage(1)
+  cachedPage.m_contentString = 'edited in the view'
+
+  assert pageCache.getDecodedPage(1).m_contentString == 'contents'
+
+
+def test_leastRecentlyUsedPageIsEvicted():
+  pageCache = cacheForPages(2)
+  pageCache.addDecodedPage(makePage(1))
+  pageCache.addDecodedPage(makePage(2))
+  pageCache.getDecodedPage(1)
+  pageCache.addDecodedPage(makePage(3))
+
+  assert pageCache.hasDecodedPage(1)
+  assert not pageCache.hasDecodedPage(2)
+  assert pageCache.hasDecodedPage(3)
+  assert pageCache.decodedBytes <= pageCache.capacityBytes
+
+
+def test_replacingPageKeepsSizeAccurate():
+  pageCache = cacheForPages(4)
+  pageCache.addDecodedPage(makePage(1))
+  pageCache.addDecodedPage(makePage(1, 'longer contents ' * 10))
+
+  assert pageCache.decodedBytes == PageCache.pageBytes(makePage(1, 'longer contents ' * 10))
+
+
+def test_pageLargerThanCacheIsNotCached():
+  pageCache = cacheForPages(2)
+  pageCache.addDecodedPage(makePage(1))
+  pageCache.addDecodedPage(makePage(2, 'x' * pageCache.capacityBytes))
+
+  assert pageCache.hasDecodedPage(1)
+  assert not pageCache.hasDecodedPage(2)
+
+
+def test_invalidatePageBumpsGeneration():
+  pageCache = cacheForPages(2)
+  pageCache.addDecodedPage(makePage(1))
+
+  assert pageCache.pageGeneration(1) == 0
+
+  pageCache.invalidatePage(1)
+
+  assert pageCache.pageGeneration(1) == 1
+  assert not pageCache.hasDecodedPage(1)
+  assert pageCache.decodedBytes == 0
+
+
+def test_staleReadIsRefused():
+  pageCache = cacheForPages(2)
+  generation = pageCache.pageGeneration(1)
+
+  # The page is saved while it is being read
+  pageCache.invalidatePage(1)
+
+  assert not pageCache.addDecodedPage(makePage(1), generation)
+  assert not pageCache.hasDecodedPage(1)
+
+  assert pageCache.addDecodedPage(makePage(1), pageCache.pageGeneration(1))
+  assert pageCache.hasDecodedPage(1)
+
+
+def test_removePage():
+  pageCache = cacheForPages(2)
+  pageCache.addPage(1, 'Page 1')
+  pageCache.addDecodedPage(makePage(1))
+  pageCache.removePage(1)
+
+  assert pageCache.pageTitle(1) == ''
+  assert not pageCache.hasDecodedPage(1)
@@ -0,0 +1,68 @@
+from types import SimpleNamespace
+import zlib
+
+import pytest
+
+import page_codec
+from page_codec import decodeContents, encodeContents, kCodecMarker, kCodecZlib, kMinCompressLength
+
+kRepetitiveContents = '<p style="margin-top:0px; margin-bottom:0px;">Some text</p>\n' * 50
+
+
+def test_shortContentsAreStoredPlain():
+  contents = 'x' * (kMinCompressLength - 1)
+
+  assert encodeContents(contents) == contents.encode('utf-8')
+  assert decodeContents(encodeContents(contents)) == contents
+
+
+def test_emptyContents():
+  assert encodeContents('') == b''
+  assert decodeContents(b'') == ''
+
+
+def test_longContentsAreCompressed():
+  encoded = encodeContents(kRepetitiveContents)
+
+  assert encoded[0] == kCodecMarker
+  assert len(encoded) < len(kRepetitiveContents.encode('utf-8'))
+  assert decodeContents(encoded) == kRepetitiveContents
+
+
+def test_uncompressibleContentsAreStoredPlain(monkeypatch):
+  # A compressor that saves less than the two header bytes
+  monkeypatch.setattr(page_codec, 'zstandard', None)
+  monkeypatch.setattr(page_codec, 'zlib', SimpleNamespace(compress=lambda data, level: data[:-1]))
+  contents = 'x' * kMinCompressLength
+
+  assert encodeContents(contents) == contents.encode('utf-8')
+  assert decodeContents(encodeContents(contents)) == contents
+
+
+def test_legacyPlainContents():
+  assert decodeContents('<html>Café</html>'.encode('utf-8')) == '<html>Café</html>'
+
+
+def test_zlibContents(monkeypatch):
+  monkeypatch.setattr(page_codec, 'zstandard', None)
+  encoded = encodeContents(kRepetitiveContents)
+
+  assert encoded[:2] == bytes([kCodecMarker, kCodecZlib])
+  assert decodeContents(encoded) == kRepetitiveContents
+
+  # Values written by another writer decode the same way
+  assert decodeContents(bytes([kCodecMarker, kCodecZlib]) + zlib.compress(b'<p>Hello</p>')) == '<p>Hello</p>'
+
+
+def test_unknownCodec():
+  assert decodeContents(bytes([kCodecMarker, 99]) + b'junk') == ''
+
+
+def test_zstdContents():
+  if page_codec.zstandard is None:
+    pytest.skip('zstandard is not installed')
+
+  encoded = encodeContents(kRepetitiveContents)
+
+  assert encoded[:2] == bytes([kCodecMarker, page_codec.kCodecZstd])
+  assert decodeContents(encoded) == kRepetitiveContents
@@ -0,0 +1,64 @@
+from page_data import PageData
+from page_order import kSortKeyGap, orderedPageIds, sortKeyBetween, sortKeysForCount, sortKeysFromPageOrder
+
+
+def makePage(pageId, parentId, sortKey):
+  pageData = PageData()
+  pageData.m_pageId = pageId
+  pageData.m_parentId = parentId
+  pageData.m_sortKey = sortKey
+  return pageData
+
+
+def test_sortKeysForCount():
+  assert sortKeysForCount(0) == []
+  assert sortKeysForCount(3) == [kSortKeyGap, 2 * kSortKeyGap, 3 * kSortKeyGap]
+
+
+def test_sortKeyBetween_noSiblings():
+  assert sortKeyBetween(None, None) == kSortKeyGap
+
+
+def test_sortKeyBetween_atEnds():
+  assert sortKeyBetween(None, 100) == 100 - kSortKeyGap
+  assert sortKeyBetween(100, None) == 100 + kSortKeyGap
+
+
+def test_sortKeyBetween_betweenKeys():
+  key = sortKeyBetween(100, 200)
+  assert 100 < key < 200
+
+  assert sortKeyBetween(100, 102) == 101
+
+
+def test_sortKeyBetween_noRoom():
+  assert sortKeyBetween(100, 101) is None
+  assert sortKeyBetween(100, 100) is None
+
+
+def test_sortKeysFromPageOrder():
+  pagesAndParents = [(1, 0), (2, 0), (3, 1), (4, 1), (5, 0)]
+  sortKeys = sortKeysFromPageOrder(pagesAndParents, [5, 4, 1, 3, 2])
+
+  # Each group of siblings is numbered separately, in page order
+  assert sortKeys[5] < sortKeys[1] < sortKeys[2]
+  assert sortKeys[4] < sortKeys[3]
+  assert sorted(sortKeys[pageId] for pageId in (1, 2, 5)) == sortKeysForCount(3)
+
+
+def test_sortKeysFromPageOrder_unlistedPagesGoLast():
+  sortKeys = sortKeysFromPageOrder([(1, 0), (2, 0), (3, 0)], [3, 99])
+
+  assert sortKeys[3] < sortKeys[1] < sortKeys[2]
+
+
+def test_orderedPageIds():
+  pageDict = { page.m_pageId: page for page in [
+    makePage(1, 0, 2048),
+    makePage(2, 0, 1024),
+    makePage(3, 1, 1024),
+    makePage(4, 2, 1024),
+    makePage(5, 99, 1024),    # Its parent doesn't exist
+  ] }
+
+  assert orderedPageIds(pageDict) == [2, 4, 1, 3]
@@ -0,0 +1,91 @@
+from tagCache import TagCache
+
+
+def recordingCache():
+  """ Returns a tag cache, and the list that its changes are recorded in. """
+  tagCache = TagCache()
+  changes = []
+  tagCache.addListener(changes.append)
+  return tagCache, changes
+
+
+def test_addTags():
+  tagCache, changes = recordingCache()
+  tagCache.addTags({ 1: ['work', 'home'], 2: ['work'] })
+
+  assert len(changes) == 1
+  assert changes[0].addedTags == { 'work', 'home' }
+  assert changes[0].removedTags == set()
+  assert changes[0].counts == { 'work': 2, 'home': 1 }
+
+  assert tagCache.tagCount('work') == 2
+  assert tagCache.tagsForPage(1) == { 'work', 'home' }
+  assert sorted(tagCache.pagesUsingTag('work')) == [1, 2]
+
+
+def test_addExistingTagIsNotAChange():
+  tagCache, changes = recordingCache()
+  tagCache.addTag(1, 'work')
+  tagCache.addTag(1, 'work')
+
+  assert len(changes) == 1
+
+
+def test_updateTagsForPage():
+  tagCache, changes = recordingCache()
+  tagCache.addTags({ 1: ['work', 'home'], 2: ['work'] })
+  tagCache.updateTagsForPage(1, ['work', 'travel'])
+
+  change = changes[-1]
+  assert change.addedTags == { 'travel' }
+  assert change.removedTags == { 'home' }
+  assert change.counts == { 'travel': 1, 'home': 0 }     # The count of 'work' didn't change
+
+  assert tagCache.tagsForPage(1) == { 'work', 'travel' }
+  assert tagCache.tagCount('home') == 0
+
+
+def test_tagAddedAndRemovedInOneChange():
+  tagCache, changes = recordingCache()
+  tagCache.addTags({ 1: ['old'] })
+  tagCache.updateTagsForPage(1, ['new'])
+  tagCache.updateTagsForPage(1, ['new'])      # No change at all
+
+  assert len(changes) == 2
+  assert changes[-1].addedTags == { 'new' }
+  assert changes[-1].removedTags == { 'old' }
+
+
+def test_removePageIdFromAllTags():
+  tagCache, changes = recordingCache()
+  tagCache.addTags({ 1: ['work', 'home'], 2: ['work'] })
+  tagCache.removePageIdFromAllTags(1)
+
+  assert changes[-1].removedTags == { 'home' }
+  assert changes[-1].counts == { 'work': 1, 'home': 0 }
+  assert tagCache.tagsForPage(1) == set()
+  assert 1 not in tagCache.pageTags
+
+
+def test_removePageIdFromTag():
+  tagCache, changes = recordingCache()
+  tagCache.addTags({ 1: ['work'] })
+  tagCache.removePageIdFromTag(2, 'work')      # Not one of the page's tags
+
+  assert len(changes) == 1
+
+  tagCache.removePageIdFromTag(1, 'work')
+
+  assert changes[-1].removedTags == { 'work' }
+  assert tagCache.pagesUsingTag('work') == []
+
+
+def test_clear():
+  tagCache, changes = recordingCache()
+  tagCache.addTags({ 1: ['work'], 2: ['home'] })
+  tagCache.clear()
+
+  assert changes[-1].removedTags == { 'work', 'home' }
+  assert changes[-1].counts == { 'work': 0, 'home': 0 }
+  assert tagCache.tagDict == {}
+  assert tagCache.pageTags == {}
@@ -0,0 +1,71 @@
+import pytest
+
+from tagCache import TagCache
+from tag_query import TagQuery, TagQueryError
+
+kAllPageIds = { 1, 2, 3, 4, 5 }
+
+
+@pytest.fixture
+def tagCache():
+  tagCache = TagCache()
+  tagCache.addTags({
+    1: ['work', 'project-x'],
+    2: ['work', 'archived'],
+    3: ['home', 'to do'],
+    4: ['home', 'work'],
+  })
+  return tagCache
+
+
+def evaluate(queryString, tagCache):
+  return TagQuery(queryString).evaluate(tagCache, kAllPageIds)
+
+
+def test_parseTree():
+  assert TagQuery('a').tree == ('tag', 'a')
+  assert TagQuery('a OR b AND NOT c').tree == ('or', [('tag', 'a'), ('and', [('tag', 'b'), ('not', ('tag', 'c'))])])
+  assert TagQuery('(a or b) c').tree == ('and', [('or', [('tag', 'a'), ('tag', 'b')]), ('tag', 'c')])
+  assert TagQuery('"a OR b"').tree == ('tag', 'a OR b')
+
+
+@pytest.mark.parametrize('queryString', ['', '   ', '"work', '(work', 'work)', 'work AND', 'NOT', 'OR work', '()'])
+def test_invalidQueries(queryString):
+  with pytest.raises(TagQueryError):
+    TagQuery(queryString)
+
+
+def test_singleTag(tagCache):
+  assert evaluate('work', tagCache) == { 1, 2, 4 }
+  assert evaluate('unused', tagCache) == set()
+
+
+def test_and(tagCache):
+  assert evaluate('work AND home', tagCache) == { 4 }
+  assert evaluate('work home', tagCache) == { 4 }
+
+
+def test_or(tagCache):
+  assert evaluate('project-x OR archived OR home', tagCache) == { 1, 2, 3, 4 }
+
+
+def test_not(tagCache):
+  assert evaluate('NOT work', tagCache) == { 3, 5 }
+  assert evaluate('work AND NOT archived', tagCache) == { 1, 4 }
+  assert evaluate('NOT work AND NOT home', tagCache) == { 5 }
+
+
+def test_precedenceAndGrouping(tagCache):
+  assert evaluate('home OR work AND archived', tagCache) == { 2, 3, 4 }
+  assert evaluate('(home OR work) AND NOT archived', tagCache) == { 1, 3, 4 }
+
+
+def test_quotedTagAndKeywordCase(tagCache):
+  assert evaluate('"to do" and not work', tagCache) == { 3 }
+
+
+def test_resultIsNotTheCachesSet(tagCache):
+  result = evaluate('work', tagCache)
+  result.clear()
+
+  assert tagCache.tagCount('work') == 3
@@ -0,0 +1,55 @@
+from PySide6 import QtCore, QtGui
+import logging
+
+from database import ImageDict
+from pixmap_cache import PixmapCache
+
+class CImageDocument(QtGui.QTextDocument):
+  """ Text document that decodes a page's images only when the document asks for them (ie, when an image is
+      laid out or drawn), rather than when the page is loaded. """
+  def __init__(self, parent, pixmapCache: PixmapCache):
+    super(CImageDocument, self).__init__(parent)
+    self.pixmapCache = pixmapCache
+
+    # Encoded images of the current page, by image name
+    self.pageImages: ImageDict = {}
+
+  def setPageImages(self, pageImages: ImageDict) -> None:
+    """ Sets the encoded images of the displayed page.  If the page has already been laid out, it is laid
+        out again, so that its images are shown. """
+    self.pageImages = pageImages
+
+    if len(pageImages) > 0 and not self.isEmpty():
+      wasModified = self.isModified()
+      self.markContentsDirty(0, self.characterCount())
+      self.setModified(wasModified)
+
+  def loadResource(self, resourceType, name: QtCore.QUrl):
+    if resourceType == QtGui.QTextDocument.ResourceType.ImageResource:
+      pixmap = self.getPixmap(name.toString())
+
+      if pixmap is not None:
+        return pixmap
+
+    return super(CImageDocument, self).loadResource(resourceType, name)
+
+  def getPixmap(self, imageName: str) -> QtGui.QPixmap | None:
+    imageInfo = self.pageImages.get(imageName)
+
+    if imageInfo is None:
+      return None
+
+    imageHash, imageData, imageFormat = imageInfo
+
+    pixmap = self.pixmapCache.getPixmap(imageHash)
+
+    if pixmap is None:
+      pixmap = QtGui.QPixmap()
+
+      if not pixmap.loadFromData(imageData, imageFormat if len(imageFormat) > 0 else None):
+        logging.error(f'[CImageDocument.getPixmap] Could not decode image {imageName}')
+        return None
+
+      self.pixmapCache.addPixmap(imageHash, pixmap)
+
+    return pixmap
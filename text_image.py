@@ -1,7 +1,9 @@
 from PySide6 import QtCore, QtWidgets, QtGui
+import logging
 
 from database import Database
 from notebook_types import ENTITY_ID
+from utility import createImageRendition
 
 # Number of letters to use in a random image name.
 kNumLettersInImageName = 10
@@ -17,12 +19,33 @@ class TextImage:
 
   @staticmethod
   def insertImageIntoDocument(document: QtGui.QTextDocument, cursor: QtGui.QTextCursor, imageFilePath: str, pageId: ENTITY_ID, database: Database):
-    pixmap = QtGui.QPixmap(imageFilePath)
+    # The file's bytes are stored as they are, rather than re-encoded, so that (for example) a JPEG stays a JPEG.
+    imageFile = QtCore.QFile(imageFilePath)
+
+    if not imageFile.open(QtCore.QIODevice.OpenModeFlag.ReadOnly):
+      logging.error(f'[TextImage.insertImageIntoDocument] Could not open {imageFilePath}')
+      return
+
+    imageData = imageFile.readAll()
+    imageFile.close()
+
+    imageFormat = QtGui.QImageReader.imageFormat(imageFilePath).data().decode()
+
+    # A large image is shown as a downscaled copy, so the full-size image is never decoded
+    rendition = createImageRendition(imageData.data())
+    displayData, displayFormat = rendition if rendition is not None else (imageData.data(), imageFormat)
+
+    pixmap = QtGui.QPixmap()
+
+    if not pixmap.loadFromData(displayData, displayFormat):
+      logging.error(f'[TextImage.insertImageIntoDocument] {imageFilePath} is not a supported image')
+      return
+
     randomImageName = TextImage.generateRandomImageName()
 
     document.addResource(QtGui.QTextDocument.ResourceType.ImageResource, QtCore.QUrl(randomImageName), pixmap)
 
-    success = database.addImage(randomImageName, pixmap, pageId)
+    success = database.addImage(randomImageName, imageData.data(), imageFormat, pageId, rendition)
 
     if success:
       imageFormat = QtGui.QTextImageFormat()
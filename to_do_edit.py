@@ -179,7 +179,7 @@ class ToDoEditWidget(QtWidgets.QWidget):
 
     return subTasks
 
-  def setPageContents(self, contents: str, imageNames: list[str]) -> None:
+  def setPageContents(self, contents: str) -> None:
     taskReader = TaskReader()
 
     self.loading = True
@@ -27,7 +27,7 @@ from date_tree import CDateTree
 from folder_edit_widget import FolderEditWidget
 from page_history_widget import CPageHistoryWidget
 from page_title_list import CPageTitleList
-from page_tree import CPageTree
+from page_tree_view import CPageTreeView
 from tag_list import CTagList
 from title_label_widget import CTitleLabelWidget
 from to_do_edit import ToDoEditWidget
@@ -116,7 +116,7 @@ class Ui_PyNoteBookWindow(object):
         self.verticalLayout_4.setContentsMargins(11, 11, 11, 11)
         self.verticalLayout_4.setObjectName(u"verticalLayout_4")
         self.verticalLayout_4.setContentsMargins(0, 0, 0, 0)
-        self.pageTree = CPageTree(self.treeTab)
+        self.pageTree = CPageTreeView(self.treeTab)
         self.pageTree.setObjectName(u"pageTree")
 
         self.verticalLayout_4.addWidget(self.pageTree)
@@ -373,12 +373,10 @@ class Ui_PyNoteBookWindow(object):
         self.actionManage_Favorites.setText(QCoreApplication.translate("PyNoteBookWindow", u"Manage Favorites", None))
         self.actionFavorites.setText(QCoreApplication.translate("PyNoteBookWindow", u"Favorites", None))
         self.actionSearch.setText(QCoreApplication.translate("PyNoteBookWindow", u"Search", None))
-        ___qtreewidgetitem = self.pageTree.headerItem()
-        ___qtreewidgetitem.setText(0, QCoreApplication.translate("PyNoteBookWindow", u"Page Title", None));
         self.navigationTabWidget.setTabText(self.navigationTabWidget.indexOf(self.treeTab), QCoreApplication.translate("PyNoteBookWindow", u"Tree", None))
         self.navigationTabWidget.setTabText(self.navigationTabWidget.indexOf(self.listTab), QCoreApplication.translate("PyNoteBookWindow", u"Pages", None))
-        ___qtreewidgetitem1 = self.dateTree.headerItem()
-        ___qtreewidgetitem1.setText(0, QCoreApplication.translate("PyNoteBookWindow", u"Date", None));
+        ___qtreewidgetitem = self.dateTree.headerItem()
+        ___qtreewidgetitem.setText(0, QCoreApplication.translate("PyNoteBookWindow", u"Date", None));
         self.navigationTabWidget.setTabText(self.navigationTabWidget.indexOf(self.dateTab), QCoreApplication.translate("PyNoteBookWindow", u"Date", None))
         self.navigationTabWidget.setTabText(self.navigationTabWidget.indexOf(self.tagsTab), QCoreApplication.translate("PyNoteBookWindow", u"Tags", None))
         self.navigationTabWidget.setTabText(self.navigationTabWidget.indexOf(self.historyTab), QCoreApplication.translate("PyNoteBookWindow", u"Recently Viewed", None))
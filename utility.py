@@ -5,6 +5,9 @@ import os.path
 import time
 from datetime import date, datetime, timezone
 
+# Largest width or height of the copy of an image that is shown in a page
+kMaxRenditionSize = 1280
+
 def julianDayToDate(julianDay: int) -> date:
   """ Returns a Python date corresponding to the given Julian day. """
   qtDate = QtCore.QDate.fromJulianDay(julianDay)
@@ -82,6 +85,12 @@ def unknownToBytes(data: Any) -> bytes:
   else:
     return b''
 
+def htmlToPlainText(html: str) -> str:
+  """ Returns the plain text of an HTML string, as QTextDocument would render it. """
+  textDoc = QtGui.QTextDocument()
+  textDoc.setHtml(html)
+  return textDoc.toPlainText()
+
 def stringToArray(inStr: str) -> list[str]:
   """ Separates a joined list.  The list can be joined by either commas or spaces. """
   resultArray = []
@@ -105,14 +114,58 @@ def pixmapToQByteArray(pixmap: QtGui.QPixmap) -> tuple[bool, QtCore.QByteArray]:
 
   return (success, imageData)
 
-def qByteArrayToPixmap(data: QtCore.QByteArray) -> tuple[bool, QtGui.QPixmap]:
+def qByteArrayToPixmap(data: QtCore.QByteArray, imageFormat: str | None = 'PNG') -> tuple[bool, QtGui.QPixmap]:
   # From: https://stackoverflow.com/questions/57404778/how-to-convert-a-qpixmaps-image-into-a-bytes
   byteArray = QtCore.QByteArray(data)
   pixmap = QtGui.QPixmap()
-  success = pixmap.loadFromData(byteArray, 'PNG')
+  success = pixmap.loadFromData(byteArray, imageFormat)
 
   return (success, pixmap)
 
+def createImageRendition(imageData: bytes, maxSize: int = kMaxRenditionSize) -> tuple[bytes, str] | None:
+  """Creates the downscaled copy of an image that is shown in a page.  The image is decoded at the reduced
+  size, so the full-size image is never held in memory.
+
+  Args:
+      imageData (bytes): Encoded image
+      maxSize (int): Largest width or height of the copy
+
+  Returns:
+      tuple[bytes, str] | None: The encoded copy and its format, or None if the image already fits within
+      maxSize, or can't be read.
+  """
+  inBuffer = QtCore.QBuffer()
+  inBuffer.setData(QtCore.QByteArray(imageData))
+  inBuffer.open(QtCore.QIODevice.OpenModeFlag.ReadOnly)
+
+  reader = QtGui.QImageReader(inBuffer)
+  imageSize = reader.size()
+
+  if not imageSize.isValid() or (imageSize.width() <= maxSize and imageSize.height() <= maxSize):
+    return None
+
+  # Photos stay JPEG; anything else may have transparency or sharp edges, so it is stored as PNG
+  renditionFormat = 'jpeg' if reader.format().data() in (b'jpeg', b'jpg') else 'png'
+
+  reader.setScaledSize(imageSize.scaled(maxSize, maxSize, QtCore.Qt.AspectRatioMode.KeepAspectRatio))
+  image = reader.read()
+
+  if image.isNull():
+    logging.error(f'[createImageRendition] Could not read image: {reader.errorString()}')
+    return None
+
+  renditionData = QtCore.QByteArray()
+  outBuffer = QtCore.QBuffer(renditionData)
+  outBuffer.open(QtCore.QIODevice.OpenModeFlag.WriteOnly)
+  success = image.save(outBuffer, renditionFormat)
+  outBuffer.close()
+
+  if not success:
+    logging.error('[createImageRendition] Could not encode the downscaled image')
+    return None
+
+  return (renditionData.data(), renditionFormat)
+
 def deDupeList(aList):
   """Removes duplicates from a list, while preserving its order.
 